@@ -1,3 +1,5 @@
+import os
+
 # Azure SQL Database
 SQL_SERVER = "your-server.database.windows.net"
 SQL_DATABASE = "resume-screener"
@@ -7,7 +9,122 @@ SQL_PASSWORD = "your-password"
 # Azure OpenAI
 OPENAI_API_KEY = "your-openai-key"
 OPENAI_ENDPOINT = "your-openai-endpoint"
+AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-preview")
+AZURE_OPENAI_CHAT_ENDPOINT = os.getenv("AZURE_OPENAI_CHAT_ENDPOINT", "https://parseroa.openai.azure.com/")
+AZURE_OPENAI_CHAT_API_KEY = os.getenv("AZURE_OPENAI_CHAT_API_KEY", "C6GA6hGNxN48a6A2jR6JyhDYTzbnwfvHJuYTM2FUz4olCPa2mBq0JQQJ99BIAC77bzfXJ3w3AAABACOGAz1x")
+AZURE_OPENAI_EMBEDDINGS_ENDPOINT = os.getenv("AZURE_OPENAI_EMBEDDINGS_ENDPOINT", "https://embedderresume.openai.azure.com/")
+AZURE_OPENAI_EMBEDDINGS_API_KEY = os.getenv("AZURE_OPENAI_EMBEDDINGS_API_KEY", "CYAwdpz6QRguMec53YUv1imw8Asf1s97jz1HwpuCUNPIsylrqkwnJQQJ99BJAC77bzfXJ3w3AAABACOGZ5GD")
+
+# Shared HTTP connection pool for Azure OpenAI clients (HTTP/2 needs the h2 package)
+OPENAI_HTTP_MAX_CONNECTIONS = int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "64"))
+OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS", "32"))
+OPENAI_HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("OPENAI_HTTP_KEEPALIVE_EXPIRY_SECONDS", "120"))
+OPENAI_HTTP_TIMEOUT_SECONDS = float(os.getenv("OPENAI_HTTP_TIMEOUT_SECONDS", "120"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "1") != "0"
 
 # Azure Blob Storage
 BLOB_CONNECTION_STRING = "DefaultEndpointsProtocol=https;AccountName=resume1raw;AccountKey=uy3mg2nDk8S/R2X+OGAd6RqDEBX3FmFfOEPqO/VTaFIOt/2jLG4m1vev6KXBK7286H/HbIBsHl1z+AStIeSelA==;EndpointSuffix=core.windows.net"
-BLOB_CONTAINER_NAME = "resumes"
\ No newline at end of file
+BLOB_CONTAINER_NAME = "resumes"
+
+# LLM ranking
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # Parallel chat completions per rank call
+LLM_EVAL_TIMEOUT_SECONDS = float(os.getenv("LLM_EVAL_TIMEOUT_SECONDS", "60"))  # Per evaluation request, after rate-limit admission
+
+# Prompt token budgets (system prompt and few-shot examples included); the
+# lowest-value resume sections are trimmed to fit
+LLM_EVAL_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_EVAL_PROMPT_TOKEN_BUDGET", "6000"))
+LLM_EVAL_JD_MAX_TOKENS = int(os.getenv("LLM_EVAL_JD_MAX_TOKENS", "1200"))
+LLM_PARSE_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PARSE_PROMPT_TOKEN_BUDGET", "6000"))
+
+# Batched evaluation: resumes per chat completion (1 = one request per resume)
+LLM_EVAL_BATCH_SIZE = int(os.getenv("LLM_EVAL_BATCH_SIZE", "1"))
+LLM_EVAL_BATCH_RESUME_MAX_TOKENS = int(os.getenv("LLM_EVAL_BATCH_RESUME_MAX_TOKENS", "1500"))
+LLM_EVAL_BATCH_MAX_COMPLETION_TOKENS = int(os.getenv("LLM_EVAL_BATCH_MAX_COMPLETION_TOKENS", "4096"))
+
+# "two_pass": parse every resume with GPT, then evaluate the shortlist.
+# "single_pass": collect without GPT parsing; each shortlisted resume is parsed
+# and evaluated by one call, the rest are parsed afterwards.
+RANKING_MODE = os.getenv("RANKING_MODE", "two_pass")
+
+# LLM evaluation cache (set EVAL_CACHE_PATH="" to disable)
+EVAL_CACHE_PATH = os.getenv("EVAL_CACHE_PATH", "data/cache/llm_evaluations.sqlite3")
+EVAL_CACHE_MAX_ENTRIES = int(os.getenv("EVAL_CACHE_MAX_ENTRIES", "20000"))
+EVAL_CACHE_TTL_SECONDS = float(os.getenv("EVAL_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))  # 0 = never expire
+
+# Job description analysis: requirements profile and embedding cached per JD content
+# (set JD_ANALYSIS_CACHE_PATH="" to keep profiles in memory only)
+JD_ANALYSIS_CACHE_PATH = os.getenv("JD_ANALYSIS_CACHE_PATH", "data/cache/jd_profiles.sqlite3")
+JD_ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("JD_ANALYSIS_CACHE_MAX_ENTRIES", "1000"))
+JD_ANALYSIS_PROMPT_TOKEN_BUDGET = int(os.getenv("JD_ANALYSIS_PROMPT_TOKEN_BUDGET", "4000"))
+# After a failed analysis the rule-based profile is used without retrying the LLM for
+# JD_ANALYSIS_RETRY_SECONDS, doubling per consecutive failure up to JD_ANALYSIS_RETRY_MAX_SECONDS
+JD_ANALYSIS_RETRY_SECONDS = float(os.getenv("JD_ANALYSIS_RETRY_SECONDS", "300"))
+JD_ANALYSIS_RETRY_MAX_SECONDS = float(os.getenv("JD_ANALYSIS_RETRY_MAX_SECONDS", str(6 * 3600)))
+JD_PROFILE_IN_PROMPT = os.getenv("JD_PROFILE_IN_PROMPT", "1") != "0"  # Evaluate against the profile, not the raw JD
+
+# ZIP ingestion: members are extracted and preprocessed in a process pool (1 = in a
+# worker thread) and GPT-parsed with bounded concurrency. Archives over the
+# member count or total uncompressed size are rejected; oversized members are skipped.
+ZIP_EXTRACT_WORKERS = int(os.getenv("ZIP_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+ZIP_PARSE_CONCURRENCY = int(os.getenv("ZIP_PARSE_CONCURRENCY", str(LLM_MAX_CONCURRENCY)))
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "1000"))
+ZIP_MAX_UNCOMPRESSED_BYTES = int(os.getenv("ZIP_MAX_UNCOMPRESSED_BYTES", str(512 * 1024 * 1024)))
+ZIP_MAX_MEMBER_BYTES = int(os.getenv("ZIP_MAX_MEMBER_BYTES", str(20 * 1024 * 1024)))
+
+# Start method for extraction process pools ("forkserver" or "spawn"; "spawn" is used
+# where forkserver is unavailable). Forking the API process would copy its threads,
+# locks and open client connections into the workers.
+PROCESS_POOL_START_METHOD = os.getenv("PROCESS_POOL_START_METHOD", "forkserver")
+
+# PDF extraction: a fast PyMuPDF probe is kept when its text quality (0-1) exceeds
+# this; otherwise slower extractors are tried, ordered by their observed win rate
+# per second once each has PDF_ADAPT_MIN_SAMPLES attempts
+PDF_PROBE_MIN_QUALITY = float(os.getenv("PDF_PROBE_MIN_QUALITY", "0.85"))
+PDF_ADAPT_MIN_SAMPLES = int(os.getenv("PDF_ADAPT_MIN_SAMPLES", "10"))
+
+# PDF page limits: extraction stops after PDF_MAX_PAGES pages or once PDF_MAX_CHARS
+# characters are extracted (0 = no limit). Documents with at least
+# PDF_PARALLEL_MIN_PAGES pages are extracted PDF_PAGES_PER_TASK pages at a time in a
+# pool of PDF_PAGE_WORKERS processes (1 = in the calling thread).
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "60000"))
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+
+# Two-stage ranking (opt-in): only the top LLM_SHORTLIST_SIZE by cheap score are sent to
+# the LLM; the rest keep their prescreen score, marked llm_reviewed=False. 0 = every resume
+LLM_SHORTLIST_SIZE = int(os.getenv("LLM_SHORTLIST_SIZE", "0"))
+LLM_SHORTLIST_MIN_SCORE = float(os.getenv("LLM_SHORTLIST_MIN_SCORE", "0.0"))
+
+# Embedding request batching
+EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", "64"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))  # Estimated tokens per request
+
+# Azure OpenAI request scheduling, per deployment. OPENAI_DEPLOYMENT_LIMITS overrides
+# these for individual deployments, e.g. '{"gpt-35-turbo": {"rpm": 300, "tpm": 60000}}'
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "300"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "60000"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+OPENAI_MIN_CONCURRENCY = int(os.getenv("OPENAI_MIN_CONCURRENCY", "1"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))  # For 429s, timeouts and 5xx
+OPENAI_DEPLOYMENT_LIMITS = os.getenv("OPENAI_DEPLOYMENT_LIMITS", "")
+
+# Per-session resume embedding matrices (.npy, memory-mapped on load)
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "data/embeddings")
+
+# Ranking used when the LLM path fails: "bm25" (offline, no API calls) or
+# "semantic" (embeddings + TF-IDF; falls back to bm25 if the embeddings call fails)
+FALLBACK_RANKER = os.getenv("FALLBACK_RANKER", "bm25")
+
+# Background ranking jobs ("sqlite": separate worker processes sharing JOB_DB_PATH;
+# "memory": worker threads in the API process, for development only - ranking
+# competes with request handling for the GIL and queued jobs are lost on restart)
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+JOB_STALE_AFTER_SECONDS = float(os.getenv("JOB_STALE_AFTER_SECONDS", "300"))  # Running jobs without a heartbeat are requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))  # Claims before a stale job is failed instead
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))  # Finished jobs are then dropped (0 = keep)
+JOB_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("JOB_SHUTDOWN_TIMEOUT_SECONDS", "30"))
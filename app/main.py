@@ -5,6 +5,8 @@ from starlette.middleware.sessions import SessionMiddleware
 from app.middleware.authentication import AuthenticationMiddleware
 from app.routers import resumes, ranking, reporting, auth, sessions
 from app.routers import insights
+from app.services.jobs import job_worker_pool
+from app.services.openai_clients import openai_clients
 
 app = FastAPI(title="Resume Screener API")
 
@@ -41,6 +43,17 @@ app.include_router(auth.router)
 app.include_router(insights.router)
 app.include_router(sessions.router)
 
+@app.on_event("startup")
+def start_job_workers():
+    job_worker_pool.start()
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_worker_pool.stop()
+    openai_clients.close()
+
+
 @app.get("/")
 def root():
     return {"message": "Resume Screener API is running"}
@@ -1,8 +1,8 @@
 # app/routers/insights.py
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
-import json
-import os
+
+from app.services.results_store import load_latest_user_results, load_local_results
 
 router = APIRouter(prefix="/api", tags=["insights"])
 
@@ -21,27 +21,18 @@ async def get_insights(
         user_id = None
         if request is not None:
             user_id = request.headers.get("X-User-Id") or request.headers.get("x-user-id")
-        reports_file = "reports/ranked_resumes.json"
-        
         ranked_data = []
         if user_id:
             try:
-                from app.services.blob_storage import blob_storage
                 # Look for the latest session's ranked results first
-                sessions = blob_storage.list_user_sessions(user_id)
-                for s in sessions:
-                    try:
-                        content = blob_storage.download_file_session("reports/ranked_resumes.json", user_id, s['session_id'])
-                        ranked_data = json.loads(content.decode('utf-8'))
-                        if ranked_data:
-                            break
-                    except Exception:
-                        continue
+                ranked_data, _ = load_latest_user_results(user_id)
             except Exception:
                 ranked_data = []
-        if not ranked_data and os.path.exists(reports_file):
-            with open(reports_file, "r", encoding="utf-8") as f:
-                ranked_data = json.load(f)
+        if not ranked_data:
+            try:
+                ranked_data = load_local_results()
+            except FileNotFoundError:
+                ranked_data = []
         
         if not ranked_data:
             return JSONResponse(content={
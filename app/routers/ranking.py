@@ -1,12 +1,15 @@
-from fastapi import APIRouter, HTTPException, Body, Request, UploadFile, File
-from fastapi.responses import JSONResponse
-from app.services.ranker import rank_resumes
-from app.services.parser import parse_resume, parse_zip, parse_resume_from_blob, parse_zip_from_blob
+from fastapi import APIRouter, HTTPException, Body, Query, Request, UploadFile, File
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from app.services.enhanced_text_extractor import enhanced_extractor
 from app.services.blob_storage import blob_storage
+from app.services.jobs import job_queue
+from app.services.ranking_pipeline import iter_ranking, run_ranking, load_ranked_results
+from app.services.result_views import find_result, ranking_sort_key, results_page
+from app.services.results_store import dumps
+from typing import Optional
+import bisect
 import os
-import json
-import tempfile
 # from app.routers.auth import get_current_user
 # from app.routers.azure_auth import get_current_user_azure
 
@@ -14,19 +17,31 @@ router = APIRouter(prefix="/api", tags=["ranking"])
 
 DATA_PATH = "data/raw_resumes"
 
+# Candidates listed in each stream result event's provisional_ranks (fewer with a smaller top_k)
+STREAM_LEADERS = 10
+
+TOP_K_QUERY = Query(None, ge=1, description="Only the best K candidates")
+OFFSET_QUERY = Query(0, ge=0, description="Rows to skip (within top_k)")
+LIMIT_QUERY = Query(None, ge=1, description="Maximum rows to return")
+FIELDS_QUERY = Query(None, description='"summary", "all" (default) or comma-separated field names')
+
 
 @router.post("/rank")
 async def rank_uploaded_resumes(
     job_description: str = Body(..., embed=True, description="Job description text"),
-    request: Request = None
+    request: Request = None,
+    top_k: Optional[int] = TOP_K_QUERY,
+    offset: int = OFFSET_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    fields: Optional[str] = FIELDS_QUERY
 ):
     """
     Rank uploaded resumes against a given job description.
     Parses all resumes from Azure Blob Storage, generates embeddings, and returns ranked output.
+    top_k, offset/limit and fields select the returned rows and columns; every
+    candidate is still ranked and saved (see GET /api/rank/results).
     """
     try:
-        resumes = []
-
         # Step 1: Collect all uploaded resumes from per-user blob storage
         user_id = "guest"
         if request is not None:
@@ -34,41 +49,19 @@ async def rank_uploaded_resumes(
             if auth_header:
                 user_id = auth_header
 
-        blob_names = blob_storage.list_blobs_session(user_id=user_id, prefix="raw_resumes/")
-        
-        for blob_name in blob_names:
-            if blob_name.startswith("raw_resumes/"):
-                ext = os.path.splitext(blob_name)[1].lower()
-                if ext in [".pdf", ".docx", ".txt"]:
-                    try:
-                        parsed = parse_resume_from_blob(blob_name, user_id=user_id)
-                        resumes.append(parsed)
-                    except Exception as e:
-                        resumes.append({"file": os.path.basename(blob_name), "error": str(e)})
-                elif ext == ".zip":
-                    try:
-                        parsed_zip = parse_zip_from_blob(blob_name, user_id=user_id)
-                        resumes.extend(parsed_zip)
-                    except Exception as e:
-                        resumes.append({"file": os.path.basename(blob_name), "error": str(e)})
-
-        if not resumes:
-            raise HTTPException(status_code=404, detail="No resumes found in blob storage")
-
-        # Step 2: Rank resumes based on job description
-        ranked_results = rank_resumes(resumes, job_description)
-
-        # Step 3: Save ranked output for reporting to session-based blob storage
-        json_content = json.dumps(ranked_results, indent=4).encode('utf-8')
-        blob_storage.upload_file_session(json_content, "reports/ranked_resumes.json", user_id)
-        
-        # Also save locally for backward compatibility
-        os.makedirs("reports", exist_ok=True)
-        with open("reports/ranked_resumes.json", "w", encoding="utf-8") as f:
-            json.dump(ranked_results, f, indent=4)
-
-        return JSONResponse(content={"status": "success", "ranked_resumes": ranked_results})
+        # Step 2: Rank resumes based on job description and save the output for reporting.
+        # Only resumes added or changed since the last ranking of this job description are evaluated.
+        try:
+            ranked_results = await run_ranking(user_id, job_description)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
 
+        return ORJSONResponse(content={
+            "status": "success", **results_page(ranked_results, top_k, offset, limit, fields)
+        })
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -76,7 +69,11 @@ async def rank_uploaded_resumes(
 @router.post("/rank-from-file")
 async def rank_uploaded_resumes_from_file(
     jd_file: UploadFile = File(..., description="Job description file: PDF, DOCX, or TXT"),
-    request: Request = None
+    request: Request = None,
+    top_k: Optional[int] = TOP_K_QUERY,
+    offset: int = OFFSET_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    fields: Optional[str] = FIELDS_QUERY
 ):
     """
     Rank uploaded resumes using a job description provided as a document upload.
@@ -95,59 +92,230 @@ async def rank_uploaded_resumes_from_file(
         ext = os.path.splitext(jd_file.filename)[1].lower()
         if ext not in [".pdf", ".docx", ".txt", ".doc"]:
             raise HTTPException(status_code=400, detail="Unsupported file format. Use PDF, DOCX, or TXT.")
-        # Handle legacy .doc as .docx not supported; user should convert, but attempt txt fallback
-        if ext == ".doc":
-            # Best-effort: write and treat as binary text (may be messy)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tf:
-                tf.write(file_bytes)
-                temp_path = tf.name
-            try:
-                extracted = enhanced_extractor.extract_text(temp_path)
-                job_description_text = extracted.get("raw_text", "")
-            finally:
-                os.unlink(temp_path)
-        else:
-            extracted = enhanced_extractor.extract_text_from_bytes(file_bytes, ext)
-            job_description_text = extracted.get("raw_text", "")
+        # Legacy .doc is not supported by the extractor; the user should convert it
+        extracted = enhanced_extractor.extract_text_from_bytes(file_bytes, ext)
+        job_description_text = extracted.get("raw_text", "")
 
         if not job_description_text or len(job_description_text.strip()) < 10:
             raise HTTPException(status_code=400, detail="Failed to extract meaningful text from the uploaded file.")
 
-        # Collect resumes from user's current session in blob storage
-        blob_names = blob_storage.list_blobs_session(user_id=user_id, prefix="raw_resumes/")
-        resumes = []
-        for blob_name in blob_names:
-            if blob_name.startswith("raw_resumes/"):
-                ext_r = os.path.splitext(blob_name)[1].lower()
-                if ext_r in [".pdf", ".docx", ".txt"]:
-                    try:
-                        parsed = parse_resume_from_blob(blob_name, user_id=user_id)
-                        resumes.append(parsed)
-                    except Exception as e:
-                        resumes.append({"file": os.path.basename(blob_name), "error": str(e)})
-                elif ext_r == ".zip":
-                    try:
-                        parsed_zip = parse_zip_from_blob(blob_name, user_id=user_id)
-                        resumes.extend(parsed_zip)
-                    except Exception as e:
-                        resumes.append({"file": os.path.basename(blob_name), "error": str(e)})
-
-        if not resumes:
-            raise HTTPException(status_code=404, detail="No resumes found in blob storage")
-
-        # Rank resumes using extracted text
-        ranked_results = rank_resumes(resumes, job_description_text)
-
-        # Save ranked output to session-based blob storage and locally
-        json_content = json.dumps(ranked_results, indent=4).encode('utf-8')
-        blob_storage.upload_file_session(json_content, "reports/ranked_resumes.json", user_id)
-        os.makedirs("reports", exist_ok=True)
-        with open("reports/ranked_resumes.json", "w", encoding="utf-8") as f:
-            json.dump(ranked_results, f, indent=4)
-
-        return JSONResponse(content={"status": "success", "ranked_resumes": ranked_results})
+        # Rank resumes from the user's current session using extracted text, and save the output
+        try:
+            ranked_results = await run_ranking(user_id, job_description_text)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+        return ORJSONResponse(content={
+            "status": "success", **results_page(ranked_results, top_k, offset, limit, fields)
+        })
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/rank/stream")
+async def rank_uploaded_resumes_stream(
+    job_description: str = Body(..., embed=True, description="Job description text"),
+    request: Request = None,
+    top_k: Optional[int] = TOP_K_QUERY,
+    fields: Optional[str] = FIELDS_QUERY
+):
+    """
+    Rank uploaded resumes and stream progress as newline-delimited JSON.
+
+    Emits one JSON object per line:
+      {"type": "parsed", ...}    after each new or changed raw blob is parsed
+      {"type": "result", ...}    as each evaluation finishes, with its provisional rank
+      {"type": "complete", ...}  the full sorted list, also saved for reporting
+      {"type": "error", ...}     if the run fails
+
+    provisional_ranks lists the best STREAM_LEADERS finished so far (top_k when
+    smaller); top_k also limits the complete list. fields projects the results.
+    Re-ranking an unchanged session against the same job description reuses
+    the saved results and sends only "complete".
+    """
+    user_id = "guest"
+    if request is not None:
+        auth_header = request.headers.get("X-User-Id") or request.headers.get("x-user-id")
+        if auth_header:
+            user_id = auth_header
+
+    def event(payload: dict) -> bytes:
+        return dumps(payload) + b"\n"
+
+    async def generate():
+        # Sort keys of finished results (ascending) and the current leaders (best first),
+        # so each event costs a bisection instead of re-sorting everything finished so far
+        finished_keys = []
+        leaders = []
+        leader_count = min(top_k or STREAM_LEADERS, STREAM_LEADERS)
+        try:
+            # Same pipeline as POST /api/rank: unchanged blobs since the last ranking of this
+            # job description are reused, and RANKING_MODE applies
+            async for update in iter_ranking(user_id, job_description):
+                if update["type"] == "parsed":
+                    yield event(update)
+                elif update["type"] == "result":
+                    result = update["result"]
+                    # Provisional position among results finished so far; final ranks come with "complete"
+                    key = ranking_sort_key(result)
+                    result["rank"] = 1 + len(finished_keys) - bisect.bisect_right(finished_keys, key)
+                    bisect.insort(finished_keys, key)
+                    if len(leaders) < leader_count or key > ranking_sort_key(leaders[-1]):
+                        # Behind leaders that sort ahead or tie, as a stable sort would place it
+                        position = sum(1 for r in leaders if ranking_sort_key(r) >= key)
+                        leaders.insert(position, result)
+                        del leaders[leader_count:]
+                    yield event({
+                        "type": "result",
+                        "index": update["index"],
+                        "completed": update["completed"],
+                        "total": update["total"],
+                        "provisional_rank": result["rank"],
+                        "provisional_ranks": [
+                            {"file": r.get("file"), "rank": position, "final_score": r.get("final_score", 0)}
+                            for position, r in enumerate(leaders, 1)
+                        ],
+                        "result": results_page([result], fields=fields)["ranked_resumes"][0]
+                    })
+                elif update["type"] == "complete":
+                    yield event({
+                        "type": "complete", "status": "success",
+                        **results_page(update["ranked_results"], top_k, fields=fields)
+                    })
+
+        except LookupError as e:
+            yield event({"type": "error", "status_code": 404, "detail": str(e)})
+        except Exception as e:
+            yield event({"type": "error", "status_code": 500, "detail": str(e)})
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.post("/rank/jobs")
+async def submit_ranking_job(
+    job_description: str = Body(..., embed=True, description="Job description text"),
+    request: Request = None
+):
+    """
+    Queue a background ranking job for the user's current session.
+    Returns immediately with a job id; poll GET /api/rank/jobs/{job_id}.
+    """
+    try:
+        user_id = "guest"
+        if request is not None:
+            auth_header = request.headers.get("X-User-Id") or request.headers.get("x-user-id")
+            if auth_header:
+                user_id = auth_header
+
+        # Pin the session now; workers do not share the API's current-session state
+        session_id = blob_storage.get_current_session(user_id)
+        job_id = job_queue.submit("rank", {
+            "user_id": user_id,
+            "session_id": session_id,
+            "job_description": job_description
+        })
+
+        return ORJSONResponse(status_code=202, content={
+            "status": "queued",
+            "job_id": job_id,
+            "session_id": session_id
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/rank/jobs/{job_id}")
+async def get_ranking_job(
+    job_id: str,
+    request: Request = None,
+    top_k: Optional[int] = TOP_K_QUERY,
+    offset: int = OFFSET_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    fields: Optional[str] = FIELDS_QUERY
+):
+    """
+    Report a ranking job's status and progress, and its ranked results once finished
+    (selected with top_k, offset/limit and fields as in POST /api/rank).
+    """
+    user_id = "guest"
+    if request is not None:
+        auth_header = request.headers.get("X-User-Id") or request.headers.get("x-user-id")
+        if auth_header:
+            user_id = auth_header
+
+    job = job_queue.get(job_id)
+    if job is None or job["payload"].get("user_id") != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    content = {
+        "status": "success",
+        "job_id": job["id"],
+        "job_status": job["status"],
+        "session_id": job["payload"].get("session_id"),
+        "progress": job["progress"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"]
+    }
+    if job["result"]:
+        content.update(results_page(job["result"].get("ranked_resumes", []), top_k, offset, limit, fields))
+    return ORJSONResponse(content=content)
+
+
+@router.get("/rank/results")
+async def get_ranked_results(
+    request: Request = None,
+    session_id: Optional[str] = Query(None, description="Session to read (default: current)"),
+    top_k: Optional[int] = TOP_K_QUERY,
+    offset: int = OFFSET_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    fields: Optional[str] = FIELDS_QUERY
+):
+    """
+    Page through the session's last saved ranking without re-ranking.
+    """
+    user_id = "guest"
+    if request is not None:
+        auth_header = request.headers.get("X-User-Id") or request.headers.get("x-user-id")
+        if auth_header:
+            user_id = auth_header
+
+    try:
+        ranked_results = await run_in_threadpool(load_ranked_results, user_id, session_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return ORJSONResponse(content={
+        "status": "success", **results_page(ranked_results, top_k, offset, limit, fields)
+    })
+
+
+@router.get("/rank/results/{rank}")
+async def get_ranked_result_detail(
+    rank: int,
+    request: Request = None,
+    session_id: Optional[str] = Query(None, description="Session to read (default: current)"),
+    file: Optional[str] = Query(None, description="Also require this file name")
+):
+    """
+    Full evaluation (parsed resume, strengths, concerns, reasoning) for one
+    candidate of the session's last saved ranking.
+    """
+    user_id = "guest"
+    if request is not None:
+        auth_header = request.headers.get("X-User-Id") or request.headers.get("x-user-id")
+        if auth_header:
+            user_id = auth_header
+
+    try:
+        ranked_results = await run_in_threadpool(load_ranked_results, user_id, session_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    result = find_result(ranked_results, rank=rank, file=file)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    return ORJSONResponse(content={"status": "success", "result": result})
@@ -7,7 +7,9 @@ import shutil
 # from app.routers.azure_auth import get_current_user_azure
 from app.services.blob_storage import blob_storage
 from fastapi import Request
-from app.services.parser import parse_resume, parse_zip
+from starlette.concurrency import run_in_threadpool
+from app.services.parser import parse_resume_bytes, parse_zip_bytes, store_completed_parse
+from app.services.session_index import update_session_index
 
 router = APIRouter(prefix="/api", tags=["resumes"])
 
@@ -22,8 +24,6 @@ async def upload_resume(resume: List[UploadFile] = File(...), request: Request =
     The frontend should send multiple files under the same field name "resume".
     """
     try:
-        import tempfile
-
         results = []
 
         user_id = "guest"
@@ -41,43 +41,54 @@ async def upload_resume(resume: List[UploadFile] = File(...), request: Request =
 
             # Upload to Azure Blob Storage using session-based structure
             blob_name = f"raw_resumes/{uploaded_file.filename}"
-            blob_url = blob_storage.upload_file_session(file_content, blob_name, user_id)
+            blob_url, fingerprint = await run_in_threadpool(
+                blob_storage.upload_file_session_fingerprinted, file_content, blob_name, user_id
+            )
 
-            # Create a temporary file for parsing (since parser expects file paths)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-                temp_file.write(file_content)
-                temp_path = temp_file.name
+            # Parse from memory off the event loop; nothing is written to temporary files.
+            # The parse is cached under the blob's fingerprint, so ranking does not parse it again.
+            if file_ext == ".zip":
+                # parse_zip_bytes runs its own event loop for parallel member parsing
+                parsed_list = await run_in_threadpool(parse_zip_bytes, file_content)
+                await run_in_threadpool(store_completed_parse, blob_name, fingerprint, parsed_list, user_id)
+                results.append({
+                    "status": "success",
+                    "file": uploaded_file.filename,
+                    "parsed": parsed_list,
+                    "blob_url": blob_url,
+                    "blob_name": blob_name,
+                    "type": "zip"
+                })
+            elif file_ext in [".pdf", ".docx", ".txt"]:
+                parsed = await run_in_threadpool(parse_resume_bytes, file_content, uploaded_file.filename)
+                await run_in_threadpool(store_completed_parse, blob_name, fingerprint, [parsed], user_id)
+                results.append({
+                    "status": "success",
+                    "file": uploaded_file.filename,
+                    "parsed": parsed,
+                    "blob_url": blob_url,
+                    "blob_name": blob_name,
+                    "type": "file"
+                })
+            else:
+                results.append({
+                    "status": "error",
+                    "file": uploaded_file.filename,
+                    "error": f"Unsupported file format: {file_ext}"
+                })
 
-            try:
-                if file_ext == ".zip":
-                    parsed_list = parse_zip(temp_path)
-                    results.append({
-                        "status": "success",
-                        "file": uploaded_file.filename,
-                        "parsed": parsed_list,
-                        "blob_url": blob_url,
-                        "blob_name": blob_name,
-                        "type": "zip"
-                    })
-                elif file_ext in [".pdf", ".docx", ".txt"]:
-                    parsed = parse_resume(temp_path)
-                    results.append({
-                        "status": "success",
-                        "file": uploaded_file.filename,
-                        "parsed": parsed,
-                        "blob_url": blob_url,
-                        "blob_name": blob_name,
-                        "type": "file"
-                    })
+        # Add the new resumes to the session's inverted index used for keyword retrieval
+        indexed = []
+        for result in results:
+            if result["status"] == "success":
+                if result["type"] == "zip":
+                    indexed.extend(result["parsed"])
                 else:
-                    results.append({
-                        "status": "error",
-                        "file": uploaded_file.filename,
-                        "error": f"Unsupported file format: {file_ext}"
-                    })
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_path)
+                    indexed.append(result["parsed"])
+        try:
+            await run_in_threadpool(update_session_index, user_id, indexed)
+        except Exception as e:
+            print(f"Failed to update session index: {e}")
 
         return JSONResponse(content={"status": "success", "results": results})
 
@@ -1,5 +1,6 @@
 import os
 import io
+import hashlib
 import json
 import csv
 from datetime import datetime
@@ -313,6 +314,29 @@ class BlobStorageService:
         blob_client.upload_blob(file_content, overwrite=True)
         return blob_client.url
     
+    def upload_file_session_fingerprinted(self, file_content: bytes, blob_name: str, user_id: str,
+                                          session_id: Optional[str] = None) -> Tuple[str, str]:
+        """Upload a file to a user's session folder with its Content-MD5 set.
+        
+        Chunked uploads do not get a Content-MD5 from the service, so it is set
+        explicitly; list_blob_properties_session then reports the same fingerprint.
+        
+        Returns:
+            (URL of the uploaded blob, fingerprint)
+        """
+        session_path = self.get_session_path(user_id, session_id)
+        full_blob_name = f"{session_path}{blob_name}"
+        
+        md5 = hashlib.md5(file_content).digest()
+        blob_client = self.blob_service_client.get_blob_client(
+            container=self.container_name,
+            blob=full_blob_name
+        )
+        blob_client.upload_blob(
+            file_content, overwrite=True, content_settings=ContentSettings(content_md5=bytearray(md5))
+        )
+        return blob_client.url, md5.hex()
+    
     def download_file_session(self, blob_name: str, user_id: str, session_id: Optional[str] = None) -> bytes:
         """Download a file from a user's session folder.
         
@@ -355,6 +379,41 @@ class BlobStorageService:
         session_prefix_len = len(session_path)
         return [blob.name[session_prefix_len:] for blob in blobs]
     
+    def list_blob_properties_session(self, user_id: str, session_id: Optional[str] = None, prefix: str = "") -> List[Dict]:
+        """List blobs in a user's session folder together with their change fingerprints.
+        
+        Args:
+            user_id: User identifier
+            session_id: Optional session ID, uses current if None
+            prefix: Additional prefix filter within the session (e.g., 'raw_resumes/')
+            
+        Returns:
+            List of dicts with 'name' (relative to session path), 'etag',
+            'content_md5' (hex, may be None), 'size' and 'fingerprint'
+            (content MD5 when available, otherwise the ETag)
+        """
+        session_path = self.get_session_path(user_id, session_id)
+        full_prefix = f"{session_path}{prefix}"
+        
+        container_client = self.blob_service_client.get_container_client(self.container_name)
+        blobs = container_client.list_blobs(name_starts_with=full_prefix)
+        
+        session_prefix_len = len(session_path)
+        results = []
+        for blob in blobs:
+            content_settings = getattr(blob, 'content_settings', None)
+            md5 = getattr(content_settings, 'content_md5', None) if content_settings else None
+            content_md5 = bytes(md5).hex() if md5 else None
+            etag = (getattr(blob, 'etag', None) or '').strip('"') or None
+            results.append({
+                'name': blob.name[session_prefix_len:],
+                'etag': etag,
+                'content_md5': content_md5,
+                'size': getattr(blob, 'size', None),
+                'fingerprint': content_md5 or etag
+            })
+        return results
+    
     def list_user_sessions(self, user_id: str) -> List[Dict[str, str]]:
         """List all sessions for a user with metadata.
         
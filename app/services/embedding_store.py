@@ -0,0 +1,170 @@
+"""
+Per-session embedding store.
+Keeps resume embeddings as one contiguous, L2-normalized float32 matrix with an
+id index, persisted as .npy and memory-mapped on load, so scoring a job
+description is a single matrix-vector product.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import EMBEDDING_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+MATRIX_FILE = "embeddings.npy"
+IDS_FILE = "ids.json"
+
+
+def embedding_id(text: str) -> str:
+    """Content-addressed id for an embedded text, so edited resumes get new rows."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def session_store_dir(session_key: str) -> str:
+    """Local directory for a session's store (session_key is the blob session path)."""
+    safe_key = "".join(ch if ch.isalnum() or ch in "@.-_" else "_" for ch in session_key.strip("/"))
+    return os.path.join(EMBEDDING_STORE_DIR, safe_key or "default")
+
+
+class EmbeddingStore:
+    """
+    Contiguous float32 matrix of normalized embeddings addressed by id.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    @classmethod
+    def load(cls, directory: str) -> "EmbeddingStore":
+        """Open a saved store with the matrix memory-mapped; returns an empty store if none exists."""
+        store = cls(directory)
+        matrix_path = os.path.join(directory, MATRIX_FILE)
+        ids_path = os.path.join(directory, IDS_FILE)
+        if not (os.path.exists(matrix_path) and os.path.exists(ids_path)):
+            return store
+        try:
+            with open(ids_path, "r", encoding="utf-8") as f:
+                ids = json.load(f)
+            matrix = np.load(matrix_path, mmap_mode="r")
+            if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+                raise ValueError("embedding matrix and id index are out of sync")
+            store.ids = ids
+            store._index = {id_: i for i, id_ in enumerate(ids)}
+            store.matrix = matrix
+        except Exception as e:
+            logger.warning(f"Discarding unreadable embedding store at {directory}: {str(e)}")
+        return store
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dimension(self) -> int:
+        return self.matrix.shape[1] if self.matrix.size else 0
+
+    def missing(self, ids: Sequence[str]) -> List[str]:
+        """Ids not yet stored, in input order without duplicates."""
+        seen = set()
+        result = []
+        for id_ in ids:
+            if id_ not in self._index and id_ not in seen:
+                seen.add(id_)
+                result.append(id_)
+        return result
+
+    def upsert(self, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Add or replace rows; vectors are normalized on the way in."""
+        pairs = [(id_, vec) for id_, vec in zip(ids, vectors) if vec is not None and len(vec)]
+        if not pairs:
+            return
+        new = np.asarray([vec for _, vec in pairs], dtype=np.float32)
+        norms = np.linalg.norm(new, axis=1, keepdims=True)
+        new /= np.where(norms == 0, 1.0, norms)
+
+        if self.dimension and new.shape[1] != self.dimension:
+            # Embedding model changed; old rows are not comparable
+            logger.info("Embedding dimension changed; resetting store")
+            self.ids, self._index = [], {}
+            self.matrix = np.zeros((0, new.shape[1]), dtype=np.float32)
+
+        # Copy out of any memory map before growing the matrix
+        matrix = np.array(self.matrix, dtype=np.float32) if self.matrix.size else np.zeros((0, new.shape[1]), dtype=np.float32)
+        append_rows = []
+        for (id_, _), row in zip(pairs, new):
+            if id_ in self._index:
+                matrix[self._index[id_]] = row
+            else:
+                self._index[id_] = len(self.ids)
+                self.ids.append(id_)
+                append_rows.append(row)
+        if append_rows:
+            matrix = np.vstack([matrix, np.asarray(append_rows, dtype=np.float32)])
+        self.matrix = np.ascontiguousarray(matrix)
+
+    def retain(self, ids: Sequence[str]) -> None:
+        """Drop rows whose ids are not in ids (e.g. deleted or edited resumes)."""
+        wanted = set(ids)
+        keep = [i for i, id_ in enumerate(self.ids) if id_ in wanted]
+        if len(keep) == len(self.ids):
+            return
+        self.matrix = np.ascontiguousarray(np.asarray(self.matrix, dtype=np.float32)[keep])
+        self.ids = [self.ids[i] for i in keep]
+        self._index = {id_: i for i, id_ in enumerate(self.ids)}
+
+    def save(self) -> None:
+        """Write the matrix and id index atomically to the store directory."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Materialize before replacing files that may be memory-mapped
+        matrix = np.ascontiguousarray(np.array(self.matrix, dtype=np.float32))
+        self.matrix = matrix
+        matrix_path = os.path.join(self.directory, MATRIX_FILE)
+        ids_path = os.path.join(self.directory, IDS_FILE)
+        tmp_matrix = matrix_path + ".tmp.npy"
+        np.save(tmp_matrix, matrix)
+        os.replace(tmp_matrix, matrix_path)
+        with open(ids_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.ids, f)
+        os.replace(ids_path + ".tmp", ids_path)
+
+    def _normalized_query(self, query: Sequence[float]) -> Optional[np.ndarray]:
+        if query is None or not len(query) or not self.dimension:
+            return None
+        q = np.asarray(query, dtype=np.float32)
+        if q.shape[0] != self.dimension:
+            return None
+        norm = np.linalg.norm(q)
+        return q / norm if norm else None
+
+    def scores(self, query: Sequence[float], ids: Sequence[str]) -> np.ndarray:
+        """Cosine similarity of query against the given ids (0.0 for unknown ids)."""
+        result = np.zeros(len(ids), dtype=np.float32)
+        q = self._normalized_query(query)
+        if q is None:
+            return result
+        positions = [(i, self._index[id_]) for i, id_ in enumerate(ids) if id_ in self._index]
+        if positions:
+            out_idx, rows = zip(*positions)
+            result[list(out_idx)] = self.matrix[list(rows)] @ q
+        return result
+
+    def top_k(self, query: Sequence[float], k: int) -> List[Tuple[str, float]]:
+        """Best k (id, cosine) pairs over the whole store, highest first."""
+        q = self._normalized_query(query)
+        if q is None or k <= 0:
+            return []
+        sims = self.matrix @ q
+        k = min(k, sims.shape[0])
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(self.ids[i], float(sims[i])) for i in top]
@@ -1,13 +1,11 @@
+import logging
 from typing import List, Dict
-from openai import AzureOpenAI
 
-# Configure Azure OpenAI (Embeddings)
-client = AzureOpenAI(
-    api_key="CYAwdpz6QRguMec53YUv1imw8Asf1s97jz1HwpuCUNPIsylrqkwnJQQJ99BJAC77bzfXJ3w3AAABACOGZ5GD",
-    api_version="2024-12-01-preview",
-    azure_endpoint="https://embedderresume.openai.azure.com/"
-)
+from app.config import EMBEDDING_BATCH_MAX_ITEMS, EMBEDDING_BATCH_MAX_TOKENS
+from app.services.openai_clients import openai_clients, EMBEDDINGS
+from app.services.openai_scheduler import create_embeddings
 
+logger = logging.getLogger(__name__)
 
 def get_text_embedding(text: str, model: str = "text-embedding-3-large") -> List[float]:
     """
@@ -16,13 +14,96 @@ def get_text_embedding(text: str, model: str = "text-embedding-3-large") -> List
     if not text or len(text.strip()) == 0:
         return []
 
-    response = client.embeddings.create(
-        input=text,
-        model=model  # Azure deployment name for embeddings
+    return get_text_embeddings([text], model=model)[0]
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for batch sizing."""
+    return len(text) // 4 + 1
+
+
+def _plan_batches(texts: List[str], indices: List[int], max_items: int, max_tokens: int) -> List[List[int]]:
+    """
+    Group text indices into request-sized batches, preserving input order.
+    A single text larger than max_tokens is sent on its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i in indices:
+        tokens = _estimate_tokens(texts[i])
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _embed_batch(texts: List[str], batch: List[int], model: str, results: List[List[float]]) -> None:
+    """
+    Embed one batch into results. Throttling and transient errors are retried
+    by the scheduler; a batch that still fails is split in half so only the
+    failing part is retried again.
+    """
+    try:
+        response = create_embeddings(
+            openai_clients.get_client(EMBEDDINGS),
+            input=[texts[i] for i in batch],
+            model=model  # Azure deployment name for embeddings
+        )
+    except Exception as e:
+        if len(batch) == 1:
+            raise
+        logger.warning(f"Embedding batch of {len(batch)} failed, splitting: {str(e)}")
+        middle = len(batch) // 2
+        _embed_batch(texts, batch[:middle], model, results)
+        _embed_batch(texts, batch[middle:], model, results)
+        return
+
+    # Response items carry their position in the request
+    for item in sorted(response.data, key=lambda d: d.index):
+        results[batch[item.index]] = item.embedding
+
+
+def get_text_embeddings(texts: List[str], model: str = "text-embedding-3-large",
+                        max_items: int = None, max_tokens: int = None) -> List[List[float]]:
+    """
+    Generate embeddings for many texts using as few requests as possible.
+
+    Args:
+        texts: Texts to embed
+        model: Azure deployment name for embeddings
+        max_items: Inputs per request (default EMBEDDING_BATCH_MAX_ITEMS)
+        max_tokens: Estimated tokens per request (default EMBEDDING_BATCH_MAX_TOKENS)
+
+    Returns:
+        One embedding per input, in input order ([] for empty texts)
+    """
+    results: List[List[float]] = [[] for _ in texts]
+    indices = [i for i, text in enumerate(texts) if text and text.strip()]
+    if not indices:
+        return results
+
+    batches = _plan_batches(
+        texts, indices,
+        max(1, max_items or EMBEDDING_BATCH_MAX_ITEMS),
+        max(1, max_tokens or EMBEDDING_BATCH_MAX_TOKENS)
     )
+    for batch in batches:
+        _embed_batch(texts, batch, model, results)
+    return results
 
-    embedding_vector = response.data[0].embedding
-    return embedding_vector
+
+def build_resume_embedding_text(preprocessed_data: Dict) -> str:
+    """
+    Combine cleaned text + skills to improve embedding quality.
+    """
+    cleaned_text = preprocessed_data.get("cleaned_text", "")
+    skills = " ".join(preprocessed_data.get("skills", []))
+    return f"{cleaned_text}\nSkills: {skills}"
 
 
 def generate_resume_embedding(preprocessed_data: Dict) -> Dict:
@@ -30,15 +111,20 @@ def generate_resume_embedding(preprocessed_data: Dict) -> Dict:
     Generate embeddings for preprocessed resume data.
     Uses the cleaned_text field as input for semantic representation.
     """
-    cleaned_text = preprocessed_data.get("cleaned_text", "")
-    skills = " ".join(preprocessed_data.get("skills", []))
+    return generate_resume_embeddings([preprocessed_data])[0]
 
-    # Combine cleaned text + skills to improve embedding quality
-    combined_text = f"{cleaned_text}\nSkills: {skills}"
 
-    embedding = get_text_embedding(combined_text)
-    return {
-        "text": combined_text,
-        "embedding": embedding,
-        "vector_length": len(embedding)
-    }
+def generate_resume_embeddings(preprocessed_list: List[Dict]) -> List[Dict]:
+    """
+    Batch variant of generate_resume_embedding; results follow input order.
+    """
+    combined_texts = [build_resume_embedding_text(p) for p in preprocessed_list]
+    embeddings = get_text_embeddings(combined_texts)
+    return [
+        {
+            "text": combined_text,
+            "embedding": embedding,
+            "vector_length": len(embedding)
+        }
+        for combined_text, embedding in zip(combined_texts, embeddings)
+    ]
@@ -5,9 +5,15 @@ Handles PDF, DOCX, and TXT files with improved text quality and formatting prese
 
 import os
 import re
-import tempfile
 import io
-from typing import Dict, List, Optional, Tuple
+import multiprocessing
+import multiprocessing.util
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 
 # Multiple PDF extraction libraries for fallback
@@ -17,9 +23,264 @@ import PyPDF2
 import docx2txt
 from docx import Document
 
+from app.config import (
+    PDF_PROBE_MIN_QUALITY, PDF_ADAPT_MIN_SAMPLES, PDF_MAX_PAGES, PDF_MAX_CHARS, PDF_PAGE_WORKERS,
+    PDF_PARALLEL_MIN_PAGES, PDF_PAGES_PER_TASK, PROCESS_POOL_START_METHOD
+)
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Quality at which no further method is tried (non-PDF formats)
+HIGH_QUALITY_SCORE = 0.85
+
+# Text cleanup patterns, compiled once and applied in this order
+
+# Letters split by whitespace, then short fragments between letters
+_SPLIT_LETTERS_RE = re.compile(r'([a-z])(\s+)([a-z])', re.IGNORECASE)
+_SPLIT_FRAGMENT_RE = re.compile(r'([a-z])\s+([a-z]{1,2})\s+([a-z])', re.IGNORECASE)
+
+# Commonly bisected terms with fragments every match contains (lowercase); a
+# pattern only runs when the text has all of its fragments
+_BISECTED_TERMS = [
+    (re.compile(r'Ja\s*v\s*a\s*Script', re.IGNORECASE), 'JavaScript', ('ja', 'script')),
+    (re.compile(r'sen\s*ti\s*men\s*t', re.IGNORECASE), 'sentiment', ('sen', 'ti', 'men')),
+    (re.compile(r'mo\s*v\s*emen\s*t', re.IGNORECASE), 'movement', ('mo', 'emen')),
+    (re.compile(r'ey\s*e\s*s', re.IGNORECASE), 'eyes', ('ey',)),
+    (re.compile(r'universit\s*y', re.IGNORECASE), 'university', ('universit',)),
+    (re.compile(r'T\s*ec\s*hnology', re.IGNORECASE), 'Technology', ('ec', 'hnology')),
+    (re.compile(r'programmin\s*g', re.IGNORECASE), 'programming', ('programmin',)),
+]
+
+# Non-ASCII characters that IGNORECASE matches to ASCII letters but str.lower()
+# does not map to them; fragment checks are skipped when any is present
+_CASELESS_LETTER_VARIANTS = ('\u0130', '\u0131', '\u017f', '\u212a')
+
+# "name @ domain"; only tried at the start of an alphanumeric run (a match
+# cannot start inside one), and only when whitespace precedes an "@"
+_SPACED_EMAIL_RE = re.compile(r'(?<![a-z0-9])([a-z0-9]+)\s+@\s+([a-z0-9]+)', re.IGNORECASE)
+_SPACE_BEFORE_AT_RE = re.compile(r'\s@')
+
+# Whitespace: at most 2 consecutive newlines, runs of spaces or tabs to one space
+_WHITESPACE_RE = re.compile(r'\n\s*\n\s*\n| {2,}|\t+')
+
+_HYPHENATED_BREAK_RE = re.compile(r'([a-z])-\s*\n\s*([a-z])', re.IGNORECASE)
+
+# Quality signals
+_BROKEN_WORD_RE = re.compile(r'\b[a-zA-Z]\s+[a-zA-Z]\s*')
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PHONE_RE = re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b')
+
+
+def _replace_whitespace(match: re.Match) -> str:
+    return '\n\n' if match.group()[0] == '\n' else ' '
+
+
+# ========== PDF page ranges ==========
+# A page is (text, formatted table texts). The range functions are module-level
+# so the page pool can run them; each stops once max_chars (0 = no limit) are extracted.
+
+PdfPage = Tuple[str, List[str]]
+
+
+def _page_chars(page: PdfPage) -> int:
+    text, tables = page
+    return len(text) + sum(len(table) for table in tables)
+
+
+def _pdfplumber_pages(file_bytes: bytes, start: int, stop: int, max_chars: int = 0) -> List[PdfPage]:
+    pages = []
+    extracted = 0
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        for page in pdf.pages[start:stop]:
+            # Extract text with layout preservation, plus tables for structured data
+            text = page.extract_text(layout=True, x_tolerance=2, y_tolerance=2) or ""
+            tables = [enhanced_extractor._format_table_as_text(table) for table in page.extract_tables()]
+            pages.append((text, tables))
+            extracted += _page_chars(pages[-1])
+            if max_chars and extracted >= max_chars:
+                break
+    return pages
+
+
+def _pymupdf_pages(file_bytes: bytes, start: int, stop: int, max_chars: int = 0) -> List[PdfPage]:
+    pages = []
+    extracted = 0
+    with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+        for number in range(start, min(stop, doc.page_count)):
+            pages.append((doc[number].get_text("text"), []))
+            extracted += len(pages[-1][0])
+            if max_chars and extracted >= max_chars:
+                break
+    return pages
+
+
+# ========== Extraction process pools ==========
+
+_in_pool_worker = False
+
+
+def mark_pool_worker() -> None:
+    """Initializer for extraction pools: their workers never start pools of their own."""
+    global _in_pool_worker
+    _in_pool_worker = True
+
+
+def can_start_pool() -> bool:
+    """False inside extraction pool workers and daemon processes, which cannot have children."""
+    return not _in_pool_worker and not multiprocessing.current_process().daemon
+
+
+def process_pool_context():
+    """Multiprocessing context for extraction pools (PROCESS_POOL_START_METHOD, else spawn)."""
+    method = PROCESS_POOL_START_METHOD
+    if method not in multiprocessing.get_all_start_methods():
+        method = "spawn"
+    return multiprocessing.get_context(method)
+
+
+def new_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Extraction pool whose workers cannot start pools of their own. It is shut
+    down by multiprocessing's exit handler too, which otherwise waits forever
+    for its workers when this process is itself a multiprocessing child
+    (uvicorn --workers/--reload).
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=process_pool_context(), initializer=mark_pool_worker
+    )
+    # Ahead of the pool queues' own finalizers (priority 10), which would drop the stop sentinels
+    multiprocessing.util.Finalize(None, pool.shutdown, kwargs={"cancel_futures": True}, exitpriority=20)
+    return pool
+
+
+_page_pool = None
+_page_pool_disabled = False
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool():
+    """Shared process pool for page ranges; None for serial extraction."""
+    global _page_pool
+    if PDF_PAGE_WORKERS <= 1 or _page_pool_disabled or not can_start_pool():
+        return None
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = new_process_pool(PDF_PAGE_WORKERS)
+        return _page_pool
+
+
+def _discard_page_pool(pool, disable: bool = False) -> None:
+    """Drop a broken pool; with disable, pages are extracted serially for the rest of the process."""
+    global _page_pool, _page_pool_disabled
+    with _page_pool_lock:
+        if disable:
+            _page_pool_disabled = True
+        if _page_pool is pool:
+            _page_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_pdf_pages(page_range: Callable, file_bytes: bytes, page_count: int) -> List[PdfPage]:
+    """
+    Pages in order, up to PDF_MAX_PAGES and stopping after the page that
+    reaches PDF_MAX_CHARS. Documents with PDF_PARALLEL_MIN_PAGES or more pages
+    are split into PDF_PAGES_PER_TASK ranges run in the page pool, one wave
+    of PDF_PAGE_WORKERS ranges at a time, so a reached budget skips the
+    remaining waves. Returns the same pages as a serial pass.
+    """
+    limit = min(page_count, PDF_MAX_PAGES) if PDF_MAX_PAGES > 0 else page_count
+    pool = _get_page_pool() if limit >= max(2, PDF_PARALLEL_MIN_PAGES) else None
+    if pool is None:
+        return page_range(file_bytes, 0, limit, PDF_MAX_CHARS)
+
+    step = max(1, PDF_PAGES_PER_TASK)
+    ranges = [(start, min(start + step, limit)) for start in range(0, limit, step)]
+    pages: List[PdfPage] = []
+    extracted = 0
+    for wave in range(0, len(ranges), PDF_PAGE_WORKERS):
+        remaining = PDF_MAX_CHARS - extracted if PDF_MAX_CHARS > 0 else 0
+        try:
+            futures = [pool.submit(page_range, file_bytes, start, stop, remaining)
+                       for start, stop in ranges[wave:wave + PDF_PAGE_WORKERS]]
+        except Exception as e:
+            # Workers start on submit; a pool that cannot start stays off for this process
+            logger.warning(f"PDF page pool unavailable, extracting serially: {str(e)}")
+            _discard_page_pool(pool, disable=not isinstance(e, BrokenProcessPool))
+            return page_range(file_bytes, 0, limit, PDF_MAX_CHARS)
+        try:
+            chunks = [future.result() for future in futures]
+        except BrokenProcessPool:
+            logger.warning("PDF page pool failed, extracting serially")
+            _discard_page_pool(pool)
+            return page_range(file_bytes, 0, limit, PDF_MAX_CHARS)
+        for chunk in chunks:
+            for page in chunk:
+                pages.append(page)
+                extracted += _page_chars(page)
+                if PDF_MAX_CHARS > 0 and extracted >= PDF_MAX_CHARS:
+                    return pages
+    return pages
+
+
+class ExtractionStats:
+    """
+    Per-method attempt, failure and win counts and time spent, for this
+    process. A method wins a document when its result is the one returned.
+    Totals are logged every LOG_EVERY documents; pool workers log their own.
+    """
+
+    LOG_EVERY = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict] = {}
+        self._documents = 0
+
+    def _entry(self, method: str) -> Dict:
+        return self._totals.setdefault(method, {"attempts": 0, "failures": 0, "wins": 0, "seconds": 0.0})
+
+    def record(self, method: str, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            entry = self._entry(method)
+            entry["attempts"] += 1
+            entry["failures"] += int(failed)
+            entry["seconds"] += seconds
+
+    def record_win(self, method: str) -> None:
+        with self._lock:
+            self._entry(method)["wins"] += 1
+            self._documents += 1
+            log_now = self._documents % self.LOG_EVERY == 0
+        if log_now:
+            logger.info(f"Text extraction stats (pid {os.getpid()}): {self.stats()}")
+
+    def order(self, methods: List[Callable]) -> List[Callable]:
+        """
+        Methods by smoothed win rate per second spent, best first; the given
+        order is kept until every method has PDF_ADAPT_MIN_SAMPLES attempts.
+        """
+        with self._lock:
+            totals = {m.__name__: dict(self._entry(m.__name__)) for m in methods}
+        if any(t["attempts"] < PDF_ADAPT_MIN_SAMPLES for t in totals.values()):
+            return list(methods)
+
+        def value(method: Callable) -> float:
+            t = totals[method.__name__]
+            win_rate = (t["wins"] + 1) / (t["attempts"] + 2)
+            return win_rate / max(t["seconds"] / t["attempts"], 1e-3)
+
+        return sorted(methods, key=value, reverse=True)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                method: dict(t, mean_seconds=t["seconds"] / t["attempts"] if t["attempts"] else 0.0)
+                for method, t in self._totals.items()
+            }
+
+
 class EnhancedTextExtractor:
     """
     Advanced text extractor that handles various document formats with improved quality.
@@ -27,11 +288,13 @@ class EnhancedTextExtractor:
     """
     
     def __init__(self):
+        # PDFs: the first method is the quick probe, the rest are escalations (see _plan)
         self.extraction_methods = {
-            '.pdf': [self._extract_pdf_pdfplumber, self._extract_pdf_pymupdf, self._extract_pdf_pypdf2],
+            '.pdf': [self._extract_pdf_pymupdf, self._extract_pdf_pdfplumber, self._extract_pdf_pypdf2],
             '.docx': [self._extract_docx_python_docx, self._extract_docx_docx2txt],
             '.txt': [self._extract_txt]
         }
+        self.stats = ExtractionStats()
     
     def extract_text(self, file_path: str) -> Dict[str, str]:
         """
@@ -52,66 +315,84 @@ class EnhancedTextExtractor:
         if ext not in self.extraction_methods:
             raise ValueError(f"Unsupported file format: {ext}")
         
+        # Read once; every method works on the same in-memory content
+        with open(file_path, 'rb') as file:
+            file_bytes = file.read()
+        
+        return self._extract(file_bytes, ext)
+    
+    def extract_text_from_bytes(self, file_bytes, file_extension: str) -> Dict[str, str]:
+        """
+        Extract text from file bytes or a binary stream (for blob storage and uploads).
+        Nothing is written to disk; returns the same dictionary as extract_text.
+        """
+        ext = file_extension.lower()
+        
+        if ext not in self.extraction_methods:
+            raise ValueError(f"Unsupported file format: {ext}")
+        
+        if not isinstance(file_bytes, (bytes, bytearray, memoryview)):
+            file_bytes = file_bytes.read()
+        
+        return self._extract(bytes(file_bytes), ext)
+    
+    def _plan(self, ext: str) -> Tuple[List[Callable], float]:
+        """
+        Methods to try in order, and the quality that ends the search.
+
+        PDFs start with the PyMuPDF probe, which is an order of magnitude
+        cheaper than pdfplumber's layout and table extraction; the
+        escalations are ordered by how often and how cheaply they have won.
+        """
+        methods = self.extraction_methods[ext]
+        if ext != '.pdf':
+            return methods, HIGH_QUALITY_SCORE
+        probe, *escalations = methods
+        return [probe] + self.stats.order(escalations), PDF_PROBE_MIN_QUALITY
+    
+    def _extract(self, file_bytes: bytes, ext: str) -> Dict[str, str]:
         best_result = None
         best_score = 0
+        methods, good_enough = self._plan(ext)
         
-        # Try multiple extraction methods and pick the best
-        for method in self.extraction_methods[ext]:
+        # Try methods in order and pick the best
+        for method in methods:
+            started = time.perf_counter()
             try:
-                result = method(file_path)
+                result = method(file_bytes)
                 quality_score = self._assess_text_quality(result['raw_text'])
                 result['quality_score'] = quality_score
-                
-                if quality_score > best_score:
-                    best_result = result
-                    best_score = quality_score
-                    
-                # If we get high quality, don't try other methods
-                if quality_score > 0.85:
-                    break
-                    
             except Exception as e:
+                self.stats.record(method.__name__, time.perf_counter() - started, failed=True)
                 logger.warning(f"Extraction method {method.__name__} failed: {str(e)}")
                 continue
+            self.stats.record(method.__name__, time.perf_counter() - started)
+            
+            if quality_score > best_score:
+                best_result = result
+                best_score = quality_score
+                best_method = method.__name__
+                
+            # If we get high quality, don't try other methods
+            if quality_score > good_enough:
+                break
         
         if not best_result:
             raise Exception("All extraction methods failed")
         
+        self.stats.record_win(best_method)
         return best_result
     
-    def extract_text_from_bytes(self, file_bytes: bytes, file_extension: str) -> Dict[str, str]:
-        """
-        Extract text from file bytes (for blob storage integration).
-        """
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_file:
-            temp_file.write(file_bytes)
-            temp_path = temp_file.name
-        
-        try:
-            return self.extract_text(temp_path)
-        finally:
-            os.unlink(temp_path)
-    
     # PDF Extraction Methods
     
-    def _extract_pdf_pdfplumber(self, file_path: str) -> Dict[str, str]:
+    def _extract_pdf_pdfplumber(self, file_bytes: bytes) -> Dict[str, str]:
         """Extract PDF text using pdfplumber (best for complex layouts)."""
-        text_parts = []
-        formatted_parts = []
+        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+            page_count = len(pdf.pages)
+        pages = extract_pdf_pages(_pdfplumber_pages, file_bytes, page_count)
         
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                # Extract text with layout preservation
-                page_text = page.extract_text(layout=True, x_tolerance=2, y_tolerance=2)
-                if page_text:
-                    text_parts.append(page_text)
-                
-                # Try table extraction for structured data
-                tables = page.extract_tables()
-                for table in tables:
-                    table_text = self._format_table_as_text(table)
-                    formatted_parts.append(table_text)
+        text_parts = [text for text, _ in pages if text]
+        formatted_parts = [table for _, tables in pages for table in tables]
         
         raw_text = '\n'.join(text_parts + formatted_parts)
         cleaned_text = self._clean_extracted_text(raw_text)
@@ -122,18 +403,13 @@ class EnhancedTextExtractor:
             'extraction_method': 'pdfplumber'
         }
     
-    def _extract_pdf_pymupdf(self, file_path: str) -> Dict[str, str]:
+    def _extract_pdf_pymupdf(self, file_bytes: bytes) -> Dict[str, str]:
         """Extract PDF text using PyMuPDF (good for text-heavy documents)."""
-        doc = fitz.open(file_path)
-        text_parts = []
-        
-        for page in doc:
-            # Get text with better formatting
-            text = page.get_text("text")
-            if text.strip():
-                text_parts.append(text)
+        with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+            page_count = doc.page_count
+        pages = extract_pdf_pages(_pymupdf_pages, file_bytes, page_count)
         
-        doc.close()
+        text_parts = [text for text, _ in pages if text.strip()]
         
         raw_text = '\n'.join(text_parts)
         cleaned_text = self._clean_extracted_text(raw_text)
@@ -144,16 +420,21 @@ class EnhancedTextExtractor:
             'extraction_method': 'pymupdf'
         }
     
-    def _extract_pdf_pypdf2(self, file_path: str) -> Dict[str, str]:
+    def _extract_pdf_pypdf2(self, file_bytes: bytes) -> Dict[str, str]:
         """Fallback PDF extraction using PyPDF2."""
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text_parts = []
-            
-            for page in reader.pages:
-                text = page.extract_text()
-                if text.strip():
-                    text_parts.append(text)
+        reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+        text_parts = []
+        extracted = 0
+        
+        # Same page and character limits as the other methods (serial)
+        pages = reader.pages if PDF_MAX_PAGES <= 0 else reader.pages[:PDF_MAX_PAGES]
+        for page in pages:
+            text = page.extract_text()
+            if text.strip():
+                text_parts.append(text)
+            extracted += len(text)
+            if PDF_MAX_CHARS > 0 and extracted >= PDF_MAX_CHARS:
+                break
         
         raw_text = '\n'.join(text_parts)
         cleaned_text = self._clean_extracted_text(raw_text)
@@ -166,9 +447,9 @@ class EnhancedTextExtractor:
     
     # DOCX Extraction Methods
     
-    def _extract_docx_python_docx(self, file_path: str) -> Dict[str, str]:
+    def _extract_docx_python_docx(self, file_bytes: bytes) -> Dict[str, str]:
         """Extract DOCX using python-docx library (preserves more structure)."""
-        doc = Document(file_path)
+        doc = Document(io.BytesIO(file_bytes))
         
         text_parts = []
         formatted_parts = []
@@ -193,9 +474,9 @@ class EnhancedTextExtractor:
             'extraction_method': 'python_docx'
         }
     
-    def _extract_docx_docx2txt(self, file_path: str) -> Dict[str, str]:
-        """Fallback DOCX extraction using docx2txt."""
-        raw_text = docx2txt.process(file_path)
+    def _extract_docx_docx2txt(self, file_bytes: bytes) -> Dict[str, str]:
+        """Fallback DOCX extraction using docx2txt (reads the DOCX zip package directly)."""
+        raw_text = docx2txt.process(io.BytesIO(file_bytes))
         cleaned_text = self._clean_extracted_text(raw_text)
         
         return {
@@ -206,14 +487,14 @@ class EnhancedTextExtractor:
     
     # TXT Extraction
     
-    def _extract_txt(self, file_path: str) -> Dict[str, str]:
+    def _extract_txt(self, file_bytes: bytes) -> Dict[str, str]:
         """Extract text from TXT files with encoding detection."""
         encodings = ['utf-8', 'latin-1', 'cp1252', 'ascii']
         
         for encoding in encodings:
             try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    raw_text = file.read()
+                # Universal newlines, as text-mode reads did
+                raw_text = file_bytes.decode(encoding).replace('\r\n', '\n').replace('\r', '\n')
                 cleaned_text = self._clean_extracted_text(raw_text)
                 
                 return {
@@ -238,10 +519,8 @@ class EnhancedTextExtractor:
         # Fix common text bisection issues
         text = self._fix_text_bisection(text)
         
-        # Clean up excessive whitespace
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)  # Max 2 consecutive newlines
-        text = re.sub(r' +', ' ', text)  # Multiple spaces to single space
-        text = re.sub(r'\t+', ' ', text)  # Tabs to spaces
+        # Clean up excessive whitespace (newlines, spaces and tabs in one pass)
+        text = _WHITESPACE_RE.sub(_replace_whitespace, text)
         
         # Fix broken words at line endings
         text = self._fix_line_break_words(text)
@@ -255,26 +534,23 @@ class EnhancedTextExtractor:
         """
         Fix common text bisection patterns found in PDF extraction.
         """
-        # Common bisection patterns
-        bisection_patterns = [
-            # Space in middle of words
-            (r'([a-z])(\s+)([a-z])', r'\1\3'),
-            # Broken compound words
-            (r'([a-z])\s+([a-z]{1,2})\s+([a-z])', r'\1\2\3'),
-            # Technology terms
-            (r'Ja\s*v\s*a\s*Script', 'JavaScript'),
-            (r'sen\s*ti\s*men\s*t', 'sentiment'),
-            (r'mo\s*v\s*emen\s*t', 'movement'),
-            (r'ey\s*e\s*s', 'eyes'),
-            (r'universit\s*y', 'university'),
-            (r'T\s*ec\s*hnology', 'Technology'),
-            (r'programmin\s*g', 'programming'),
-            # Email patterns
-            (r'([a-zA-Z0-9]+)(\s+)@(\s+)([a-zA-Z0-9]+)', r'\1@\4'),
-        ]
-        
-        for pattern, replacement in bisection_patterns:
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        # Space in middle of words, then broken compound words
+        text = _SPLIT_LETTERS_RE.sub(r'\1\3', text)
+        text = _SPLIT_FRAGMENT_RE.sub(r'\1\2\3', text)
+        
+        # Technology terms
+        check_fragments = not any(variant in text for variant in _CASELESS_LETTER_VARIANTS)
+        lowered = text.lower() if check_fragments else ""
+        for pattern, replacement, fragments in _BISECTED_TERMS:
+            if check_fragments and not all(fragment in lowered for fragment in fragments):
+                continue
+            text, count = pattern.subn(replacement, text)
+            if count and check_fragments:
+                lowered = text.lower()
+        
+        # Email patterns
+        if _SPACE_BEFORE_AT_RE.search(text):
+            text = _SPACED_EMAIL_RE.sub(r'\1@\2', text)
         
         return text
     
@@ -283,7 +559,7 @@ class EnhancedTextExtractor:
         Fix words broken across lines (hyphenation issues).
         """
         # Fix words broken with hyphens at line end
-        text = re.sub(r'([a-z])-\s*\n\s*([a-z])', r'\1\2', text, flags=re.IGNORECASE)
+        text = _HYPHENATED_BREAK_RE.sub(r'\1\2', text)
         
         # Fix words broken without hyphens (common in PDF extraction)
         lines = text.split('\n')
@@ -341,35 +617,37 @@ class EnhancedTextExtractor:
         """
         Assess the quality of extracted text (0-1 scale).
         Higher scores indicate better extraction quality.
+        
+        Signals come from one split of the text plus searches that stop as
+        soon as their threshold is decided.
         """
         if not text or len(text) < 50:
             return 0.0
         
         score = 1.0
+        words = text.split()
         
-        # Penalize excessive whitespace
-        whitespace_ratio = len(re.findall(r'\s+', text)) / len(text)
-        if whitespace_ratio > 0.3:
+        # Penalize excessive whitespace (whitespace runs, counted from the split)
+        whitespace_runs = len(words) - 1 + text[0].isspace() + text[-1].isspace() if words else 1
+        if whitespace_runs / len(text) > 0.3:
             score -= 0.2
         
         # Penalize broken words (single letters with spaces)
-        broken_words = len(re.findall(r'\b[a-zA-Z]\s+[a-zA-Z]\s*', text))
-        if broken_words > len(text.split()) * 0.1:
+        broken_limit = len(words) * 0.1
+        broken_words = sum(1 for _ in islice(_BROKEN_WORD_RE.finditer(text), int(broken_limit) + 1))
+        if broken_words > broken_limit:
             score -= 0.3
         
         # Reward complete sentences
-        sentences = re.findall(r'[.!?]+', text)
-        if len(sentences) > 5:
+        if sum(1 for _ in islice(_SENTENCE_END_RE.finditer(text), 6)) > 5:
             score += 0.1
         
         # Reward email patterns
-        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-        if emails:
+        if _EMAIL_RE.search(text):
             score += 0.1
         
         # Reward phone patterns
-        phones = re.findall(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b', text)
-        if phones:
+        if _PHONE_RE.search(text):
             score += 0.1
         
         return min(1.0, max(0.0, score))
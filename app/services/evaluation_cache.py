@@ -0,0 +1,215 @@
+"""
+Persistent cache for LLM resume evaluations.
+Entries are content-addressed by resume text, job description, model and prompt
+version, so re-ranking a session against the same job makes no LLM calls.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import EVAL_CACHE_PATH, EVAL_CACHE_MAX_ENTRIES, EVAL_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationCache:
+    """
+    SQLite-backed key/value store for evaluation JSON with LRU and TTL eviction.
+    Cache failures are logged and treated as misses so ranking never depends on it.
+    Calls block on SQLite; code on the event loop uses the *_async variants.
+    """
+
+    # Minimum seconds between TTL/LRU eviction passes
+    EVICT_INTERVAL_SECONDS = 300
+    # Keys per SELECT (below SQLite's bound-parameter limit)
+    QUERY_CHUNK = 500
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: float = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Keys read since the last write -> access time, written lazily
+        self._touched: Dict[str, float] = {}
+        self._last_eviction = 0.0
+
+    @staticmethod
+    def make_key(resume_text: str, job_description: str, model: str, prompt_version: str) -> str:
+        """
+        Build a content-addressed key from everything that influences the evaluation.
+        """
+        digest = hashlib.sha256()
+        for part in (prompt_version, model, job_description, resume_text):
+            digest.update((part or "").encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily and create the schema on first use."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS evaluations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_last_access ON evaluations(last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Return the cached evaluation for key, or None on miss/expiry.
+        """
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: List[str]) -> List[Optional[Dict]]:
+        """
+        Look up several keys in one query; None for each miss or expired entry.
+        Hits are only noted in memory: their last_access is written with the
+        next write, so reads never write to the database.
+        """
+        if not self.path or not keys:
+            return [None] * len(keys)
+        now = time.time()
+        try:
+            with self._lock:
+                rows = {}
+                conn = self._connect()
+                unique_keys = list(dict.fromkeys(keys))
+                for i in range(0, len(unique_keys), self.QUERY_CHUNK):
+                    chunk = unique_keys[i:i + self.QUERY_CHUNK]
+                    rows.update(
+                        (key, (value, created_at)) for key, value, created_at in conn.execute(
+                            f"SELECT key, value, created_at FROM evaluations "
+                            f"WHERE key IN ({', '.join('?' * len(chunk))})",
+                            chunk
+                        )
+                    )
+                results = []
+                for key in keys:
+                    value, created_at = rows.get(key, (None, 0.0))
+                    if value is None or (self.ttl_seconds and now - created_at > self.ttl_seconds):
+                        # Expired rows are left for the next eviction pass
+                        self.misses += 1
+                        results.append(None)
+                    else:
+                        self._touched[key] = now
+                        self.hits += 1
+                        results.append(value)
+            return [json.loads(value) if value is not None else None for value in results]
+        except Exception as e:
+            logger.warning(f"Evaluation cache read failed: {str(e)}")
+            self.misses += len(keys)
+            return [None] * len(keys)
+
+    def set(self, key: str, evaluation: Dict) -> None:
+        """Store one evaluation (see set_many)."""
+        self.set_many([(key, evaluation)])
+
+    def set_many(self, entries: List[Tuple[str, Dict]]) -> None:
+        """
+        Store (key, evaluation) pairs in one transaction. Pending last_access
+        updates are written with them, and TTL/LRU eviction runs at most once
+        every EVICT_INTERVAL_SECONDS.
+        """
+        if not self.path or not entries:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                for key, _ in entries:
+                    self._touched.pop(key, None)
+                self._flush_touched(conn)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO evaluations (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    [(key, json.dumps(evaluation), now, now) for key, evaluation in entries]
+                )
+                if now - self._last_eviction >= self.EVICT_INTERVAL_SECONDS:
+                    self._evict(conn, now)
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"Evaluation cache write failed: {str(e)}")
+
+    async def get_async(self, key: str) -> Optional[Dict]:
+        """get() in a worker thread, for callers on the event loop."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def get_many_async(self, keys: List[str]) -> List[Optional[Dict]]:
+        """get_many() in a worker thread, for callers on the event loop."""
+        return await asyncio.to_thread(self.get_many, keys)
+
+    async def set_async(self, key: str, evaluation: Dict) -> None:
+        """set() in a worker thread, for callers on the event loop."""
+        await asyncio.to_thread(self.set, key, evaluation)
+
+    async def set_many_async(self, entries: List[Tuple[str, Dict]]) -> None:
+        """set_many() in a worker thread, for callers on the event loop."""
+        await asyncio.to_thread(self.set_many, entries)
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        """Write last_access for entries read since the last write (caller holds the lock)."""
+        if self._touched:
+            conn.executemany(
+                "UPDATE evaluations SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least-recently-used ones beyond max_entries (caller holds the lock)."""
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM evaluations WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries:
+            conn.execute(
+                "DELETE FROM evaluations WHERE key IN ("
+                "SELECT key FROM evaluations ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        self._last_eviction = now
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and the current number of stored entries."""
+        entries = 0
+        if self.path:
+            try:
+                with self._lock:
+                    entries = self._connect().execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+            except Exception:
+                pass
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': entries
+        }
+
+    def clear(self) -> None:
+        """Remove all cached evaluations and reset counters."""
+        if self.path:
+            with self._lock:
+                self._connect().execute("DELETE FROM evaluations")
+                self._conn.commit()
+                self._touched.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Global instance
+evaluation_cache = EvaluationCache(EVAL_CACHE_PATH, EVAL_CACHE_MAX_ENTRIES, EVAL_CACHE_TTL_SECONDS)
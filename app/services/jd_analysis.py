@@ -0,0 +1,297 @@
+"""
+Job description analysis.
+
+A job description is analysed once per content hash into a requirements
+profile (title, seniority, minimum years of experience, required and preferred
+skills, responsibilities, scoring keywords and, once embedding scoring has
+needed it, the JD embedding). Profiles are cached in SQLite, so keyword
+scoring, embedding scoring and evaluation prompts reuse them instead of
+reprocessing the JD text on every rank request.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.config import (
+    JD_ANALYSIS_CACHE_PATH, JD_ANALYSIS_CACHE_MAX_ENTRIES, JD_ANALYSIS_PROMPT_TOKEN_BUDGET,
+    JD_ANALYSIS_RETRY_SECONDS, JD_ANALYSIS_RETRY_MAX_SECONDS, JD_PROFILE_IN_PROMPT
+)
+from app.services.embeddings import get_text_embedding
+from app.services.evaluation_cache import EvaluationCache
+from app.services.openai_clients import openai_clients, CHAT
+from app.services.openai_scheduler import chat_completion
+from app.services.token_budget import JD_SECTION_PRIORITIES, fit_prompt, token_usage
+from ml.hybrid_ranker import keyword_terms
+from ml.preprocessing import extract_skills
+
+logger = logging.getLogger(__name__)
+
+# Azure deployment used for the analysis
+ANALYSIS_MODEL = "gpt-35-turbo"
+
+# Bump whenever the analysis prompt or profile fields change; part of the cache key
+JD_ANALYSIS_VERSION = "jd-v1"
+
+SENIORITY_LEVELS = ("intern", "junior", "mid", "senior", "lead", "principal", "unspecified")
+
+# Rule-based seniority detection, checked in order against the title, then the text
+_SENIORITY_PATTERNS = [
+    ("principal", re.compile(r"\b(principal|staff|distinguished|architect)\b")),
+    ("lead", re.compile(r"\b(lead|head of|manager)\b")),
+    ("senior", re.compile(r"\b(senior|sr\.?)\b")),
+    ("junior", re.compile(r"\b(junior|jr\.?|entry[- ]level|graduate)\b")),
+    ("intern", re.compile(r"\b(intern|internship|trainee)\b")),
+]
+_YEARS_RE = re.compile(r"(\d{1,2})\s*\+?\s*(?:-|to)?\s*(?:\d{1,2}\s*)?(?:years?|yrs?)\b", re.IGNORECASE)
+_SKILL_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+# In-process profiles kept besides the SQLite cache
+MEMO_SIZE = 32
+
+SYSTEM_PROMPT = f"""You analyse job descriptions for a resume screening system.
+
+Return JSON with these fields:
+- title (job title)
+- seniority (one of: {", ".join(SENIORITY_LEVELS)})
+- min_years_experience (number, or null if not stated)
+- required_skills (array of must-have skills, tools and technologies)
+- preferred_skills (array of nice-to-have skills)
+- education (string: required degree or qualification, empty if not stated)
+- responsibilities (array of at most 8 short key responsibilities)
+- summary (one or two sentences describing the role)"""
+
+
+def jd_content_hash(job_description: str) -> str:
+    """Content hash of a job description, ignoring surrounding whitespace."""
+    return hashlib.sha256((job_description or "").strip().encode("utf-8")).hexdigest()
+
+
+def _string_list(value) -> List[str]:
+    """Deduplicated non-empty strings from a model-provided list."""
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    items = []
+    seen = set()
+    for item in value:
+        text = str(item).strip()
+        if text and text.lower() not in seen:
+            seen.add(text.lower())
+            items.append(text)
+    return items
+
+
+def _years(value) -> Optional[float]:
+    try:
+        years = float(value)
+    except (TypeError, ValueError):
+        return None
+    return years if years >= 0 else None
+
+
+def _first_line(text: str) -> str:
+    for line in text.splitlines():
+        if line.strip():
+            return line.strip()[:100]
+    return ""
+
+
+class JobDescriptionAnalyzer:
+    """
+    Builds and caches job description profiles. A profile that only has the
+    rule-based requirements (the LLM call failed or was not requested) is
+    upgraded the next time requirements are needed. Failures are cached too:
+    the rule-based profile records when the LLM may be asked again
+    (llm_retry_at, with exponential backoff), so every rank in between does
+    not repeat a failing call.
+    """
+
+    def __init__(self, cache: EvaluationCache):
+        self.cache = cache
+        self._memo: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(jd_hash: str) -> str:
+        return hashlib.sha256(f"{JD_ANALYSIS_VERSION}\x00{ANALYSIS_MODEL}\x00{jd_hash}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            profile = self._memo.get(key)
+            if profile is not None:
+                self._memo.move_to_end(key)
+                return profile
+        profile = self.cache.get(key)
+        if profile is not None:
+            self._remember(key, profile)
+        return profile
+
+    def _remember(self, key: str, profile: Dict) -> None:
+        with self._lock:
+            self._memo[key] = profile
+            self._memo.move_to_end(key)
+            while len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+
+    def _store(self, key: str, profile: Dict) -> None:
+        self._remember(key, profile)
+        self.cache.set(key, profile)
+
+    def analyze(self, job_description: str, requirements: bool = True) -> Dict:
+        """
+        Profile for a job description. With requirements=False no LLM call is
+        made; a cached profile is returned if there is one, otherwise a
+        rule-based one (used by the fallback ranker).
+        """
+        jd_hash = jd_content_hash(job_description)
+        key = self._cache_key(jd_hash)
+        profile = self._lookup(key)
+        if profile is None:
+            profile = self._rule_based_profile(job_description, jd_hash)
+            self._remember(key, profile)
+
+        if requirements and profile.get('source') != 'llm' and time.time() >= profile.get('llm_retry_at', 0):
+            extracted = self._extract_requirements(job_description)
+            if extracted is not None:
+                profile = {k: v for k, v in profile.items() if k not in ('llm_failures', 'llm_retry_at')}
+                profile = dict(profile, **extracted, source='llm')
+            else:
+                failures = profile.get('llm_failures', 0) + 1
+                backoff = min(JD_ANALYSIS_RETRY_SECONDS * 2 ** min(failures - 1, 16), JD_ANALYSIS_RETRY_MAX_SECONDS)
+                profile = dict(profile, llm_failures=failures, llm_retry_at=time.time() + backoff)
+            self._store(key, profile)
+        return profile
+
+    def embedding(self, job_description: str) -> List[float]:
+        """
+        The JD embedding, computed on first use and cached on the profile, so
+        each job description is embedded once rather than on every ranking.
+        Raises if the embeddings call fails.
+        """
+        embedding = self.analyze(job_description, requirements=False).get('embedding')
+        if not embedding:
+            embedding = get_text_embedding(job_description)
+            self.store_embedding(job_description, embedding)
+        return embedding
+
+    def store_embedding(self, job_description: str, embedding: List[float]) -> None:
+        """Attach the JD embedding to its profile so later rankings skip embedding the JD."""
+        if not embedding:
+            return
+        key = self._cache_key(jd_content_hash(job_description))
+        profile = self.analyze(job_description, requirements=False)
+        self._store(key, dict(profile, embedding=list(embedding)))
+
+    def _rule_based_profile(self, job_description: str, jd_hash: str) -> Dict:
+        """Requirements found without the LLM: title line, years, seniority keywords and known skills."""
+        text = job_description or ""
+        lowered = text.lower()
+        title = _first_line(text)
+
+        seniority = "unspecified"
+        for source in (title.lower(), lowered):
+            for level, pattern in _SENIORITY_PATTERNS:
+                if pattern.search(source):
+                    seniority = level
+                    break
+            if seniority != "unspecified":
+                break
+
+        years = [int(match) for match in _YEARS_RE.findall(text)]
+        tokens = _SKILL_TOKEN_RE.findall(lowered)
+        # Bigrams catch multi-word skills such as "machine learning"
+        tokens += [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        return {
+            'jd_hash': jd_hash,
+            'version': JD_ANALYSIS_VERSION,
+            'source': 'rules',
+            'title': title,
+            'seniority': seniority,
+            'min_years_experience': float(min(years)) if years else None,
+            'required_skills': sorted(extract_skills(tokens)),
+            'preferred_skills': [],
+            'education': '',
+            'responsibilities': [],
+            'summary': '',
+            'keywords': sorted(keyword_terms(text)),
+            'embedding': None
+        }
+
+    def _extract_requirements(self, job_description: str) -> Optional[Dict]:
+        """Structured requirements from one LLM call, or None if it fails."""
+        def build_messages(text: str) -> List[Dict]:
+            return [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Analyse this job description:\n\n{text}"}
+            ]
+
+        messages, usage = fit_prompt(
+            build_messages, job_description, JD_ANALYSIS_PROMPT_TOKEN_BUDGET, JD_SECTION_PRIORITIES
+        )
+        try:
+            response = chat_completion(
+                openai_clients.get_client(CHAT),
+                model=ANALYSIS_MODEL,
+                messages=messages,
+                temperature=0.0,
+                max_tokens=800,
+                response_format={"type": "json_object"}
+            )
+            token_usage.record('jd_analysis', usage, response)
+            analysis = json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.warning(f"Job description analysis failed, using rule-based requirements: {str(e)}")
+            return None
+
+        seniority = str(analysis.get('seniority') or 'unspecified').strip().lower()
+        return {
+            'title': str(analysis.get('title') or '').strip() or _first_line(job_description),
+            'seniority': seniority if seniority in SENIORITY_LEVELS else 'unspecified',
+            'min_years_experience': _years(analysis.get('min_years_experience')),
+            'required_skills': _string_list(analysis.get('required_skills')),
+            'preferred_skills': _string_list(analysis.get('preferred_skills')),
+            'education': str(analysis.get('education') or '').strip(),
+            'responsibilities': _string_list(analysis.get('responsibilities'))[:8],
+            'summary': str(analysis.get('summary') or '').strip()
+        }
+
+
+def prompt_job_description(job_description: str, profile: Optional[Dict]) -> str:
+    """
+    Job description text for evaluation prompts: the compact requirements
+    profile when LLM-extracted (and JD_PROFILE_IN_PROMPT), otherwise the raw JD.
+    """
+    if not JD_PROFILE_IN_PROMPT or not profile or profile.get('source') != 'llm':
+        return job_description
+
+    lines = [f"Role: {profile.get('title') or 'Not specified'}"]
+    if profile.get('seniority') and profile['seniority'] != 'unspecified':
+        lines.append(f"Seniority: {profile['seniority']}")
+    if profile.get('min_years_experience') is not None:
+        lines.append(f"Minimum experience: {profile['min_years_experience']:g} years")
+    if profile.get('required_skills'):
+        lines.append(f"Required skills: {', '.join(profile['required_skills'])}")
+    if profile.get('preferred_skills'):
+        lines.append(f"Preferred skills: {', '.join(profile['preferred_skills'])}")
+    if profile.get('education'):
+        lines.append(f"Education: {profile['education']}")
+    if profile.get('responsibilities'):
+        lines.append("Key responsibilities:")
+        lines.extend(f"- {item}" for item in profile['responsibilities'])
+    if profile.get('summary'):
+        lines.append(f"Summary: {profile['summary']}")
+    return "\n".join(lines)
+
+
+# Global instance
+jd_analyzer = JobDescriptionAnalyzer(
+    EvaluationCache(JD_ANALYSIS_CACHE_PATH, JD_ANALYSIS_CACHE_MAX_ENTRIES)
+)
@@ -0,0 +1,531 @@
+"""
+Background job subsystem for long-running ranking requests.
+
+Jobs are submitted to a pluggable queue backend and processed by a worker pool:
+- InMemoryJobQueue: single-process, workers are threads (development and tests)
+- SQLiteJobQueue: file-backed, workers are separate processes that can scale
+  independently of the API (single node)
+
+Running jobs record a heartbeat (on claim and on every progress update); a job
+whose heartbeat is older than JOB_STALE_AFTER_SECONDS lost its worker and is
+requeued by the next worker sweep, or failed after JOB_MAX_ATTEMPTS claims.
+Finished jobs are dropped JOB_RESULT_TTL_SECONDS after they finish.
+"""
+
+import abc
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from app.config import (
+    JOB_BACKEND, JOB_DB_PATH, JOB_WORKERS, JOB_POLL_INTERVAL_SECONDS, JOB_STALE_AFTER_SECONDS,
+    JOB_MAX_ATTEMPTS, JOB_RESULT_TTL_SECONDS, JOB_SHUTDOWN_TIMEOUT_SECONDS
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, every API process starts its workers
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+
+def _timestamp(seconds_ago: float = 0.0) -> str:
+    """ISO timestamp (local time, as stored on job records), optionally in the past."""
+    return (datetime.now() - timedelta(seconds=seconds_ago)).isoformat()
+
+
+class JobQueue(abc.ABC):
+    """
+    Queue backend interface. Job records are plain dicts with id, kind, status,
+    payload, progress, result, error, attempts and created/started/heartbeat/
+    finished timestamps.
+    """
+
+    @abc.abstractmethod
+    def submit(self, kind: str, payload: Dict) -> str:
+        """Queue a job and return its id."""
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        """A copy of the job record, or None when it is unknown or expired."""
+
+    @abc.abstractmethod
+    def claim(self) -> Optional[Dict]:
+        """Atomically move the oldest queued job to running and return it."""
+
+    @abc.abstractmethod
+    def update(self, job_id: str, **fields) -> None:
+        """Set fields on a job record."""
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id: str) -> None:
+        """Record that the worker running a job is alive."""
+
+    @abc.abstractmethod
+    def reclaim_stale(self, stale_after: float = JOB_STALE_AFTER_SECONDS,
+                      max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """
+        Requeue running jobs without a heartbeat for stale_after seconds (their
+        worker died), or fail them once claimed max_attempts times. Returns how
+        many jobs were reclaimed.
+        """
+
+    @abc.abstractmethod
+    def expire_finished(self, ttl: float = JOB_RESULT_TTL_SECONDS) -> int:
+        """Drop jobs finished more than ttl seconds ago (0 keeps them). Returns how many."""
+
+    @staticmethod
+    def _new_job(kind: str, payload: Dict) -> Dict:
+        return {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'status': STATUS_QUEUED,
+            'payload': payload,
+            'progress': {},
+            'result': None,
+            'error': None,
+            'attempts': 0,
+            'created_at': _timestamp(),
+            'started_at': None,
+            'heartbeat_at': None,
+            'finished_at': None
+        }
+
+
+class InMemoryJobQueue(JobQueue):
+    """Process-local queue; only thread workers in the same process can consume it."""
+
+    supports_processes = False
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, payload: Dict) -> str:
+        # Expiry piggybacks on submits, so an idle API holds at most the last jobs' results
+        self.expire_finished()
+        job = self._new_job(kind, payload)
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._pending.append(job['id'])
+        return job['id']
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self) -> Optional[Dict]:
+        with self._lock:
+            while self._pending:
+                job = self._jobs.get(self._pending.popleft())
+                if job and job['status'] == STATUS_QUEUED:
+                    job['status'] = STATUS_RUNNING
+                    job['started_at'] = job['heartbeat_at'] = _timestamp()
+                    job['attempts'] += 1
+                    return dict(job)
+        return None
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def heartbeat(self, job_id: str) -> None:
+        self.update(job_id, heartbeat_at=_timestamp())
+
+    def reclaim_stale(self, stale_after: float = JOB_STALE_AFTER_SECONDS,
+                      max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        cutoff = _timestamp(stale_after)
+        reclaimed = 0
+        with self._lock:
+            for job in self._jobs.values():
+                if job['status'] != STATUS_RUNNING or (job['heartbeat_at'] or '') >= cutoff:
+                    continue
+                if job['attempts'] >= max_attempts:
+                    job.update(status=STATUS_FAILED, error="Job worker stopped responding",
+                               finished_at=_timestamp())
+                else:
+                    job.update(status=STATUS_QUEUED, started_at=None, heartbeat_at=None)
+                    self._pending.append(job['id'])
+                reclaimed += 1
+        return reclaimed
+
+    def expire_finished(self, ttl: float = JOB_RESULT_TTL_SECONDS) -> int:
+        if ttl <= 0:
+            return 0
+        cutoff = _timestamp(ttl)
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['status'] in FINISHED_STATUSES and (job['finished_at'] or '') < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobQueue(JobQueue):
+    """File-backed queue shared by the API and worker processes on one node."""
+
+    supports_processes = True
+    _json_fields = ('payload', 'progress', 'result')
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "payload TEXT, progress TEXT, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at TEXT, started_at TEXT, heartbeat_at TEXT, finished_at TEXT)"
+            )
+            # Queue files created before heartbeats were recorded
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'attempts' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            if 'heartbeat_at' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # A short-lived connection per operation keeps this safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        for field in self._json_fields:
+            job[field] = json.loads(job[field]) if job[field] else ({} if field == 'progress' else None)
+        return job
+
+    def submit(self, kind: str, payload: Dict) -> str:
+        job = self._new_job(kind, payload)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, progress, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job['id'], kind, job['status'], json.dumps(payload), json.dumps({}), job['created_at'])
+            )
+        finally:
+            conn.close()
+        return job['id']
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def claim(self) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock so two workers cannot claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (STATUS_QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            started_at = _timestamp()
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (STATUS_RUNNING, started_at, started_at, row['id'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            conn.close()
+        job = self._row_to_job(row)
+        job['status'] = STATUS_RUNNING
+        job['started_at'] = job['heartbeat_at'] = started_at
+        job['attempts'] += 1
+        return job
+
+    def update(self, job_id: str, **fields) -> None:
+        if not fields:
+            return
+        columns = []
+        values = []
+        for key, value in fields.items():
+            columns.append(f"{key} = ?")
+            values.append(json.dumps(value) if key in self._json_fields else value)
+        conn = self._connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {', '.join(columns)} WHERE id = ?", (*values, job_id))
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str) -> None:
+        self.update(job_id, heartbeat_at=_timestamp())
+
+    def reclaim_stale(self, stale_after: float = JOB_STALE_AFTER_SECONDS,
+                      max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        cutoff = _timestamp(stale_after)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            failed = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status = ? AND COALESCE(heartbeat_at, '') < ? AND attempts >= ?",
+                (STATUS_FAILED, "Job worker stopped responding", _timestamp(), STATUS_RUNNING, cutoff, max_attempts)
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = ? AND COALESCE(heartbeat_at, '') < ?",
+                (STATUS_QUEUED, STATUS_RUNNING, cutoff)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            conn.close()
+        return failed + requeued
+
+    def expire_finished(self, ttl: float = JOB_RESULT_TTL_SECONDS) -> int:
+        if ttl <= 0:
+            return 0
+        conn = self._connect()
+        try:
+            return conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))}) "
+                "AND finished_at < ?",
+                (*FINISHED_STATUSES, _timestamp(ttl))
+            ).rowcount
+        finally:
+            conn.close()
+
+
+def create_job_queue(backend: str = JOB_BACKEND, path: str = JOB_DB_PATH) -> JobQueue:
+    """Build the configured queue backend ('memory' or 'sqlite')."""
+    if backend == "sqlite":
+        return SQLiteJobQueue(path)
+    if backend == "memory":
+        return InMemoryJobQueue()
+    raise ValueError(f"Unsupported job backend: {backend}")
+
+
+# ========== Job handlers ==========
+
+def _run_rank_job(job: Dict, report_progress: Callable[[str, int, int], None]) -> Dict:
+    """Rank a session's resumes; imported lazily so worker processes start cheaply."""
+    import asyncio
+    from app.services.ranking_pipeline import run_ranking
+
+    payload = job['payload']
+    ranked_results = asyncio.run(run_ranking(
+        payload['user_id'],
+        payload['job_description'],
+        session_id=payload.get('session_id'),
+        on_progress=report_progress
+    ))
+    return {'ranked_resumes': ranked_results}
+
+
+JOB_HANDLERS: Dict[str, Callable[[Dict, Callable[[str, int, int], None]], Dict]] = {
+    'rank': _run_rank_job,
+}
+
+
+def process_job(queue: JobQueue, job: Dict, heartbeat_interval: float = JOB_STALE_AFTER_SECONDS / 3) -> None:
+    """
+    Run a claimed job and record its result or error. A heartbeat thread keeps
+    the job from looking stale while the handler runs.
+    """
+    def report_progress(stage: str, completed: int, total: int) -> None:
+        queue.update(job['id'], progress={'stage': stage, 'completed': completed, 'total': total})
+
+    done = threading.Event()
+
+    def beat() -> None:
+        while not done.wait(heartbeat_interval):
+            try:
+                queue.heartbeat(job['id'])
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job['id']} failed: {str(e)}")
+
+    beater = threading.Thread(target=beat, name=f"job-heartbeat-{job['id'][:8]}", daemon=True)
+    beater.start()
+    try:
+        handler = JOB_HANDLERS[job['kind']]
+        result = handler(job, report_progress)
+        queue.update(job['id'], status=STATUS_SUCCEEDED, result=result, finished_at=_timestamp())
+    except Exception as e:
+        logger.error(f"Job {job['id']} failed: {str(e)}\n{traceback.format_exc()}")
+        queue.update(job['id'], status=STATUS_FAILED, error=str(e), finished_at=_timestamp())
+    finally:
+        done.set()
+        beater.join()
+
+
+def run_worker(queue: JobQueue, stop_event=None, poll_interval: float = JOB_POLL_INTERVAL_SECONDS) -> None:
+    """
+    Claim and process jobs until stop_event is set; a running job is finished
+    first. Stale and expired jobs are swept every JOB_STALE_AFTER_SECONDS.
+    """
+    next_sweep = 0.0
+    while stop_event is None or not stop_event.is_set():
+        if time.monotonic() >= next_sweep:
+            try:
+                if queue.reclaim_stale():
+                    logger.warning("Requeued or failed running jobs whose worker stopped responding")
+                queue.expire_finished()
+            except Exception as e:
+                logger.warning(f"Job sweep failed: {str(e)}")
+            next_sweep = time.monotonic() + JOB_STALE_AFTER_SECONDS
+        job = queue.claim()
+        if job is None:
+            if stop_event is not None:
+                stop_event.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        process_job(queue, job)
+
+
+def _worker_process_main(backend: str, path: str, stop_event) -> None:
+    """Entry point for worker processes; each opens its own queue connection."""
+    logging.basicConfig(level=logging.INFO)
+    run_worker(create_job_queue(backend, path), stop_event)
+
+
+def _acquire_worker_lock(path: str):
+    """
+    Open and exclusively lock path, returning the open file, or None when another
+    process holds it. Without fcntl (Windows) the lock always succeeds.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    lock_file = open(path, "a")
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class JobWorkerPool:
+    """
+    Pool of job workers. Uses separate processes when the queue backend can be
+    shared across processes (SQLite), otherwise threads in the API process.
+
+    With the SQLite backend only one process per queue file runs workers: under
+    `uvicorn --workers N` the first API process to start takes a lock file next
+    to the queue and the others only submit jobs. Workers are not daemons; stop()
+    lets them finish their current job for up to JOB_SHUTDOWN_TIMEOUT_SECONDS,
+    then terminates worker processes (their jobs are reclaimed once stale).
+    """
+
+    def __init__(self, queue: JobQueue, size: int = JOB_WORKERS,
+                 backend: str = JOB_BACKEND, path: str = JOB_DB_PATH):
+        self.queue = queue
+        self.size = size
+        self.backend = backend
+        self.path = path
+        self._workers: List = []
+        self._stop_event = None
+        self._lock_file = None
+
+    def start(self) -> None:
+        if self._workers or self.size <= 0:
+            return
+        if getattr(self.queue, 'supports_processes', False):
+            self._lock_file = _acquire_worker_lock(f"{self.path}.workers.lock")
+            if self._lock_file is None:
+                logger.info(f"Job workers for {self.path} run in another process")
+                return
+            context = multiprocessing.get_context("spawn")
+            self._stop_event = context.Event()
+            for _ in range(self.size):
+                process = context.Process(
+                    target=_worker_process_main,
+                    args=(self.backend, self.path, self._stop_event)
+                )
+                process.start()
+                self._workers.append(process)
+        else:
+            logger.warning(
+                f"Job backend '{self.backend}' runs ranking jobs on threads in the API process and loses "
+                f"queued jobs on restart; use JOB_BACKEND=sqlite outside development"
+            )
+            self._stop_event = threading.Event()
+            for i in range(self.size):
+                thread = threading.Thread(
+                    target=run_worker, args=(self.queue, self._stop_event),
+                    name=f"job-worker-{i}"
+                )
+                thread.start()
+                self._workers.append(thread)
+        logger.info(f"Started {len(self._workers)} job workers ({self.backend} backend)")
+
+    def stop(self, timeout: float = JOB_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        if self._stop_event is not None:
+            self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        for worker in self._workers:
+            if worker.is_alive():
+                if isinstance(worker, threading.Thread):
+                    # Threads cannot be killed; the interpreter waits for their current job
+                    logger.warning(f"{worker.name} is still finishing a job")
+                    continue
+                logger.warning(f"Terminating job worker process {worker.pid}")
+                worker.terminate()
+                worker.join()
+        self._workers = []
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+# Global instances
+job_queue = create_job_queue()
+job_worker_pool = JobWorkerPool(job_queue)
+
+
+if __name__ == "__main__":
+    # Standalone worker: python -m app.services.jobs (requires JOB_BACKEND=sqlite)
+    logging.basicConfig(level=logging.INFO)
+    run_worker(job_queue)
@@ -4,13 +4,69 @@ Uses GPT with few-shot prompting to evaluate resumes like a human HR professiona
 Combines 30% keyword matching with 70% LLM-based human-like evaluation.
 """
 
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, List, Tuple
-from openai import AzureOpenAI
+from functools import cached_property
+from typing import Dict, List, Optional, Set, Tuple
+from openai import AzureOpenAI, AsyncAzureOpenAI, RateLimitError
+
+from app.config import (
+    LLM_MAX_CONCURRENCY, LLM_EVAL_TIMEOUT_SECONDS, LLM_SHORTLIST_SIZE, LLM_SHORTLIST_MIN_SCORE,
+    LLM_EVAL_PROMPT_TOKEN_BUDGET, LLM_EVAL_JD_MAX_TOKENS,
+    LLM_EVAL_BATCH_SIZE, LLM_EVAL_BATCH_RESUME_MAX_TOKENS, LLM_EVAL_BATCH_MAX_COMPLETION_TOKENS
+)
+from app.services.evaluation_cache import evaluation_cache
+from app.services.jd_analysis import jd_analyzer, prompt_job_description
+from app.services.openai_clients import openai_clients, CHAT
+from app.services.openai_scheduler import chat_completion, chat_completion_async, scheduler_stats
+from app.services.result_views import ranking_sort_key
+from app.services.token_budget import (
+    JD_SECTION_PRIORITIES, count_message_tokens, count_tokens, fit_prompt, fit_text_to_budget, token_usage
+)
+from ml.hybrid_ranker import KeywordCoverageScorer, TfidfHybridScorer, keyword_coverage, keyword_terms
+from ml.inverted_index import InvertedIndex
 
 logger = logging.getLogger(__name__)
 
+# Azure deployment used for evaluations
+EVALUATION_MODEL = "gpt-35-turbo"
+
+# Structured resume fields requested by the single-pass prompt (as parse_resume_with_gpt returns)
+PARSED_FIELDS = """- name (candidate's full name)
+- email
+- phone
+- skills (array of ALL technical skills, tools, languages, frameworks and technologies mentioned anywhere)
+- experience (array of work experience entries)
+- education (array of education entries)"""
+
+# Fields requested for every evaluation (single and batched prompts)
+EVALUATION_FIELDS = """- overall_score (0.0-1.0)
+- experience_score (0.0-1.0)
+- skills_score (0.0-1.0)
+- education_score (0.0-1.0)
+- projects_score (0.0-1.0)
+- career_progression_score (0.0-1.0)
+- cultural_fit_score (0.0-1.0)
+- strengths (array of strings)
+- concerns (array of strings)
+- missing_skills (array of strings)
+- recommendation (string: "Strong Hire" | "Hire" | "Consider" | "Weak Fit" | "No Hire")
+- reasoning (string explaining the overall assessment)
+- total_experience (string describing years/type of experience)
+- education_level (string describing highest education)
+- key_achievements (array of notable accomplishments)"""
+
+def _prompt_version(prefix: str, *template) -> str:
+    """
+    Evaluation cache key part derived from the rendered prompt template (and
+    the budgets that shape it), so any prompt change invalidates old entries.
+    """
+    digest = hashlib.sha256(json.dumps(template, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{prefix}-{digest[:16]}"
+
+
 class LLMBasedRanker:
     """
     Advanced resume ranking using LLM with few-shot prompting.
@@ -18,21 +74,21 @@ class LLMBasedRanker:
     """
     
     def __init__(self):
-        # Configure Azure OpenAI
-        self.client = AzureOpenAI(
-            api_key="C6GA6hGNxN48a6A2jR6JyhDYTzbnwfvHJuYTM2FUz4olCPa2mBq0JQQJ99BIAC77bzfXJ3w3AAABACOGAz1x",
-            api_version="2024-12-01-preview",
-            azure_endpoint="https://parseroa.openai.azure.com/"
-        )
+        # Azure OpenAI clients come from the shared registry and are created on first use
         
         # Few-shot examples for resume evaluation
         self.few_shot_examples = self._create_few_shot_examples()
+
     
     def rank_resumes(self, resumes: List[Dict], job_description: str, 
                     keyword_weight: float = 0.3) -> List[Dict]:
         """
         Rank resumes using LLM-based evaluation combined with keyword matching.
         
+        Synchronous entry point for scripts; runs rank_resumes_async on a
+        fresh event loop. Code already running inside an event loop (FastAPI
+        routes) must await rank_resumes_async instead.
+        
         Args:
             resumes: List of parsed resume dictionaries
             job_description: Job description to evaluate against
@@ -41,77 +97,354 @@ class LLMBasedRanker:
         Returns:
             Ranked list of resumes with detailed LLM-based scoring
         """
-        ranked_results = []
+        return asyncio.run(self.rank_resumes_async(resumes, job_description, keyword_weight))
+    
+    async def rank_resumes_async(self, resumes: List[Dict], job_description: str,
+                                 keyword_weight: float = 0.3,
+                                 max_concurrency: Optional[int] = None,
+                                 timeout: Optional[float] = None,
+                                 shortlist_size: Optional[int] = None,
+                                 shortlist_min_score: Optional[float] = None,
+                                 batch_size: Optional[int] = None,
+                                 session_index: Optional[InvertedIndex] = None) -> List[Dict]:
+        """
+        Two-stage ranking: score every resume cheaply (TF-IDF + keyword overlap),
+        then send only the shortlist to the LLM with up to max_concurrency
+        evaluations in flight. Resumes outside the shortlist keep their cheap
+        score and are marked llm_reviewed=False.
         
+        Args:
+            resumes: List of parsed resume dictionaries
+            job_description: Job description to evaluate against
+            keyword_weight: Weight for keyword matching (default 0.3)
+            max_concurrency: Parallel evaluations (default LLM_MAX_CONCURRENCY)
+            timeout: Seconds allowed per evaluation request once the scheduler admits it (default LLM_EVAL_TIMEOUT_SECONDS)
+            shortlist_size: Top-K sent to the LLM (default LLM_SHORTLIST_SIZE, 0 = no limit)
+            shortlist_min_score: Minimum cheap score for the LLM (default LLM_SHORTLIST_MIN_SCORE)
+            batch_size: Resumes per chat completion (default LLM_EVAL_BATCH_SIZE, 1 = one each)
+            session_index: Session inverted index covering the resumes; prescreen
+                TF-IDF scores come from it instead of refitting a vectorizer
+            
+        Returns:
+            Ranked list of resumes with detailed LLM-based scoring
+        """
+        ranked_results: List[Optional[Dict]] = [None] * len(resumes)
+        async for index, result in self.iter_evaluations(
+            resumes, job_description, keyword_weight, max_concurrency, timeout,
+            shortlist_size, shortlist_min_score, batch_size, session_index
+        ):
+            # Slot by input position so assembly is independent of completion order
+            ranked_results[index] = result
+        return self.finalize_ranking(ranked_results)
+    
+    async def iter_evaluations(self, resumes: List[Dict], job_description: str,
+                               keyword_weight: float = 0.3,
+                               max_concurrency: Optional[int] = None,
+                               timeout: Optional[float] = None,
+                               shortlist_size: Optional[int] = None,
+                               shortlist_min_score: Optional[float] = None,
+                               batch_size: Optional[int] = None,
+                               session_index: Optional[InvertedIndex] = None,
+                               evaluated: Optional[Dict[int, Dict]] = None):
+        """
+        Async generator yielding (input_index, result) as each resume finishes.
+        Prescreen-only results are yielded first; arguments match rank_resumes_async.
+        With batching, max_concurrency bounds batches rather than resumes in flight.
+        
+        evaluated maps input indices to results an earlier run already got from
+        the LLM (incremental re-ranks). Those resumes are prescreened with the
+        rest, so they take up shortlist places, but their results are yielded
+        as they are instead of being evaluated again.
+        """
+        evaluated = evaluated or {}
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or LLM_MAX_CONCURRENCY))
+        timeout = timeout if timeout is not None else LLM_EVAL_TIMEOUT_SECONDS
+        
+        # Job description profile (cached per JD content): scoring keywords and the prompt text
+        jd_profile = await asyncio.to_thread(jd_analyzer.analyze, job_description)
+        prompt_jd = prompt_job_description(job_description, jd_profile)
+        
+        # Stage 1: cheap scores for everyone
+        prescreens = self._prescreen_resumes(resumes, job_description, set(jd_profile['keywords']), session_index)
+        shortlist = self._select_shortlist(
+            prescreens,
+            LLM_SHORTLIST_SIZE if shortlist_size is None else shortlist_size,
+            LLM_SHORTLIST_MIN_SCORE if shortlist_min_score is None else shortlist_min_score
+        )
+        logger.info(f"Prescreen shortlisted {len(shortlist)} of {len(resumes)} resumes for LLM evaluation")
+        
+        for index in range(len(resumes)):
+            if index in evaluated:
+                yield index, evaluated[index]
+            elif index not in shortlist:
+                yield index, self._build_prescreen_result(resumes[index], prescreens[index])
+        shortlist -= evaluated.keys()
+        
+        # Stage 2: LLM evaluation for the shortlist only, optionally several resumes per request
+        batch_size = max(1, LLM_EVAL_BATCH_SIZE if batch_size is None else batch_size)
+        # Resumes collected without GPT parsing are parsed and evaluated in one call each
+        single_pass = {index for index in shortlist if self._needs_single_pass(resumes[index])}
+        shortlisted = sorted(shortlist - single_pass)
+        batches = [[index] for index in sorted(single_pass)]
+        batches += [shortlisted[i:i + batch_size] for i in range(0, len(shortlisted), batch_size)]
+        
+        async def evaluate(batch: List[int]) -> List[Tuple[int, Dict]]:
+            async with semaphore:
+                if len(batch) == 1:
+                    index = batch[0]
+                    if self._needs_single_pass(resumes[index]):
+                        result = await self._evaluate_resume_single_pass_async(
+                            resumes[index], prompt_jd, keyword_weight, timeout, prescreens[index]
+                        )
+                    else:
+                        result = await self._evaluate_resume_async(
+                            resumes[index], prompt_jd, keyword_weight, timeout, prescreens[index]
+                        )
+                    return [(index, result)]
+                return await self._evaluate_batch_async(
+                    batch, resumes, prompt_jd, keyword_weight, timeout, prescreens
+                )
+        
+        tasks = [asyncio.create_task(evaluate(batch)) for batch in batches]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for item in await next_done:
+                    yield item
+        finally:
+            # Client disconnects (streaming) must not leave evaluations running
+            for task in tasks:
+                task.cancel()
+            logger.info(f"Evaluation cache stats: {evaluation_cache.stats()}")
+            logger.info(f"Token usage: {token_usage.stats()}")
+            logger.info(f"OpenAI scheduler stats: {scheduler_stats()}")
+    
+    def _prescreen_resumes(self, resumes: List[Dict], job_description: str,
+                           job_keywords: Optional[Set[str]] = None,
+                           session_index: Optional[InvertedIndex] = None) -> List[Dict]:
+        """
+        Stage 1: score every resume without LLM calls.
+        The prescreen score is the mean of TF-IDF similarity and keyword coverage.
+        Both come from session_index when it covers every resume, so resumes
+        indexed by earlier ranks are not tokenized again.
+        """
+        if job_keywords is None:
+            job_keywords = keyword_terms(job_description)
+        
+        resume_texts = []
         for resume in resumes:
             try:
-                # Extract resume content
-                resume_text = self._extract_resume_content(resume)
-                
-                # Get LLM evaluation (70% weight)
-                llm_evaluation = self._get_llm_evaluation(resume_text, job_description)
-                
-                # Calculate keyword matching score (30% weight)
+                resume_texts.append(self.extract_resume_content(resume))
+            except Exception:
+                # Surfaces as an error record if the resume is evaluated
+                resume_texts.append('')
+        
+        files = [resume.get('file') for resume in resumes]
+        indexed = session_index is not None and all(f in session_index for f in files)
+        try:
+            if indexed:
+                tfidf_scores = session_index.tfidf_scores(job_description, files)
+            else:
+                tfidf_scores = TfidfHybridScorer().score(resume_texts, job_description)
+        except Exception as e:
+            logger.warning(f"TF-IDF prescreen failed, using keyword scores only: {str(e)}")
+            tfidf_scores = [0.0 for _ in resume_texts]
+        
+        # Keyword coverage for the whole pool in one sparse operation
+        keyword_scorer = KeywordCoverageScorer(job_keywords)
+        if indexed:
+            keyword_scores = keyword_scorer.score_index(session_index, files)
+        else:
+            keyword_scores = keyword_scorer.score(resume_texts)
+        
+        prescreens = []
+        for resume_text, tfidf_score, keyword_score in zip(resume_texts, tfidf_scores, keyword_scores):
+            prescreens.append({
+                'resume_text': resume_text,
+                'keyword_score': keyword_score,
+                'tfidf_score': tfidf_score,
+                'prescreen_score': 0.5 * tfidf_score + 0.5 * keyword_score
+            })
+        return prescreens
+    
+    def _select_shortlist(self, prescreens: List[Dict], shortlist_size: int,
+                          min_score: float) -> set:
+        """
+        Return indices that go to the LLM: within the top shortlist_size
+        (when > 0) and scoring at least min_score (when > 0).
+        """
+        order = sorted(range(len(prescreens)), key=lambda i: prescreens[i]['prescreen_score'], reverse=True)
+        if shortlist_size and shortlist_size > 0:
+            order = order[:shortlist_size]
+        if min_score and min_score > 0:
+            order = [i for i in order if prescreens[i]['prescreen_score'] >= min_score]
+        return set(order)
+    
+    def _build_prescreen_result(self, resume: Dict, prescreen: Dict) -> Dict:
+        """
+        Ranking record for a resume that did not make the LLM shortlist.
+        """
+        parsed = resume.get('parsed', {}) or {}
+        skills = parsed.get('skills', [])
+        if not isinstance(skills, list):
+            skills = []
+        
+        return {
+            'file': resume.get('file', 'Unknown'),
+            'candidate_name': parsed.get('name', 'Unknown'),
+            'email': parsed.get('email', ''),
+            'final_score': round(prescreen['prescreen_score'], 4),
+            'keyword_score': round(prescreen['keyword_score'], 4),
+            'tfidf_score': round(prescreen['tfidf_score'], 4),
+            'prescreen_score': round(prescreen['prescreen_score'], 4),
+            'llm_reviewed': False,
+            'recommendation': 'Not LLM Reviewed',
+            'reasoning': 'Scored by keyword and TF-IDF prescreen only; below the LLM shortlist',
+            'skills': skills,
+            'parsed': parsed
+        }
+    
+    async def _evaluate_resume_async(self, resume: Dict, job_description: str,
+                                     keyword_weight: float, timeout: float,
+                                     prescreen: Optional[Dict] = None,
+                                     llm_evaluation: Optional[Dict] = None) -> Dict:
+        """
+        Evaluate a single resume; a request that takes longer than timeout once
+        admitted by the scheduler gets a neutral evaluation. An llm_evaluation
+        already obtained (e.g. from a batch) skips the LLM call.
+        """
+        try:
+            # Extract resume content
+            resume_text = self.extract_resume_content(resume)
+            
+            # Get LLM evaluation (70% weight)
+            if llm_evaluation is None:
+                llm_evaluation = await self._get_llm_evaluation_async(resume_text, job_description, timeout)
+            
+            # Calculate keyword matching score (30% weight)
+            if prescreen is not None:
+                keyword_score = prescreen['keyword_score']
+            else:
                 keyword_score = self._calculate_keyword_score(resume_text, job_description)
-                
-                # Combine scores
-                final_score = (keyword_weight * keyword_score + 
-                              (1 - keyword_weight) * llm_evaluation['overall_score'])
-                
-                # Extract and preserve parsed data
-                parsed = resume.get('parsed', {}) or {}
-                skills = parsed.get('skills', [])
-                if not isinstance(skills, list):
-                    skills = []
-                
-                result = {
-                    'file': resume.get('file', 'Unknown'),
-                    'candidate_name': parsed.get('name', 'Unknown'),
-                    'email': parsed.get('email', ''),
-                    'final_score': round(final_score, 4),
-                    'keyword_score': round(keyword_score, 4),
-                    'llm_score': round(llm_evaluation['overall_score'], 4),
-                    
-                    # Detailed LLM evaluation
-                    'experience_score': llm_evaluation['experience_score'],
-                    'skills_score': llm_evaluation['skills_score'],
-                    'education_score': llm_evaluation['education_score'],
-                    'projects_score': llm_evaluation['projects_score'],
-                    'career_progression_score': llm_evaluation['career_progression_score'],
-                    'cultural_fit_score': llm_evaluation['cultural_fit_score'],
-                    
-                    # LLM insights
-                    'strengths': llm_evaluation['strengths'],
-                    'concerns': llm_evaluation['concerns'],
-                    'missing_skills': llm_evaluation['missing_skills'],
-                    'recommendation': llm_evaluation['recommendation'],
-                    'reasoning': llm_evaluation['reasoning'],
-                    
-                    # Additional metadata
-                    'total_experience': llm_evaluation.get('total_experience', 'Not specified'),
-                    'education_level': llm_evaluation.get('education_level', 'Not specified'),
-                    'key_achievements': llm_evaluation.get('key_achievements', []),
-                    
-                    # Skills from parsed resume
-                    'skills': skills,
-                    
-                    # Preserve the entire parsed structure for downstream use
-                    'parsed': parsed
-                }
-                
-                ranked_results.append(result)
-                
-            except Exception as e:
-                logger.error(f"Error processing resume {resume.get('file', 'Unknown')}: {str(e)}")
-                ranked_results.append({
-                    'file': resume.get('file', 'Unknown'),
-                    'error': str(e),
-                    'final_score': 0.0,
-                    'recommendation': 'Error in processing'
-                })
+            
+            result = self._build_result(resume, llm_evaluation, keyword_score, keyword_weight)
+            if prescreen is not None:
+                result['tfidf_score'] = round(prescreen['tfidf_score'], 4)
+                result['prescreen_score'] = round(prescreen['prescreen_score'], 4)
+            result['llm_reviewed'] = True
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error processing resume {resume.get('file', 'Unknown')}: {str(e)}")
+            return {
+                'file': resume.get('file', 'Unknown'),
+                'error': str(e),
+                'final_score': 0.0,
+                'recommendation': 'Error in processing'
+            }
+    
+    @staticmethod
+    def _needs_single_pass(resume: Dict) -> bool:
+        """Resumes collected without GPT parsing carry raw_text and parsed=None."""
+        return resume.get('parsed') is None and bool(resume.get('raw_text'))
+    
+    async def _evaluate_resume_single_pass_async(self, resume: Dict, job_description: str,
+                                                 keyword_weight: float, timeout: float,
+                                                 prescreen: Optional[Dict] = None) -> Dict:
+        """
+        Parse and evaluate an unparsed resume with one LLM call. The parsed
+        fields are stored on the resume so callers can cache them.
+        """
+        parsed, llm_evaluation = await self._get_single_pass_evaluation_async(
+            resume['raw_text'], job_description, timeout
+        )
+        
+        if parsed is not None:
+            resume['parsed'] = parsed
+        return await self._evaluate_resume_async(
+            resume, job_description, keyword_weight, timeout, prescreen, llm_evaluation
+        )
+    
+    async def _evaluate_batch_async(self, indices: List[int], resumes: List[Dict], job_description: str,
+                                    keyword_weight: float, timeout: float,
+                                    prescreens: List[Dict]) -> List[Tuple[int, Dict]]:
+        """
+        Evaluate several resumes with one chat completion. Resumes the batch
+        response does not cover (missing, malformed, or the whole request
+        failing or timing out) are retried individually.
+        """
+        resume_texts = [prescreens[index]['resume_text'] for index in indices]
+        evaluations = await self._get_llm_evaluations_batch_async(resume_texts, job_description, timeout)
+        
+        retries = sum(1 for evaluation in evaluations if evaluation is None)
+        if retries:
+            logger.info(f"Retrying {retries} of {len(indices)} batched resumes individually")
+        
+        results = await asyncio.gather(*[
+            self._evaluate_resume_async(
+                resumes[index], job_description, keyword_weight, timeout, prescreens[index], evaluation
+            )
+            for index, evaluation in zip(indices, evaluations)
+        ])
+        return list(zip(indices, results))
+    
+    def _build_result(self, resume: Dict, llm_evaluation: Dict, keyword_score: float,
+                      keyword_weight: float) -> Dict:
+        """
+        Combine the LLM evaluation and keyword score into a ranking record.
+        """
+        # Combine scores
+        final_score = (keyword_weight * keyword_score + 
+                      (1 - keyword_weight) * llm_evaluation['overall_score'])
         
+        # Extract and preserve parsed data
+        parsed = resume.get('parsed', {}) or {}
+        skills = parsed.get('skills', [])
+        if not isinstance(skills, list):
+            skills = []
+        
+        return {
+            'file': resume.get('file', 'Unknown'),
+            'candidate_name': parsed.get('name', 'Unknown'),
+            'email': parsed.get('email', ''),
+            'final_score': round(final_score, 4),
+            'keyword_score': round(keyword_score, 4),
+            'llm_score': round(llm_evaluation['overall_score'], 4),
+            
+            # Detailed LLM evaluation
+            'experience_score': llm_evaluation['experience_score'],
+            'skills_score': llm_evaluation['skills_score'],
+            'education_score': llm_evaluation['education_score'],
+            'projects_score': llm_evaluation['projects_score'],
+            'career_progression_score': llm_evaluation['career_progression_score'],
+            'cultural_fit_score': llm_evaluation['cultural_fit_score'],
+            
+            # LLM insights
+            'strengths': llm_evaluation['strengths'],
+            'concerns': llm_evaluation['concerns'],
+            'missing_skills': llm_evaluation['missing_skills'],
+            'recommendation': llm_evaluation['recommendation'],
+            'reasoning': llm_evaluation['reasoning'],
+            
+            # Additional metadata
+            'total_experience': llm_evaluation.get('total_experience', 'Not specified'),
+            'education_level': llm_evaluation.get('education_level', 'Not specified'),
+            'key_achievements': llm_evaluation.get('key_achievements', []),
+            
+            # Skills from parsed resume
+            'skills': skills,
+            
+            # Preserve the entire parsed structure for downstream use
+            'parsed': parsed
+        }
+    
+    def finalize_ranking(self, ranked_results: List[Dict]) -> List[Dict]:
+        """
+        Sort results by final score and assign 1-based rank positions.
+        LLM-reviewed candidates rank ahead of prescreen-only ones, whose
+        scores are on a different scale.
+        """
         # Sort by final score descending
-        ranked_results.sort(key=lambda x: x.get('final_score', 0), reverse=True)
+        ranked_results.sort(key=ranking_sort_key, reverse=True)
         
         # Add ranking positions
         for i, result in enumerate(ranked_results, 1):
@@ -119,67 +452,284 @@ class LLMBasedRanker:
         
         return ranked_results
     
+    @cached_property
+    def evaluation_prompt_version(self) -> str:
+        """Evaluation cache key version for single and batched evaluations."""
+        return _prompt_version(
+            "eval",
+            self._compose_evaluation_messages("{resume_text}", "{job_description}"),
+            self._build_batch_evaluation_prompt([("R1", "{resume_text}")], "{job_description}")[0],
+            LLM_EVAL_PROMPT_TOKEN_BUDGET, LLM_EVAL_JD_MAX_TOKENS, LLM_EVAL_BATCH_RESUME_MAX_TOKENS
+        )
+    
+    @cached_property
+    def single_pass_prompt_version(self) -> str:
+        """Evaluation cache key version for single-pass (parse + evaluate) results."""
+        return _prompt_version(
+            "single",
+            self._build_single_pass_prompt("{resume_text}", "{job_description}")[0],
+            LLM_EVAL_PROMPT_TOKEN_BUDGET, LLM_EVAL_JD_MAX_TOKENS
+        )
+    
+    @property
+    def client(self) -> AzureOpenAI:
+        """Sync client from the shared registry."""
+        return openai_clients.get_client(CHAT)
+    
+    def _get_async_client(self) -> AsyncAzureOpenAI:
+        """
+        Return an async client bound to the running event loop.
+        """
+        return openai_clients.get_async_client(CHAT)
+    
     def _get_llm_evaluation(self, resume_text: str, job_description: str) -> Dict:
         """
         Get comprehensive LLM evaluation of resume against job description.
         """
-        prompt = self._build_evaluation_prompt(resume_text, job_description)
+        cache_key = evaluation_cache.make_key(resume_text, job_description, EVALUATION_MODEL, self.evaluation_prompt_version)
+        cached = evaluation_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        prompt, usage = self._build_evaluation_prompt(resume_text, job_description)
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-35-turbo",
+            response = chat_completion(
+                self.client,
+                model=EVALUATION_MODEL,
                 messages=prompt,
                 temperature=0.1,  # Low temperature for consistent evaluation
                 max_tokens=1500,
                 response_format={"type": "json_object"}
             )
+            token_usage.record('evaluation', usage, response)
             
-            evaluation_text = response.choices[0].message.content
-            evaluation = json.loads(evaluation_text)
+            evaluation = self._parse_evaluation(response.choices[0].message.content)
+            evaluation_cache.set(cache_key, evaluation)
+            return evaluation
             
-            # Ensure all required fields are present with defaults
-            return {
-                'overall_score': float(evaluation.get('overall_score', 0.5)),
-                'experience_score': float(evaluation.get('experience_score', 0.5)),
-                'skills_score': float(evaluation.get('skills_score', 0.5)),
-                'education_score': float(evaluation.get('education_score', 0.5)),
-                'projects_score': float(evaluation.get('projects_score', 0.5)),
-                'career_progression_score': float(evaluation.get('career_progression_score', 0.5)),
-                'cultural_fit_score': float(evaluation.get('cultural_fit_score', 0.5)),
-                'strengths': evaluation.get('strengths', []),
-                'concerns': evaluation.get('concerns', []),
-                'missing_skills': evaluation.get('missing_skills', []),
-                'recommendation': evaluation.get('recommendation', 'Neutral'),
-                'reasoning': evaluation.get('reasoning', 'No reasoning provided'),
-                'total_experience': evaluation.get('total_experience', 'Not specified'),
-                'education_level': evaluation.get('education_level', 'Not specified'),
-                'key_achievements': evaluation.get('key_achievements', [])
-            }
+        except RateLimitError as e:
+            # Still throttled after the scheduler's retries
+            logger.error(f"LLM evaluation rate limited: {str(e)}")
+            return self._default_evaluation('Automated evaluation was rate limited')
+        except Exception as e:
+            logger.error(f"LLM evaluation failed: {str(e)}")
+            # Return default neutral evaluation
+            return self._default_evaluation()
+    
+    async def _get_llm_evaluation_async(self, resume_text: str, job_description: str,
+                                        timeout: Optional[float] = None) -> Dict:
+        """
+        Async variant of _get_llm_evaluation using AsyncAzureOpenAI. timeout bounds
+        the request after the scheduler admits it, not the wait for admission.
+        """
+        cache_key = evaluation_cache.make_key(resume_text, job_description, EVALUATION_MODEL, self.evaluation_prompt_version)
+        cached = await evaluation_cache.get_async(cache_key)
+        if cached is not None:
+            return cached
+        
+        prompt, usage = self._build_evaluation_prompt(resume_text, job_description)
+        
+        try:
+            response = await chat_completion_async(
+                self._get_async_client(),
+                request_timeout=timeout,
+                model=EVALUATION_MODEL,
+                messages=prompt,
+                temperature=0.1,  # Low temperature for consistent evaluation
+                max_tokens=1500,
+                response_format={"type": "json_object"}
+            )
+            token_usage.record('evaluation', usage, response)
             
+            evaluation = self._parse_evaluation(response.choices[0].message.content)
+            await evaluation_cache.set_async(cache_key, evaluation)
+            return evaluation
+            
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM evaluation timed out after {timeout}s")
+            return self._default_evaluation('Automated evaluation timed out')
+        except RateLimitError as e:
+            # Still throttled after the scheduler's retries
+            logger.error(f"LLM evaluation rate limited: {str(e)}")
+            return self._default_evaluation('Automated evaluation was rate limited')
         except Exception as e:
             logger.error(f"LLM evaluation failed: {str(e)}")
             # Return default neutral evaluation
-            return {
-                'overall_score': 0.5,
-                'experience_score': 0.5,
-                'skills_score': 0.5,
-                'education_score': 0.5,
-                'projects_score': 0.5,
-                'career_progression_score': 0.5,
-                'cultural_fit_score': 0.5,
-                'strengths': [],
-                'concerns': ['Unable to evaluate due to processing error'],
-                'missing_skills': [],
-                'recommendation': 'Manual Review Required',
-                'reasoning': 'Automated evaluation failed',
-                'total_experience': 'Unknown',
-                'education_level': 'Unknown',
-                'key_achievements': []
-            }
+            return self._default_evaluation()
     
-    def _build_evaluation_prompt(self, resume_text: str, job_description: str) -> List[Dict]:
+    async def _get_llm_evaluations_batch_async(self, resume_texts: List[str], job_description: str,
+                                               timeout: Optional[float] = None) -> List[Optional[Dict]]:
         """
-        Build the few-shot prompt for LLM evaluation.
+        Evaluate several resumes in one request; the response is keyed by resume id.
+        Cached resumes are not resent and each new evaluation is cached on its own.
+        Returns one evaluation per input, None where the response had no usable
+        entry (or the request failed or ran longer than timeout once admitted).
+        """
+        cache_keys = [
+            evaluation_cache.make_key(text, job_description, EVALUATION_MODEL, self.evaluation_prompt_version)
+            for text in resume_texts
+        ]
+        evaluations: List[Optional[Dict]] = await evaluation_cache.get_many_async(cache_keys)
+        pending = [i for i, evaluation in enumerate(evaluations) if evaluation is None]
+        if not pending:
+            return evaluations
+        
+        resume_ids = [f"R{n}" for n in range(1, len(pending) + 1)]
+        prompt, usage = self._build_batch_evaluation_prompt(
+            list(zip(resume_ids, [resume_texts[i] for i in pending])), job_description
+        )
+        
+        try:
+            response = await chat_completion_async(
+                self._get_async_client(),
+                request_timeout=timeout,
+                model=EVALUATION_MODEL,
+                messages=prompt,
+                temperature=0.1,  # Low temperature for consistent evaluation
+                max_tokens=min(LLM_EVAL_BATCH_MAX_COMPLETION_TOKENS, 1500 * len(pending)),
+                response_format={"type": "json_object"}
+            )
+            token_usage.record('evaluation_batch', usage, response)
+            items = json.loads(response.choices[0].message.content).get('evaluations', [])
+        except asyncio.TimeoutError:
+            logger.warning(f"Batch evaluation of {len(pending)} resumes timed out after {timeout}s")
+            return evaluations
+        except Exception as e:
+            logger.error(f"Batch LLM evaluation failed: {str(e)}")
+            return evaluations
+        
+        by_id = {}
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and item.get('resume_id') in resume_ids:
+                by_id[item['resume_id']] = item
+        
+        new_entries = []
+        for resume_id, i in zip(resume_ids, pending):
+            item = by_id.get(resume_id)
+            if item is None or 'overall_score' not in item:
+                continue
+            try:
+                evaluations[i] = self._normalize_evaluation(item)
+            except (TypeError, ValueError):
+                continue
+            new_entries.append((cache_keys[i], evaluations[i]))
+        await evaluation_cache.set_many_async(new_entries)
+        return evaluations
+    
+    async def _get_single_pass_evaluation_async(self, raw_text: str, job_description: str,
+                                                timeout: Optional[float] = None) -> Tuple[Optional[Dict], Dict]:
+        """
+        One call returning (parsed resume fields, evaluation) for raw resume text.
+        On failure (or a request longer than timeout once admitted) parsed is None
+        and the evaluation is the neutral default.
+        """
+        cache_key = evaluation_cache.make_key(raw_text, job_description, EVALUATION_MODEL, self.single_pass_prompt_version)
+        cached = await evaluation_cache.get_async(cache_key)
+        if cached is not None:
+            return cached['parsed'], cached['evaluation']
+        
+        prompt, usage = self._build_single_pass_prompt(raw_text, job_description)
+        
+        try:
+            response = await chat_completion_async(
+                self._get_async_client(),
+                request_timeout=timeout,
+                model=EVALUATION_MODEL,
+                messages=prompt,
+                temperature=0.1,  # Low temperature for consistent evaluation
+                max_tokens=2000,
+                response_format={"type": "json_object"}
+            )
+            token_usage.record('single_pass', usage, response)
+            
+            content = json.loads(response.choices[0].message.content)
+            parsed = content.get('parsed')
+            evaluation = content.get('evaluation')
+            if not isinstance(parsed, dict) or not isinstance(evaluation, dict) or 'overall_score' not in evaluation:
+                raise ValueError("Single-pass response is missing parsed fields or the evaluation")
+            evaluation = self._normalize_evaluation(evaluation)
+            await evaluation_cache.set_async(cache_key, {'parsed': parsed, 'evaluation': evaluation})
+            return parsed, evaluation
+            
+        except asyncio.TimeoutError:
+            logger.warning(f"Single-pass evaluation timed out after {timeout}s")
+            return None, self._default_evaluation('Automated evaluation timed out')
+        except RateLimitError as e:
+            # Still throttled after the scheduler's retries
+            logger.error(f"Single-pass evaluation rate limited: {str(e)}")
+            return None, self._default_evaluation('Automated evaluation was rate limited')
+        except Exception as e:
+            logger.error(f"Single-pass evaluation failed: {str(e)}")
+            return None, self._default_evaluation()
+    
+    def _parse_evaluation(self, evaluation_text: str) -> Dict:
+        """
+        Parse the model's JSON response, filling defaults for missing fields.
+        """
+        return self._normalize_evaluation(json.loads(evaluation_text))
+    
+    def _normalize_evaluation(self, evaluation: Dict) -> Dict:
+        """
+        Coerce one evaluation object to the expected fields and types.
+        """
+        # Ensure all required fields are present with defaults
+        return {
+            'overall_score': float(evaluation.get('overall_score', 0.5)),
+            'experience_score': float(evaluation.get('experience_score', 0.5)),
+            'skills_score': float(evaluation.get('skills_score', 0.5)),
+            'education_score': float(evaluation.get('education_score', 0.5)),
+            'projects_score': float(evaluation.get('projects_score', 0.5)),
+            'career_progression_score': float(evaluation.get('career_progression_score', 0.5)),
+            'cultural_fit_score': float(evaluation.get('cultural_fit_score', 0.5)),
+            'strengths': evaluation.get('strengths', []),
+            'concerns': evaluation.get('concerns', []),
+            'missing_skills': evaluation.get('missing_skills', []),
+            'recommendation': evaluation.get('recommendation', 'Neutral'),
+            'reasoning': evaluation.get('reasoning', 'No reasoning provided'),
+            'total_experience': evaluation.get('total_experience', 'Not specified'),
+            'education_level': evaluation.get('education_level', 'Not specified'),
+            'key_achievements': evaluation.get('key_achievements', [])
+        }
+    
+    def _default_evaluation(self, reason: str = 'Automated evaluation failed') -> Dict:
+        """
+        Neutral evaluation used when the LLM call fails or times out.
+        """
+        return {
+            'overall_score': 0.5,
+            'experience_score': 0.5,
+            'skills_score': 0.5,
+            'education_score': 0.5,
+            'projects_score': 0.5,
+            'career_progression_score': 0.5,
+            'cultural_fit_score': 0.5,
+            'strengths': [],
+            'concerns': ['Unable to evaluate due to processing error'],
+            'missing_skills': [],
+            'recommendation': 'Manual Review Required',
+            'reasoning': reason,
+            'total_experience': 'Unknown',
+            'education_level': 'Unknown',
+            'key_achievements': []
+        }
+    
+    def _build_evaluation_prompt(self, resume_text: str, job_description: str) -> Tuple[List[Dict], Dict]:
+        """
+        Build the few-shot prompt for LLM evaluation within the prompt token budget.
+        The job description is capped first, then the resume's lowest-value
+        sections are trimmed to fit. Returns (messages, token usage).
+        """
+        job_description, _ = fit_text_to_budget(job_description, LLM_EVAL_JD_MAX_TOKENS, JD_SECTION_PRIORITIES)
+        return fit_prompt(
+            lambda text: self._compose_evaluation_messages(text, job_description),
+            resume_text,
+            LLM_EVAL_PROMPT_TOKEN_BUDGET
+        )
+    
+    def _compose_evaluation_messages(self, resume_text: str, job_description: str) -> List[Dict]:
+        """
+        Render the few-shot evaluation prompt for the given texts.
         """
         messages = [
             {
@@ -221,25 +771,83 @@ You must evaluate candidates based on these criteria:
 {resume_text}
 
 Provide a comprehensive evaluation in JSON format with all the following fields:
-- overall_score (0.0-1.0)
-- experience_score (0.0-1.0)
-- skills_score (0.0-1.0)
-- education_score (0.0-1.0)
-- projects_score (0.0-1.0)
-- career_progression_score (0.0-1.0)
-- cultural_fit_score (0.0-1.0)
-- strengths (array of strings)
-- concerns (array of strings)
-- missing_skills (array of strings)
-- recommendation (string: "Strong Hire" | "Hire" | "Consider" | "Weak Fit" | "No Hire")
-- reasoning (string explaining the overall assessment)
-- total_experience (string describing years/type of experience)
-- education_level (string describing highest education)
-- key_achievements (array of notable accomplishments)"""
+{EVALUATION_FIELDS}"""
         })
         
         return messages
     
+    def _build_batch_evaluation_prompt(self, resumes: List[Tuple[str, str]],
+                                       job_description: str) -> Tuple[List[Dict], Dict]:
+        """
+        Build one prompt evaluating several (resume_id, resume_text) pairs.
+        Shares the system prompt and few-shot examples of the single-resume
+        prompt; each resume is fitted to LLM_EVAL_BATCH_RESUME_MAX_TOKENS.
+        """
+        job_description, _ = fit_text_to_budget(job_description, LLM_EVAL_JD_MAX_TOKENS, JD_SECTION_PRIORITIES)
+        
+        resume_blocks = []
+        text_tokens = 0
+        trimmed = False
+        for resume_id, resume_text in resumes:
+            text_tokens += count_tokens(resume_text)
+            fitted, was_trimmed = fit_text_to_budget(resume_text, LLM_EVAL_BATCH_RESUME_MAX_TOKENS)
+            trimmed = trimmed or was_trimmed
+            resume_blocks.append(f"**Resume {resume_id}:**\n{fitted}")
+        
+        # System prompt and few-shot examples, without the single-resume request
+        messages = self._compose_evaluation_messages("", job_description)[:-1]
+        messages.append({
+            "role": "user",
+            "content": f"""Please evaluate each of the following {len(resumes)} resumes against the job description. Evaluate every resume independently; do not compare candidates with each other.
+
+**Job Description:**
+{job_description}
+
+{chr(10).join(resume_blocks)}
+
+Respond with a JSON object of the form {{"evaluations": [...]}} containing exactly one entry per resume. Each entry must have "resume_id" (one of: {", ".join(resume_id for resume_id, _ in resumes)}) and all the following fields:
+{EVALUATION_FIELDS}"""
+        })
+        
+        usage = {
+            'prompt_tokens': count_message_tokens(messages),
+            'budget': None,
+            'text_tokens': text_tokens,
+            'trimmed': trimmed,
+            'resumes': len(resumes)
+        }
+        return messages, usage
+    
+    def _build_single_pass_prompt(self, raw_text: str, job_description: str) -> Tuple[List[Dict], Dict]:
+        """
+        Build the parse-and-evaluate prompt within the evaluation token budget.
+        Uses the evaluation system prompt without few-shot examples, whose
+        answers have the single-task shape.
+        """
+        job_description, _ = fit_text_to_budget(job_description, LLM_EVAL_JD_MAX_TOKENS, JD_SECTION_PRIORITIES)
+        system_message = self._compose_evaluation_messages("", job_description)[0]
+        
+        def build_messages(resume_text: str) -> List[Dict]:
+            return [system_message, {
+                "role": "user",
+                "content": f"""Please read this resume once, extract its details and evaluate it against the job description.
+
+**Job Description:**
+{job_description}
+
+**Resume:**
+{resume_text}
+
+Respond with a JSON object with exactly two keys:
+"parsed": the candidate's details with these fields:
+{PARSED_FIELDS}
+
+"evaluation": a comprehensive evaluation with all the following fields:
+{EVALUATION_FIELDS}"""
+            }]
+        
+        return fit_prompt(build_messages, raw_text, LLM_EVAL_PROMPT_TOKEN_BUDGET)
+    
     def _create_few_shot_examples(self) -> List[Dict]:
         """
         Create few-shot examples for consistent LLM evaluation.
@@ -476,9 +1084,10 @@ SKILLS: HTML, CSS, JavaScript, PHP, WordPress, Photoshop"""
             }
         ]
     
-    def _extract_resume_content(self, resume: Dict) -> str:
+    def extract_resume_content(self, resume: Dict) -> str:
         """
-        Extract comprehensive resume content for LLM evaluation.
+        Extract comprehensive resume content for LLM evaluation. The prescreen
+        and the session inverted index score this text too.
         """
         content_parts = []
         
@@ -524,29 +1133,17 @@ SKILLS: HTML, CSS, JavaScript, PHP, WordPress, Photoshop"""
         
         return '\n'.join(content_parts) if content_parts else "No resume content available"
     
-    def _calculate_keyword_score(self, resume_text: str, job_description: str) -> float:
+    def _calculate_keyword_score(self, resume_text: str, job_description: str,
+                                 job_keywords: Optional[Set[str]] = None) -> float:
         """
         Calculate simple keyword matching score for the 30% weight component.
+        job_keywords (from the job description profile) skips re-tokenizing the job description.
         """
-        if not resume_text or not job_description:
+        if not resume_text or not (job_description or job_keywords):
             return 0.0
-        
-        resume_words = set(word.lower() for word in resume_text.split() if len(word) > 2)
-        job_words = set(word.lower() for word in job_description.split() if len(word) > 2)
-        
-        # Remove common stop words
-        stop_words = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 
-                     'her', 'was', 'one', 'our', 'had', 'with', 'have', 'this', 'will',
-                     'his', 'from', 'they', 'she', 'been', 'than', 'has', 'were'}
-        
-        resume_words = resume_words - stop_words
-        job_words = job_words - stop_words
-        
-        if not job_words:
-            return 0.0
-        
-        common_words = resume_words.intersection(job_words)
-        return len(common_words) / len(job_words)
+        if job_keywords is None:
+            job_keywords = keyword_terms(job_description)
+        return keyword_coverage(resume_text, job_keywords)
 
 
 # Global instance for easy import
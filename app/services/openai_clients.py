@@ -0,0 +1,132 @@
+"""
+Registry of Azure OpenAI clients.
+
+Clients are created on first use per endpoint (and optional deployment), so
+importing the app does not need credentials. All sync clients share one httpx
+connection pool and async clients share one pool per event loop, with
+keep-alive and HTTP/2 (when the h2 package is installed), so TLS handshakes
+happen once per connection rather than once per resume.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AzureOpenAI, AsyncAzureOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
+
+from app.config import (
+    AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_CHAT_ENDPOINT, AZURE_OPENAI_CHAT_API_KEY,
+    AZURE_OPENAI_EMBEDDINGS_ENDPOINT, AZURE_OPENAI_EMBEDDINGS_API_KEY,
+    OPENAI_HTTP_MAX_CONNECTIONS, OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_HTTP_KEEPALIVE_EXPIRY_SECONDS, OPENAI_HTTP_TIMEOUT_SECONDS, OPENAI_HTTP2
+)
+
+logger = logging.getLogger(__name__)
+
+# Endpoint names used by the services
+CHAT = "chat"                # Resume parsing and evaluation (gpt-35-turbo)
+EMBEDDINGS = "embeddings"    # text-embedding-3-large
+
+ENDPOINTS: Dict[str, Dict[str, str]] = {
+    CHAT: {"azure_endpoint": AZURE_OPENAI_CHAT_ENDPOINT, "api_key": AZURE_OPENAI_CHAT_API_KEY},
+    EMBEDDINGS: {"azure_endpoint": AZURE_OPENAI_EMBEDDINGS_ENDPOINT, "api_key": AZURE_OPENAI_EMBEDDINGS_API_KEY},
+}
+
+ClientKey = Tuple[str, Optional[str]]
+
+
+def _http_options() -> Dict:
+    http2 = OPENAI_HTTP2 and importlib.util.find_spec("h2") is not None
+    logger.info(f"Creating OpenAI connection pool (http2={http2})")
+    return {
+        "limits": httpx.Limits(
+            max_connections=OPENAI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_HTTP_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        "timeout": httpx.Timeout(OPENAI_HTTP_TIMEOUT_SECONDS, connect=10.0),
+        "http2": http2
+    }
+
+
+class OpenAIClientRegistry:
+    """
+    Lazily created, pooled sync and async clients keyed by (endpoint, deployment).
+    """
+
+    def __init__(self, endpoints: Dict[str, Dict[str, str]] = ENDPOINTS):
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._clients: Dict[ClientKey, AzureOpenAI] = {}
+        # httpx.AsyncClient is bound to the event loop it is used on; entries go
+        # away with their loop (e.g. asyncio.run in job workers)
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _client_options(self, endpoint: str, deployment: Optional[str]) -> Dict:
+        try:
+            settings = self.endpoints[endpoint]
+        except KeyError:
+            raise ValueError(f"Unknown OpenAI endpoint: {endpoint}")
+        if not settings.get("azure_endpoint") or not settings.get("api_key"):
+            raise RuntimeError(f"Azure OpenAI credentials for '{endpoint}' are not configured")
+        options = {
+            "azure_endpoint": settings["azure_endpoint"],
+            "api_key": settings["api_key"],
+            "api_version": AZURE_OPENAI_API_VERSION,
+            "max_retries": 0  # Retries and throttling are handled by the scheduler
+        }
+        if deployment:
+            options["azure_deployment"] = deployment
+        return options
+
+    def get_client(self, endpoint: str = CHAT, deployment: Optional[str] = None) -> AzureOpenAI:
+        """Sync client for an endpoint, sharing the process-wide connection pool."""
+        key = (endpoint, deployment)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                options = self._client_options(endpoint, deployment)
+                if self._http_client is None:
+                    self._http_client = DefaultHttpxClient(**_http_options())
+                client = AzureOpenAI(http_client=self._http_client, **options)
+                self._clients[key] = client
+            return client
+
+    def get_async_client(self, endpoint: str = CHAT, deployment: Optional[str] = None) -> AsyncAzureOpenAI:
+        """Async client for an endpoint, sharing a connection pool per running event loop."""
+        loop = asyncio.get_running_loop()
+        key = (endpoint, deployment)
+        with self._lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                entry = {"http_client": None, "clients": {}}
+                self._async_clients[loop] = entry
+            client = entry["clients"].get(key)
+            if client is None:
+                options = self._client_options(endpoint, deployment)
+                if entry["http_client"] is None:
+                    entry["http_client"] = DefaultAsyncHttpxClient(**_http_options())
+                client = AsyncAzureOpenAI(http_client=entry["http_client"], **options)
+                entry["clients"][key] = client
+            return client
+
+    def close(self) -> None:
+        """Close the sync connection pool; async pools are dropped with their event loop."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._clients = {}
+
+
+# Global instance
+openai_clients = OpenAIClientRegistry()
@@ -0,0 +1,403 @@
+"""
+Rate-limit-aware scheduler for Azure OpenAI traffic.
+
+Every chat completion and embeddings request goes through the scheduler of its
+deployment, which
+- paces requests with requests-per-minute and tokens-per-minute token buckets,
+  reserving the prompt plus the completion size the deployment's responses
+  actually have (not max_tokens) and settling each reservation against the
+  usage the response reports,
+- bounds requests in flight with an adaptive (AIMD) concurrency limit that is
+  halved on throttling and grows back by one per window of successes,
+- retries 429s after Retry-After (pausing the whole deployment) and transient
+  connection/5xx errors with exponential backoff.
+
+Clients are created with max_retries=0 so throttling is visible here instead of
+being retried blindly inside the SDK. Sync and async callers share the same
+buckets and limits.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+
+from app.config import (
+    OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, OPENAI_MAX_CONCURRENCY, OPENAI_MIN_CONCURRENCY,
+    OPENAI_MAX_RETRIES, OPENAI_DEPLOYMENT_LIMITS
+)
+from app.services.token_budget import count_message_tokens, count_tokens
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Completion tokens reserved before a deployment has reported any usage
+DEFAULT_COMPLETION_TOKENS = 1000
+
+# Later reservations use a moving average of reported completion sizes plus headroom
+COMPLETION_AVERAGE_WEIGHT = 0.2
+COMPLETION_HEADROOM = 1.25
+
+# Backoff for errors without Retry-After
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Repeated 429s within this window count as one throttling event
+THROTTLE_COOLDOWN_SECONDS = 2.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at capacity per minute.
+    reserve() books capacity immediately and returns how long the caller must
+    wait for it, so waiting happens outside the lock (time.sleep or asyncio.sleep).
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+            self._updated = now
+            self._level -= amount
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """Charge (or with a negative amount, refund) capacity after the fact."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate - amount)
+            self._updated = now
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency gate usable from threads and event loops, with an AIMD limit.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = self.maximum
+        self.in_flight = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._async_waiters = deque()
+
+    def _try_acquire_locked(self) -> bool:
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self) -> None:
+        with self._condition:
+            while not self._try_acquire_locked():
+                self._condition.wait()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._try_acquire_locked():
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_locked()
+
+    def _wake_locked(self) -> None:
+        # Wake everyone; waiters re-check the limit and re-queue if still full
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, deque()
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_waiter, waiter)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def on_success(self) -> None:
+        """Additive increase: one more slot after a full window of successes."""
+        with self._lock:
+            self._successes += 1
+            if self.limit < self.maximum and self._successes >= self.limit:
+                self.limit += 1
+                self._successes = 0
+                self._wake_locked()
+
+    def on_throttle(self) -> None:
+        """Multiplicative decrease, once per cooldown window."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < THROTTLE_COOLDOWN_SECONDS:
+                return
+            self._last_decrease = now
+            self._successes = 0
+            self.limit = max(self.minimum, self.limit // 2)
+
+
+def _resolve_waiter(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the service (retry-after-ms or Retry-After), if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    return isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError))
+
+
+class OpenAIScheduler:
+    """
+    Scheduler for one deployment; see the module docstring.
+    """
+
+    def __init__(self, deployment: str, rpm: int = OPENAI_RPM_LIMIT, tpm: int = OPENAI_TPM_LIMIT,
+                 max_concurrency: int = OPENAI_MAX_CONCURRENCY, min_concurrency: int = OPENAI_MIN_CONCURRENCY,
+                 max_retries: int = OPENAI_MAX_RETRIES):
+        self.deployment = deployment
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrencyLimiter(max_concurrency, min_concurrency)
+        self.max_retries = max_retries
+        self._paused_until = 0.0
+        self._completion_average: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'throttled': 0, 'retries': 0, 'failures': 0, 'timeouts': 0,
+                       'tokens_reserved': 0, 'tokens_used': 0}
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    def expected_completion_tokens(self, max_tokens: Optional[int] = None) -> int:
+        """Completion tokens to reserve for a request: the observed size with headroom, at most max_tokens."""
+        with self._lock:
+            average = self._completion_average
+        expected = DEFAULT_COMPLETION_TOKENS if average is None else average * COMPLETION_HEADROOM
+        return int(min(max_tokens, expected) if max_tokens else expected)
+
+    def _settle(self, reserved: int, result) -> None:
+        """Correct the token bucket by what the response says it used, and learn the completion size."""
+        usage = getattr(result, 'usage', None)
+        total = getattr(usage, 'total_tokens', None)
+        completion = getattr(usage, 'completion_tokens', None)
+        if isinstance(completion, int):
+            with self._lock:
+                if self._completion_average is None:
+                    self._completion_average = float(completion)
+                else:
+                    self._completion_average += COMPLETION_AVERAGE_WEIGHT * (completion - self._completion_average)
+        if isinstance(total, int):
+            self._count('tokens_used', total)
+            self.tokens.adjust(total - reserved)
+
+    def _admission_delay(self, tokens: int) -> float:
+        """Book one request and its tokens; returns how long to wait before sending."""
+        self._count('tokens_reserved', tokens)
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+        return max(delay, pause, 0.0)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Delay before retrying; 429s pause the whole deployment and shrink concurrency."""
+        retry_after = _retry_after_seconds(error)
+        if isinstance(error, openai.RateLimitError):
+            self._count('throttled')
+            self.concurrency.on_throttle()
+            if retry_after is None:
+                retry_after = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logger.warning(f"{self.deployment}: throttled, retrying in {retry_after:.1f}s "
+                           f"(concurrency limit {self.concurrency.limit})")
+            return retry_after
+        if retry_after is not None:
+            return retry_after
+        # Jitter spreads retries of requests that failed together
+        return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)) * (0.5 + random.random() / 2)
+
+    def call(self, request: Callable[[], T], tokens: int) -> T:
+        """Run a blocking API request under this deployment's limits."""
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._admission_delay(tokens))
+            self.concurrency.acquire()
+            try:
+                self._count('requests')
+                result = request()
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    self._count('failures')
+                    raise
+                delay = self._retry_delay(e, attempt)
+            else:
+                self.concurrency.on_success()
+                self._settle(tokens, result)
+                return result
+            finally:
+                self.concurrency.release()
+            self._count('retries')
+            time.sleep(delay)
+
+    async def call_async(self, request: Callable[[], Awaitable[T]], tokens: int,
+                         timeout: Optional[float] = None) -> T:
+        """
+        Run an async API request under this deployment's limits. timeout bounds
+        each request once it is admitted (time spent waiting for rate limits or
+        Retry-After does not count); a timed-out request raises asyncio.TimeoutError
+        without being retried.
+        """
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._admission_delay(tokens))
+            await self.concurrency.acquire_async()
+            try:
+                self._count('requests')
+                result = await asyncio.wait_for(request(), timeout) if timeout is not None else await request()
+            except asyncio.TimeoutError:
+                self._count('timeouts')
+                raise
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    self._count('failures')
+                    raise
+                delay = self._retry_delay(e, attempt)
+            else:
+                self.concurrency.on_success()
+                self._settle(tokens, result)
+                return result
+            finally:
+                self.concurrency.release()
+            self._count('retries')
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['concurrency_limit'] = self.concurrency.limit
+        stats['in_flight'] = self.concurrency.in_flight
+        return stats
+
+
+# ========== Registry and request helpers ==========
+
+_schedulers: Dict[str, OpenAIScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def _deployment_limits() -> Dict[str, Dict]:
+    try:
+        limits = json.loads(OPENAI_DEPLOYMENT_LIMITS) if OPENAI_DEPLOYMENT_LIMITS else {}
+        return limits if isinstance(limits, dict) else {}
+    except ValueError:
+        logger.warning("Ignoring invalid OPENAI_DEPLOYMENT_LIMITS")
+        return {}
+
+
+def get_scheduler(deployment: str) -> OpenAIScheduler:
+    """The process-wide scheduler for a deployment, created on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(deployment)
+        if scheduler is None:
+            limits = _deployment_limits().get(deployment, {})
+            scheduler = OpenAIScheduler(
+                deployment,
+                rpm=int(limits.get('rpm', OPENAI_RPM_LIMIT)),
+                tpm=int(limits.get('tpm', OPENAI_TPM_LIMIT)),
+                max_concurrency=int(limits.get('max_concurrency', OPENAI_MAX_CONCURRENCY))
+            )
+            _schedulers[deployment] = scheduler
+        return scheduler
+
+
+def scheduler_stats() -> Dict[str, Dict]:
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {scheduler.deployment: scheduler.stats() for scheduler in schedulers}
+
+
+def _chat_tokens(scheduler: OpenAIScheduler, kwargs: Dict) -> int:
+    # Reserving max_tokens would admit a fraction of the requests the TPM quota
+    # allows (completions are usually far shorter); if Azure's own admission,
+    # which does count max_tokens, throttles us, the 429 path backs off
+    max_tokens = kwargs.get('max_tokens') or kwargs.get('max_completion_tokens')
+    return count_message_tokens(kwargs.get('messages', [])) + scheduler.expected_completion_tokens(max_tokens)
+
+
+def _embedding_tokens(inputs) -> int:
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    return sum(count_tokens(text) for text in inputs)
+
+
+def chat_completion(client, **kwargs):
+    """client.chat.completions.create(**kwargs) through the deployment's scheduler."""
+    scheduler = get_scheduler(kwargs['model'])
+    return scheduler.call(
+        lambda: client.chat.completions.create(**kwargs), _chat_tokens(scheduler, kwargs)
+    )
+
+
+async def chat_completion_async(client, request_timeout: Optional[float] = None, **kwargs):
+    """
+    Async variant of chat_completion for AsyncAzureOpenAI clients. request_timeout
+    bounds the request itself, not the wait for rate-limit admission.
+    """
+    scheduler = get_scheduler(kwargs['model'])
+    return await scheduler.call_async(
+        lambda: client.chat.completions.create(**kwargs), _chat_tokens(scheduler, kwargs), request_timeout
+    )
+
+
+def create_embeddings(client, **kwargs):
+    """client.embeddings.create(**kwargs) through the deployment's scheduler."""
+    return get_scheduler(kwargs['model']).call(
+        lambda: client.embeddings.create(**kwargs), _embedding_tokens(kwargs.get('input', []))
+    )
@@ -1,27 +1,36 @@
 import os
 import zipfile
-import tempfile
 import docx2txt
 import PyPDF2
 import openai
 import json
 import io
+import asyncio
+import threading
+from concurrent.futures.process import BrokenProcessPool
 
 from ml.preprocessing import preprocess_resume_text
 from app.services.blob_storage import blob_storage
-from app.services.enhanced_text_extractor import enhanced_extractor
-
-# Configure OpenAI / Azure OpenAI
-from openai import AzureOpenAI
-
-client = AzureOpenAI(
-    api_key="C6GA6hGNxN48a6A2jR6JyhDYTzbnwfvHJuYTM2FUz4olCPa2mBq0JQQJ99BIAC77bzfXJ3w3AAABACOGAz1x",
-    api_version="2024-12-01-preview",
-    azure_endpoint="https://parseroa.openai.azure.com/"
+from app.services.enhanced_text_extractor import (
+    can_start_pool, enhanced_extractor, new_process_pool
+)
+from app.services.token_budget import fit_prompt, token_usage
+from app.services.openai_scheduler import chat_completion
+from app.services.openai_clients import openai_clients, CHAT
+from app.config import (
+    LLM_PARSE_PROMPT_TOKEN_BUDGET, ZIP_EXTRACT_WORKERS, ZIP_PARSE_CONCURRENCY, ZIP_MAX_MEMBERS,
+    ZIP_MAX_UNCOMPRESSED_BYTES, ZIP_MAX_MEMBER_BYTES
 )
 
 UPLOAD_DIR = "data/processed"
 
+# Parsed output is cached next to the raw blobs as parsed/<file>.json and is
+# reused while the raw blob's fingerprint (content MD5 or ETag) is unchanged.
+PARSE_CACHE_PREFIX = "parsed/"
+PARSE_CACHE_VERSION = 1
+
+RESUME_EXTENSIONS = [".pdf", ".docx", ".txt"]
+
 
 def extract_text(file_path: str) -> str:
     """Extract raw text from PDF, DOCX, or TXT using enhanced extraction."""
@@ -51,16 +60,21 @@ def extract_text(file_path: str) -> str:
         return text
 
 
-def extract_text_from_blob(blob_name: str, user_id: str = None) -> str:
+def extract_text_from_blob(blob_name: str, user_id: str = None, session_id: str = None) -> str:
     """Extract raw text from a blob in Azure Blob Storage using enhanced extraction."""
     ext = os.path.splitext(blob_name)[1].lower()
     
     # Download blob content to memory using session-based structure
     if user_id:
-        file_content = blob_storage.download_file_session(blob_name, user_id)
+        file_content = blob_storage.download_file_session(blob_name, user_id, session_id)
     else:
         file_content = blob_storage.download_file(blob_name)
-    
+
+    return extract_text_from_bytes(file_content, ext)
+
+
+def extract_text_from_bytes(file_content: bytes, ext: str) -> str:
+    """Extract raw text from in-memory PDF, DOCX, or TXT content using enhanced extraction."""
     try:
         # Use enhanced text extractor
         extraction_result = enhanced_extractor.extract_text_from_bytes(file_content, ext)
@@ -76,15 +90,8 @@ def extract_text_from_blob(blob_name: str, user_id: str = None) -> str:
             reader = PyPDF2.PdfReader(file_stream)
             text = " ".join([page.extract_text() for page in reader.pages if page.extract_text()])
         elif ext == ".docx":
-            # For docx, we need to save to a temporary file since docx2txt.process expects a file path
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-                temp_file.write(file_content)
-                temp_path = temp_file.name
-            
-            try:
-                text = docx2txt.process(temp_path)
-            finally:
-                os.unlink(temp_path)
+            # docx2txt.process accepts file-like objects
+            text = docx2txt.process(file_stream)
         elif ext == ".txt":
             text = file_content.decode('utf-8')
         else:
@@ -155,20 +162,25 @@ B.Tech in Computer Science | XYZ University | 2019"""
         }
     ]
 
-    # Add the actual resume with emphasis on skills
-    few_shot_examples.append({
-        "role": "user",
-        "content": f"""Extract key details from this resume. Make sure to extract ALL skills, technologies, programming languages, frameworks, tools, and platforms mentioned anywhere in the resume.
+    # Add the actual resume with emphasis on skills, trimmed to the prompt token budget
+    def build_messages(resume_text: str) -> list:
+        return few_shot_examples + [{
+            "role": "user",
+            "content": f"""Extract key details from this resume. Make sure to extract ALL skills, technologies, programming languages, frameworks, tools, and platforms mentioned anywhere in the resume.
 
 Resume:
-{text}"""
-    })
+{resume_text}"""
+        }]
 
-    response = client.chat.completions.create(
+    messages, usage = fit_prompt(build_messages, text, LLM_PARSE_PROMPT_TOKEN_BUDGET)
+
+    response = chat_completion(
+        openai_clients.get_client(CHAT),
         model="gpt-35-turbo",  # Azure deployment name
-        messages=few_shot_examples,
+        messages=messages,
         temperature=0.0
     )
+    token_usage.record("parse", usage, response)
 
     parsed_output = response.choices[0].message.content
 
@@ -178,109 +190,343 @@ Resume:
         return {"raw_response": parsed_output}
 
 
-def parse_resume(file_path: str) -> dict:
-    """Full pipeline: extract raw text, preprocess, then parse with GPT."""
-    raw_text = extract_text(file_path)
+def parse_resume(file_path: str, use_gpt: bool = True) -> dict:
+    """Full pipeline: extract raw text, preprocess, then parse with GPT.
+
+    With use_gpt=False the GPT step is skipped: "parsed" is None and the raw
+    text is kept under "raw_text" for single-pass ranking.
+    """
+    return _parse_extracted(os.path.basename(file_path), extract_text(file_path), use_gpt)
+
 
+def parse_resume_bytes(file_content: bytes, file_name: str, use_gpt: bool = True) -> dict:
+    """parse_resume for in-memory content (e.g. an upload); file_name gives the format and "file"."""
+    ext = os.path.splitext(file_name)[1].lower()
+    return _parse_extracted(os.path.basename(file_name), extract_text_from_bytes(file_content, ext), use_gpt)
+
+
+def _parse_extracted(file_name: str, raw_text: str, use_gpt: bool) -> dict:
     # Save extracted raw text
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-    processed_file = os.path.join(UPLOAD_DIR, os.path.basename(file_path) + ".txt")
+    processed_file = os.path.join(UPLOAD_DIR, file_name + ".txt")
     with open(processed_file, "w", encoding="utf-8") as f:
         f.write(raw_text)
 
     # Step 1: Preprocess
     preprocessed = preprocess_resume_text(raw_text)
 
+    if not use_gpt:
+        return {
+            "file": file_name,
+            "preprocessed": preprocessed,
+            "parsed": None,
+            "raw_text": raw_text
+        }
+
     # Step 2: GPT Parsing
     parsed_resume = parse_resume_with_gpt(raw_text)
 
     # Merge results
     return {
-        "file": os.path.basename(file_path),
+        "file": file_name,
         "preprocessed": preprocessed,
         "parsed": parsed_resume
     }
 
 
-def parse_resume_from_blob(blob_name: str, user_id: str = None) -> dict:
-    """Full pipeline: extract raw text from blob, preprocess, then parse with GPT."""
-    raw_text = extract_text_from_blob(blob_name, user_id=user_id)
+def _parse_cache_blob_name(blob_name: str) -> str:
+    """Blob name of the cached parse result for a raw resume blob."""
+    return f"{PARSE_CACHE_PREFIX}{os.path.basename(blob_name)}.json"
+
+
+def load_cached_parse(blob_name: str, fingerprint: str, user_id: str = None, session_id: str = None):
+    """Return the cached parse result for blob_name if its fingerprint still matches, else None."""
+    if not fingerprint:
+        return None
+    cache_blob_name = _parse_cache_blob_name(blob_name)
+    try:
+        if user_id:
+            content = blob_storage.download_file_session(cache_blob_name, user_id, session_id)
+        else:
+            content = blob_storage.download_file(cache_blob_name)
+        cached = json.loads(content.decode("utf-8"))
+    except Exception:
+        return None
+    if cached.get("version") != PARSE_CACHE_VERSION or cached.get("fingerprint") != fingerprint:
+        return None
+    return cached.get("result")
+
+
+def store_cached_parse(blob_name: str, fingerprint: str, result, user_id: str = None,
+                       session_id: str = None) -> None:
+    """Persist a parse result (dict, or list for ZIPs) alongside the raw blob."""
+    if not fingerprint:
+        return
+    payload = json.dumps({
+        "version": PARSE_CACHE_VERSION,
+        "blob_name": blob_name,
+        "fingerprint": fingerprint,
+        "result": result
+    }).encode("utf-8")
+    cache_blob_name = _parse_cache_blob_name(blob_name)
+    try:
+        if user_id:
+            blob_storage.upload_file_session(payload, cache_blob_name, user_id, session_id)
+        else:
+            blob_storage.upload_file(payload, cache_blob_name)
+    except Exception as e:
+        print(f"Failed to store parse cache for {blob_name}: {e}")
+
+
+def _is_cacheable_parse(parsed: dict) -> bool:
+    """GPT responses that were not valid JSON (or not parsed yet) are retried rather than cached."""
+    return (
+        isinstance(parsed, dict)
+        and isinstance(parsed.get("parsed"), dict)
+        and "raw_response" not in parsed["parsed"]
+    )
+
+
+def store_completed_parse(blob_name: str, fingerprint: str, resumes: list, user_id: str = None,
+                          session_id: str = None) -> bool:
+    """Cache resumes parsed after collection (single-pass ranking fills "parsed" later).
+
+    ZIP archives are cached as their member list, other blobs as their single
+    resume; nothing is stored unless every resume parsed cleanly.
+    """
+    if not resumes or not all(_is_cacheable_parse(resume) for resume in resumes):
+        return False
+    results = [{k: v for k, v in resume.items() if k != "raw_text"} for resume in resumes]
+    result = results if os.path.splitext(blob_name)[1].lower() == ".zip" else results[0]
+    store_cached_parse(blob_name, fingerprint, result, user_id=user_id, session_id=session_id)
+    return True
+
+
+def parse_resume_from_blob(blob_name: str, user_id: str = None, fingerprint: str = None,
+                           session_id: str = None, use_gpt: bool = True) -> dict:
+    """Full pipeline: extract raw text from blob, preprocess, then parse with GPT.
+
+    When a fingerprint is given, a cached result for an unchanged blob is
+    returned without downloading, extracting or calling GPT. With
+    use_gpt=False an uncached blob is returned with "parsed" None and its
+    "raw_text", and is not cached (see store_completed_parse).
+    """
+    cached = load_cached_parse(blob_name, fingerprint, user_id=user_id, session_id=session_id)
+    if cached is not None:
+        return cached
+
+    raw_text = extract_text_from_blob(blob_name, user_id=user_id, session_id=session_id)
 
     # Save extracted raw text to blob storage using session-based structure
     processed_blob_name = f"processed/{os.path.basename(blob_name)}.txt"
     if user_id:
-        blob_storage.upload_file_session(raw_text.encode('utf-8'), processed_blob_name, user_id)
+        blob_storage.upload_file_session(raw_text.encode('utf-8'), processed_blob_name, user_id, session_id)
     else:
         blob_storage.upload_file(raw_text.encode('utf-8'), processed_blob_name)
 
     # Step 1: Preprocess
     preprocessed = preprocess_resume_text(raw_text)
 
+    if not use_gpt:
+        return {
+            "file": os.path.basename(blob_name),
+            "blob_name": blob_name,
+            "processed_blob_name": processed_blob_name,
+            "preprocessed": preprocessed,
+            "parsed": None,
+            "raw_text": raw_text
+        }
+
     # Step 2: GPT Parsing
     parsed_resume = parse_resume_with_gpt(raw_text)
 
     # Merge results
-    return {
+    result = {
         "file": os.path.basename(blob_name),
         "blob_name": blob_name,
         "processed_blob_name": processed_blob_name,
         "preprocessed": preprocessed,
         "parsed": parsed_resume
     }
+    if _is_cacheable_parse(result):
+        store_cached_parse(blob_name, fingerprint, result, user_id=user_id, session_id=session_id)
+    return result
+
+
+# ========== ZIP archives ==========
+
+_extraction_pool = None
+_extraction_pool_disabled = False
+_extraction_pool_lock = threading.Lock()
+
+
+def _get_extraction_pool():
+    """
+    Shared process pool for member extraction, or None to use worker threads:
+    with ZIP_EXTRACT_WORKERS <= 1, after the pool failed to start, and inside
+    daemon processes or extraction workers, which cannot or should not start
+    children.
+    """
+    global _extraction_pool
+    if ZIP_EXTRACT_WORKERS <= 1 or _extraction_pool_disabled or not can_start_pool():
+        return None
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = new_process_pool(ZIP_EXTRACT_WORKERS)
+        return _extraction_pool
+
+
+def _discard_extraction_pool(pool, disable: bool = False) -> None:
+    """
+    Drop a broken pool so the next archive starts a fresh one; with disable,
+    extraction stays in threads for the rest of the process (the pool cannot start).
+    """
+    global _extraction_pool, _extraction_pool_disabled
+    with _extraction_pool_lock:
+        if disable:
+            _extraction_pool_disabled = True
+        if pool is not None and _extraction_pool is pool:
+            _extraction_pool = None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _resume_members(zip_ref: zipfile.ZipFile) -> list:
+    """
+    Resume entries of an archive, checked against ZIP_MAX_MEMBERS and
+    ZIP_MAX_UNCOMPRESSED_BYTES from the central directory before anything is read.
+    """
+    members = [
+        info for info in zip_ref.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and os.path.splitext(info.filename)[1].lower() in RESUME_EXTENSIONS
+    ]
+    if len(members) > ZIP_MAX_MEMBERS:
+        raise ValueError(f"ZIP archive has {len(members)} resumes; the limit is {ZIP_MAX_MEMBERS}")
+    total_size = sum(info.file_size for info in members)
+    if total_size > ZIP_MAX_UNCOMPRESSED_BYTES:
+        raise ValueError(
+            f"ZIP archive expands to {total_size} bytes; the limit is {ZIP_MAX_UNCOMPRESSED_BYTES}"
+        )
+    return members
+
+
+def _read_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    """Member content, reading at most ZIP_MAX_MEMBER_BYTES (declared sizes are not trusted)."""
+    if info.file_size > ZIP_MAX_MEMBER_BYTES:
+        raise ValueError(f"File is larger than {ZIP_MAX_MEMBER_BYTES} bytes")
+    with zip_ref.open(info) as member:
+        data = member.read(ZIP_MAX_MEMBER_BYTES + 1)
+    if len(data) > ZIP_MAX_MEMBER_BYTES:
+        raise ValueError(f"File is larger than {ZIP_MAX_MEMBER_BYTES} bytes")
+    return data
+
+
+def _extract_member(file_name: str, data: bytes) -> dict:
+    """Extract and preprocess one member (runs in the extraction pool)."""
+    raw_text = extract_text_from_bytes(data, os.path.splitext(file_name)[1].lower())
+    return {
+        "file": file_name,
+        "preprocessed": preprocess_resume_text(raw_text),
+        "raw_text": raw_text
+    }
 
 
-def parse_zip(file_path: str) -> list:
-    """Handle ZIP file containing multiple resumes."""
-    parsed_results = []
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        with zipfile.ZipFile(file_path, "r") as zip_ref:
-            zip_ref.extractall(tmpdir)
-
-        for root, _, files in os.walk(tmpdir):
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext in [".pdf", ".docx", ".txt"]:
-                    try:
-                        resume_path = os.path.join(root, file)
-                        parsed = parse_resume(resume_path)
-                        parsed_results.append(parsed)
-                    except Exception as e:
-                        parsed_results.append({"file": file, "error": str(e)})
-
-    return parsed_results
-
-
-def parse_zip_from_blob(blob_name: str, user_id: str = None) -> list:
-    """Handle ZIP file containing multiple resumes from blob storage."""
-    parsed_results = []
+async def parse_zip_archive(zip_ref: zipfile.ZipFile, use_gpt: bool = True) -> list:
+    """Parse every resume in an open archive, in archive order.
+
+    Members are read one window at a time straight from the archive (in a
+    worker thread) and extracted in the process pool, so at most 2 x ZIP_EXTRACT_WORKERS members
+    are held in memory; GPT parsing of extracted members overlaps with that,
+    at most ZIP_PARSE_CONCURRENCY calls at a time. Members that fail (or
+    exceed ZIP_MAX_MEMBER_BYTES) get an error entry. With use_gpt=False
+    "parsed" is None and the raw text is kept under "raw_text".
+    """
+    members = _resume_members(zip_ref)
+    loop = asyncio.get_running_loop()
+    extract_slots = asyncio.Semaphore(max(1, ZIP_EXTRACT_WORKERS) * 2)
+    parse_slots = asyncio.Semaphore(max(1, ZIP_PARSE_CONCURRENCY))
+
+    read_lock = threading.Lock()
+
+    def read(info: zipfile.ZipInfo) -> bytes:
+        # Members share the archive's file object; reads run in worker threads one at a time
+        with read_lock:
+            return _read_member(zip_ref, info)
+
+    async def extract(file_name: str, data: bytes) -> dict:
+        pool = None
+        try:
+            pool = _get_extraction_pool()
+            if pool is not None:
+                future = loop.run_in_executor(pool, _extract_member, file_name, data)
+        except Exception as e:
+            # Worker processes start on submit; any failure there means no pool in this process
+            print(f"ZIP extraction pool unavailable, extracting in threads: {e}")
+            _discard_extraction_pool(pool, disable=True)
+            pool = None
+        if pool is None:
+            return await asyncio.to_thread(_extract_member, file_name, data)
+        try:
+            return await future
+        except BrokenProcessPool:
+            print("ZIP extraction pool failed, extracting in a thread")
+            _discard_extraction_pool(pool)
+            return await asyncio.to_thread(_extract_member, file_name, data)
+
+    async def process(info: zipfile.ZipInfo) -> dict:
+        file_name = os.path.basename(info.filename)
+        try:
+            async with extract_slots:
+                data = await asyncio.to_thread(read, info)
+                result = await extract(file_name, data)
+            raw_text = result.pop("raw_text")
+            if not use_gpt:
+                result.update({"parsed": None, "raw_text": raw_text})
+                return result
+            async with parse_slots:
+                result["parsed"] = await asyncio.to_thread(parse_resume_with_gpt, raw_text)
+            return result
+        except Exception as e:
+            return {"file": file_name, "error": str(e)}
+
+    return await asyncio.gather(*[process(info) for info in members])
+
+
+def parse_zip(file_path: str, use_gpt: bool = True) -> list:
+    """Handle ZIP file containing multiple resumes; members are read in place, nothing is extracted to disk."""
+    with zipfile.ZipFile(file_path, "r") as zip_ref:
+        return asyncio.run(parse_zip_archive(zip_ref, use_gpt=use_gpt))
+
+
+def parse_zip_bytes(zip_content: bytes, use_gpt: bool = True) -> list:
+    """Handle an in-memory ZIP archive (e.g. an upload or a downloaded blob)."""
+    with zipfile.ZipFile(io.BytesIO(zip_content), "r") as zip_ref:
+        return asyncio.run(parse_zip_archive(zip_ref, use_gpt=use_gpt))
+
+
+def parse_zip_from_blob(blob_name: str, user_id: str = None, fingerprint: str = None,
+                        session_id: str = None, use_gpt: bool = True) -> list:
+    """Handle ZIP file containing multiple resumes from blob storage.
+
+    When a fingerprint is given, the cached member list for an unchanged
+    archive is returned without re-extracting or re-parsing any member.
+    Otherwise the archive is parsed in memory (see parse_zip_archive).
+    """
+    cached = load_cached_parse(blob_name, fingerprint, user_id=user_id, session_id=session_id)
+    if cached is not None:
+        return cached
 
     # Download ZIP file from blob storage using session-based structure
     if user_id:
-        zip_content = blob_storage.download_file_session(blob_name, user_id)
+        zip_content = blob_storage.download_file_session(blob_name, user_id, session_id)
     else:
         zip_content = blob_storage.download_file(blob_name)
-    
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Save ZIP content to temporary file
-        zip_path = os.path.join(tmpdir, "temp.zip")
-        with open(zip_path, "wb") as f:
-            f.write(zip_content)
-        
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            zip_ref.extractall(tmpdir)
-
-        for root, _, files in os.walk(tmpdir):
-            for file in files:
-                if file == "temp.zip":  # Skip the temp zip file itself
-                    continue
-                ext = os.path.splitext(file)[1].lower()
-                if ext in [".pdf", ".docx", ".txt"]:
-                    try:
-                        resume_path = os.path.join(root, file)
-                        parsed = parse_resume(resume_path)
-                        parsed_results.append(parsed)
-                    except Exception as e:
-                        parsed_results.append({"file": file, "error": str(e)})
 
+    parsed_results = parse_zip_bytes(zip_content, use_gpt=use_gpt)
+
+    # Only cache archives whose members all parsed cleanly
+    if all(_is_cacheable_parse(parsed) for parsed in parsed_results):
+        store_cached_parse(blob_name, fingerprint, parsed_results, user_id=user_id, session_id=session_id)
     return parsed_results
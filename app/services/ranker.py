@@ -1,6 +1,11 @@
+import asyncio
 import numpy as np
-from typing import List, Dict
-from app.services.embeddings import generate_resume_embedding, get_text_embedding
+from typing import List, Dict, Optional
+from app.config import FALLBACK_RANKER
+from app.services.embeddings import build_resume_embedding_text, get_text_embeddings
+from app.services.embedding_store import EmbeddingStore, embedding_id, session_store_dir
+from app.services.jd_analysis import jd_analyzer
+from ml.bm25 import BM25Index, normalize_scores, skill_overlap
 from ml.hybrid_ranker import TfidfHybridScorer, combine_hybrid_scores
 from app.services.llm_based_ranker import llm_ranker
 
@@ -15,7 +20,8 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
 
 
-def rank_resumes(resume_list: List[Dict], job_description: str, alpha: float = 0.3) -> List[Dict]:
+def rank_resumes(resume_list: List[Dict], job_description: str, alpha: float = 0.3,
+                 session_key: Optional[str] = None) -> List[Dict]:
     """
     Rank resumes using advanced LLM-based evaluation (70%) + keyword matching (30%).
     
@@ -23,6 +29,7 @@ def rank_resumes(resume_list: List[Dict], job_description: str, alpha: float = 0
         resume_list: List of parsed resume dictionaries
         job_description: Job description to rank against
         alpha: Weight for keyword matching (default 0.3, LLM gets 0.7)
+        session_key: Session blob path; lets the fallback reuse stored embeddings
     
     Returns:
         List of ranked resumes with detailed LLM-based insights
@@ -35,15 +42,130 @@ def rank_resumes(resume_list: List[Dict], job_description: str, alpha: float = 0
         print(f"LLM ranking failed, falling back to traditional method: {str(e)}")
         
         # Fallback to original hybrid scoring if LLM fails
-        return rank_resumes_fallback(resume_list, job_description, alpha=0.7)
+        return rank_resumes_fallback(resume_list, job_description, alpha=0.7, session_key=session_key)
 
 
-def rank_resumes_fallback(resume_list: List[Dict], job_description: str, alpha: float = 0.7) -> List[Dict]:
+async def rank_resumes_async(resume_list: List[Dict], job_description: str, alpha: float = 0.3,
+                             session_key: Optional[str] = None) -> List[Dict]:
     """
-    Fallback ranking using traditional hybrid scoring: alpha*embedding + (1-alpha)*TF-IDF.
+    Async variant of rank_resumes for use inside the event loop.
+    LLM evaluations run concurrently; the fallback runs in a worker thread.
     """
-    # Step 1: Generate embedding for job description
-    job_embedding = get_text_embedding(job_description)
+    try:
+        return await llm_ranker.rank_resumes_async(resume_list, job_description, keyword_weight=alpha)
+
+    except Exception as e:
+        print(f"LLM ranking failed, falling back to traditional method: {str(e)}")
+
+        return await asyncio.to_thread(rank_resumes_fallback, resume_list, job_description, 0.7, session_key)
+
+
+def _resume_skills(resume: Dict, preprocessed: Dict) -> List[str]:
+    """Skills from preprocessing plus any the parser extracted."""
+    skills = list(preprocessed.get("skills", []) or [])
+    parsed_skills = (resume.get("parsed") or {}).get("skills", [])
+    if isinstance(parsed_skills, list):
+        skills += [s for s in parsed_skills if isinstance(s, str)]
+    return skills
+
+
+def rank_resumes_fallback(resume_list: List[Dict], job_description: str, alpha: float = 0.7,
+                          session_key: Optional[str] = None) -> List[Dict]:
+    """
+    Offline fallback ranking: alpha*BM25 + (1-alpha)*skill overlap.
+
+    Used when the LLM path fails, typically because Azure OpenAI is degraded,
+    so it makes no network calls: BM25 runs over the preprocessed resume text
+    and skills are compared with the job description's cached analysis
+    profile (or its rule-based profile).
+
+    With FALLBACK_RANKER=semantic, rank_resumes_semantic is tried first (the
+    embeddings deployment is often still up when chat is throttled); if it
+    fails, the BM25 ranking is returned instead.
+    """
+    if FALLBACK_RANKER == "semantic":
+        try:
+            return rank_resumes_semantic(resume_list, job_description, alpha=alpha, session_key=session_key)
+        except Exception as e:
+            print(f"Semantic fallback ranking failed, using offline BM25 ranking: {str(e)}")
+
+    jd_profile = jd_analyzer.analyze(job_description, requirements=False)
+    required_skills = jd_profile.get("required_skills", [])
+    preferred_skills = jd_profile.get("preferred_skills", [])
+    # Without extracted skills the ranking is BM25 only
+    weight = alpha if (required_skills or preferred_skills) else 1.0
+
+    preprocessed_list = [resume.get("preprocessed", {}) or {} for resume in resume_list]
+    index = BM25Index().fit(preprocessed.get("cleaned_text", "") for preprocessed in preprocessed_list)
+    bm25_scores = normalize_scores(index.score(job_description))
+
+    ranked_results = []
+    for resume, preprocessed, bm25_score in zip(resume_list, preprocessed_list, bm25_scores):
+        try:
+            skills = _resume_skills(resume, preprocessed)
+            skill_score = skill_overlap(skills, required_skills, preferred_skills)
+            score = weight * bm25_score + (1.0 - weight) * skill_score
+            ranked_results.append({
+                "file": resume.get("file"),
+                "bm25_score": round(float(bm25_score), 4),
+                "skill_score": round(float(skill_score), 4),
+                "hybrid_score": round(float(score), 4),
+                "final_score": round(float(score), 4),  # For consistency with LLM ranker
+                "recommendation": "Traditional Scoring",  # Indicate fallback method
+                "skills": preprocessed.get("skills", []),
+                "parsed": resume.get("parsed", {}),
+            })
+        except Exception as e:
+            ranked_results.append({
+                "file": resume.get("file"),
+                "error": str(e)
+            })
+
+    ranked_results.sort(key=lambda x: x.get("final_score", 0), reverse=True)
+    return ranked_results
+
+
+def rank_resumes_semantic(resume_list: List[Dict], job_description: str, alpha: float = 0.7,
+                          session_key: Optional[str] = None) -> List[Dict]:
+    """
+    Ranking using traditional hybrid scoring: alpha*embedding + (1-alpha)*TF-IDF.
+    Needs the Azure OpenAI embeddings endpoint, so rank_resumes_fallback only
+    uses it with FALLBACK_RANKER=semantic and falls back to BM25 if it fails.
+
+    Resume embeddings live in a per-session EmbeddingStore, so only resumes
+    not embedded before are sent to the API and scoring is one matrix-vector
+    product over the stored, normalized rows.
+    """
+    store = EmbeddingStore.load(session_store_dir(session_key)) if session_key else EmbeddingStore()
+
+    # Step 1: Embed any resumes missing from the store
+    preprocessed_list = [resume.get("preprocessed", {}) or {} for resume in resume_list]
+    resume_ids = []
+    texts_by_id = {}
+    for preprocessed in preprocessed_list:
+        try:
+            text = build_resume_embedding_text(preprocessed)
+        except Exception:
+            text = ""
+        resume_id = embedding_id(text)
+        resume_ids.append(resume_id)
+        texts_by_id[resume_id] = text
+
+    # The JD embedding is cached on its analysis profile; embed it only the first time
+    job_embedding = jd_analyzer.embedding(job_description)
+    missing_ids = store.missing(resume_ids)
+    texts = [texts_by_id[i] for i in missing_ids]
+    embeddings = get_text_embeddings(texts) if texts else []
+    store.upsert(missing_ids, embeddings)
+    if session_key:
+        store.retain(resume_ids)
+        try:
+            store.save()
+        except Exception as e:
+            print(f"Failed to persist embedding store: {e}")
+
+    # Step 2: Cosine similarity for every resume in one matrix-vector product
+    similarity_scores = store.scores(job_embedding, resume_ids)
 
     ranked_results = []
 
@@ -52,24 +174,16 @@ def rank_resumes_fallback(resume_list: List[Dict], job_description: str, alpha:
     resumes_clean_text: List[str] = []
     preprocessed_cache: List[Dict] = []
 
-    for resume in resume_list:
+    for resume, preprocessed, score in zip(resume_list, preprocessed_list, similarity_scores):
         try:
-            # Step 2: Generate embedding for each resume
-            preprocessed = resume.get("preprocessed", {})
-            embedding_data = generate_resume_embedding(preprocessed)
-            resume_embedding = embedding_data["embedding"]
-
-            # Step 3: Compute similarity score
-            score = cosine_similarity(job_embedding, resume_embedding)
-
             # Collect TF-IDF inputs
             resumes_clean_text.append(preprocessed.get("cleaned_text", ""))
             preprocessed_cache.append(preprocessed)
 
-            # Step 4: Collect ranked data
+            # Step 3: Collect ranked data
             ranked_results.append({
                 "file": resume.get("file"),
-                "embedding_score": round(score, 4),
+                "embedding_score": round(float(score), 4),
                 "skills": preprocessed.get("skills", []),
                 "parsed": resume.get("parsed", {}),
             })
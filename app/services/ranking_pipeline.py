@@ -0,0 +1,334 @@
+"""
+Session ranking pipeline shared by the ranking routes and background workers.
+Collects resumes from a session's raw_resumes/ blobs, ranks them and saves the
+ranked output for reporting.
+
+Re-ranking a session against the same job description is incremental: a
+sidecar next to the stored results (app.services.results_store) records which blob (and blob
+fingerprint) produced each result, so only new or changed blobs are parsed,
+results for deleted blobs are dropped, and earlier LLM evaluations are kept.
+The LLM shortlist is still drawn from the whole session, so new resumes only
+reach the LLM when they would have made the shortlist of a full re-rank.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import RANKING_MODE
+from app.services.blob_storage import blob_storage
+from app.services.llm_based_ranker import llm_ranker
+from app.services.parser import (
+    parse_resume_from_blob, parse_resume_with_gpt, parse_zip_from_blob, store_completed_parse
+)
+from app.services.ranker import rank_resumes_fallback
+from app.services.results_store import RESULTS_BLOB, dumps, load_session_results, save_session_results
+from app.services.session_index import sync_session_index
+
+RESUME_EXTENSIONS = [".pdf", ".docx", ".txt"]
+RANKED_RESULTS_BLOB = RESULTS_BLOB
+RANKING_META_BLOB = "reports/ranked_resumes.meta.json"
+RANKING_META_VERSION = 1
+
+
+def list_session_resume_blobs(user_id: str, session_id: Optional[str] = None) -> List[Dict]:
+    """Resume and ZIP blobs under raw_resumes/ in a session, with fingerprints."""
+    blobs = blob_storage.list_blob_properties_session(user_id=user_id, session_id=session_id, prefix="raw_resumes/")
+    return [
+        blob for blob in blobs
+        if blob["name"].startswith("raw_resumes/")
+        and os.path.splitext(blob["name"])[1].lower() in RESUME_EXTENSIONS + [".zip"]
+    ]
+
+
+def parse_session_blob(blob: Dict, user_id: str, session_id: Optional[str] = None,
+                       use_gpt: bool = True) -> List[Dict]:
+    """
+    Parse one raw blob into a list of resumes (one per ZIP member).
+    Unchanged blobs are served from the parse cache keyed by their fingerprint.
+    With use_gpt=False uncached resumes are returned unparsed, with raw_text.
+    """
+    blob_name = blob["name"]
+    ext = os.path.splitext(blob_name)[1].lower()
+    try:
+        if ext == ".zip":
+            return parse_zip_from_blob(blob_name, user_id=user_id, fingerprint=blob["fingerprint"],
+                                       session_id=session_id, use_gpt=use_gpt)
+        return [parse_resume_from_blob(blob_name, user_id=user_id, fingerprint=blob["fingerprint"],
+                                       session_id=session_id, use_gpt=use_gpt)]
+    except Exception as e:
+        return [{"file": os.path.basename(blob_name), "error": str(e)}]
+
+
+def collect_session_resumes(user_id: str, session_id: Optional[str] = None) -> List[Dict]:
+    """Parse every resume under raw_resumes/ in a session."""
+    resumes = []
+    for blob in list_session_resume_blobs(user_id, session_id):
+        resumes.extend(parse_session_blob(blob, user_id, session_id))
+    return resumes
+
+
+def job_description_hash(job_description: str) -> str:
+    """Stable hash of a job description; earlier results are reused only for the same hash."""
+    return hashlib.sha256(job_description.strip().encode("utf-8")).hexdigest()
+
+
+def blob_sources(blobs: List[Dict], results_by_blob: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+    """Sidecar entries mapping each raw blob to its fingerprint and the files it produced."""
+    return {
+        blob["name"]: {
+            "fingerprint": blob["fingerprint"],
+            "files": [r.get("file") for r in results_by_blob.get(blob["name"], [])]
+        }
+        for blob in blobs
+        if blob["name"] in results_by_blob
+    }
+
+
+def save_ranked_results(ranked_results: List[Dict], user_id: str, session_id: Optional[str] = None,
+                        job_description: Optional[str] = None, sources: Optional[Dict[str, Dict]] = None) -> None:
+    """
+    Save ranked output to session-based blob storage and locally for reporting
+    (encoded once in the compact results format).
+
+    The sidecar is always rewritten so it never describes an older results file;
+    without a job description and sources it makes the next run a full re-rank.
+    """
+    save_session_results(ranked_results, user_id, session_id)
+
+    meta = {
+        "version": RANKING_META_VERSION,
+        "jd_hash": job_description_hash(job_description) if job_description is not None else None,
+        "blobs": sources or {}
+    }
+    blob_storage.upload_file_session(dumps(meta), RANKING_META_BLOB, user_id, session_id)
+
+
+def load_ranked_results(user_id: str, session_id: Optional[str] = None) -> List[Dict]:
+    """Saved ranked results of a session; raises LookupError when it has none."""
+    ranked_results = load_session_results(user_id, session_id)
+    return ranked_results if isinstance(ranked_results, list) else []
+
+
+def load_previous_ranking(user_id: str, job_description: str,
+                          session_id: Optional[str] = None) -> Optional[Tuple[List[Dict], Dict[str, Dict]]]:
+    """
+    Saved results and sidecar blob entries for this job description, or None
+    when the session has no reusable ranking.
+    """
+    try:
+        meta = json.loads(blob_storage.download_file_session(RANKING_META_BLOB, user_id, session_id))
+        if meta.get("version") != RANKING_META_VERSION or meta.get("jd_hash") != job_description_hash(job_description):
+            return None
+        ranked_results = load_session_results(user_id, session_id)
+    except Exception:
+        return None
+    if not isinstance(ranked_results, list):
+        return None
+    return ranked_results, meta.get("blobs", {})
+
+
+def is_llm_evaluated(result: Dict) -> bool:
+    """Whether a stored result holds an LLM evaluation (not a prescreen-only score or an error)."""
+    return "error" not in result and result.get("llm_reviewed", "llm_score" in result)
+
+
+def reusable_results(blobs: List[Dict], previous_results: List[Dict],
+                     previous_sources: Dict[str, Dict]) -> Dict[str, List[Dict]]:
+    """
+    Previous results for blobs whose fingerprint is unchanged, keyed by blob name.
+    Results are matched by file name; blobs whose files are ambiguous (a name
+    shared by several results) are left out and re-evaluated.
+    """
+    owners = Counter(f for entry in previous_sources.values() for f in entry.get("files", []))
+    results_by_file = defaultdict(list)
+    for result in previous_results:
+        results_by_file[result.get("file")].append(result)
+
+    reused = {}
+    for blob in blobs:
+        entry = previous_sources.get(blob["name"])
+        if not entry or entry.get("fingerprint") != blob["fingerprint"]:
+            continue
+        files = entry.get("files", [])
+        if any(owners[f] != 1 or len(results_by_file.get(f, [])) != 1 for f in files):
+            continue
+        reused[blob["name"]] = [results_by_file[f][0] for f in files]
+    return reused
+
+
+async def complete_single_pass(resumes: List[Dict], results: List[Dict], blobs: List[Dict],
+                               resume_blobs: List[str], user_id: str, session_id: Optional[str] = None) -> None:
+    """
+    Finish a single-pass run: GPT-parse resumes the LLM did not see (outside
+    the shortlist, or whose single-pass call failed), copy their fields into
+    the matching results, and store the parse cache for every parsed blob.
+    """
+    unparsed = [i for i, resume in enumerate(resumes) if resume.get("parsed") is None and resume.get("raw_text")]
+    if unparsed:
+        parsed_list = await asyncio.gather(
+            *[asyncio.to_thread(parse_resume_with_gpt, resumes[i]["raw_text"]) for i in unparsed],
+            return_exceptions=True
+        )
+        for i, parsed in zip(unparsed, parsed_list):
+            if not isinstance(parsed, dict):
+                print(f"Failed to parse {resumes[i].get('file')}: {parsed}")
+                continue
+            resumes[i]["parsed"] = parsed
+            skills = parsed.get("skills", [])
+            results[i].update({
+                "candidate_name": parsed.get("name", "Unknown"),
+                "email": parsed.get("email", ""),
+                "skills": skills if isinstance(skills, list) else [],
+                "parsed": parsed
+            })
+
+    fingerprints = {blob["name"]: blob["fingerprint"] for blob in blobs}
+    by_blob: Dict[str, List[Dict]] = {}
+    for blob_name, resume in zip(resume_blobs, resumes):
+        by_blob.setdefault(blob_name, []).append(resume)
+    for blob_name, blob_resumes in by_blob.items():
+        if any("raw_text" in resume for resume in blob_resumes):
+            await asyncio.to_thread(
+                store_completed_parse, blob_name, fingerprints.get(blob_name), blob_resumes, user_id, session_id
+            )
+
+
+async def iter_ranking(user_id: str, job_description: str, session_id: Optional[str] = None):
+    """
+    Parse, rank and save a session, yielding events as it goes:
+
+      {"type": "parsing", "total_blobs", "reused_blobs"}   before parsing
+      {"type": "parsed", "blob_name", "files", "parsed_blobs", "total_blobs"}
+                                                          per new or changed raw blob
+      {"type": "evaluating", "total"}                      before evaluating
+      {"type": "result", "index", "result", "completed", "total"}
+                                                          per resume, as it finishes
+      {"type": "complete", "ranked_results"}               once saved
+
+    Raises LookupError when the session has no resumes. In RANKING_MODE
+    "single_pass" resumes are collected without GPT parsing.
+    """
+    single_pass = RANKING_MODE == "single_pass"
+
+    blobs = await asyncio.to_thread(list_session_resume_blobs, user_id, session_id)
+
+    # Step 1: Reuse results for blobs unchanged since the last ranking of this job description
+    previous = await asyncio.to_thread(load_previous_ranking, user_id, job_description, session_id)
+    reused = reusable_results(blobs, *previous) if previous else {}
+    pending = [blob for blob in blobs if blob["name"] not in reused]
+
+    # Step 2: Parse only new or changed blobs
+    resumes: List[Dict] = []
+    resume_blobs: List[str] = []
+    yield {"type": "parsing", "total_blobs": len(pending), "reused_blobs": len(reused)}
+    for count, blob in enumerate(pending, 1):
+        parsed = await asyncio.to_thread(parse_session_blob, blob, user_id, session_id, not single_pass)
+        resumes.extend(parsed)
+        resume_blobs.extend([blob["name"]] * len(parsed))
+        yield {
+            "type": "parsed",
+            "blob_name": blob["name"],
+            "files": [r.get("file") for r in parsed],
+            "parsed_blobs": count,
+            "total_blobs": len(pending)
+        }
+
+    reused_results = [result for results in reused.values() for result in results]
+    if not resumes and not reused_results:
+        raise LookupError("No resumes found in blob storage")
+
+    # Step 3: With new resumes, reload the unchanged ones (parse cache hits) so the
+    # prescreen and shortlist cover the whole session; their LLM evaluations are kept
+    previous_evaluations: Dict[int, Dict] = {}
+    if resumes and reused:
+        reused_blobs = [blob for blob in blobs if blob["name"] in reused]
+        reloaded = await asyncio.gather(*[
+            asyncio.to_thread(parse_session_blob, blob, user_id, session_id, not single_pass)
+            for blob in reused_blobs
+        ])
+        for blob, blob_resumes in zip(reused_blobs, reloaded):
+            previous_results = {result.get("file"): result for result in reused[blob["name"]]}
+            for resume in blob_resumes:
+                result = previous_results.get(resume.get("file"))
+                if result is not None and is_llm_evaluated(result):
+                    previous_evaluations[len(resumes)] = result
+                resumes.append(resume)
+                resume_blobs.append(blob["name"])
+        print(f"Incremental re-rank: reusing {len(previous_evaluations)} LLM evaluations, "
+              f"prescreening {len(resumes)} resumes")
+        reused, reused_results = {}, []
+    elif reused:
+        print(f"Incremental re-rank: reusing all {len(reused_results)} results")
+
+    # Keep the session's inverted index in line with its resumes (prescreen TF-IDF)
+    try:
+        session_index = await asyncio.to_thread(
+            sync_session_index, user_id, resumes, session_id, [r.get("file") for r in reused_results]
+        )
+    except Exception as e:
+        print(f"Session index unavailable, prescreen refits TF-IDF: {e}")
+        session_index = None
+
+    # Step 4: Evaluate them and merge with the reused results
+    yield {"type": "evaluating", "total": len(resumes)}
+    try:
+        evaluated: List[Optional[Dict]] = [None] * len(resumes)
+        completed = 0
+        async for index, result in llm_ranker.iter_evaluations(resumes, job_description,
+                                                                session_index=session_index,
+                                                                evaluated=previous_evaluations):
+            evaluated[index] = result
+            completed += 1
+            yield {"type": "result", "index": index, "result": result, "completed": completed, "total": len(resumes)}
+        if single_pass:
+            await complete_single_pass(resumes, evaluated, blobs, resume_blobs, user_id, session_id)
+
+        results_by_blob = dict(reused)
+        for blob_name, result in zip(resume_blobs, evaluated):
+            results_by_blob.setdefault(blob_name, []).append(result)
+        ranked_results = llm_ranker.finalize_ranking(evaluated + reused_results)
+        sources = blob_sources(blobs, results_by_blob)
+    except Exception as e:
+        print(f"LLM ranking failed, falling back to traditional method: {str(e)}")
+        # Fallback scores are relative to the batch, so rank every resume and reuse nothing next time
+        for blob in blobs:
+            if blob["name"] in reused:
+                resumes.extend(await asyncio.to_thread(parse_session_blob, blob, user_id, session_id))
+        session_key = blob_storage.get_session_path(user_id, session_id)
+        ranked_results = await asyncio.to_thread(rank_resumes_fallback, resumes, job_description, 0.7, session_key)
+        sources = None
+
+    await asyncio.to_thread(save_ranked_results, ranked_results, user_id, session_id, job_description, sources)
+    yield {"type": "complete", "ranked_results": ranked_results}
+
+
+async def run_ranking(user_id: str, job_description: str, session_id: Optional[str] = None,
+                      on_progress: Optional[Callable[[str, int, int], None]] = None) -> List[Dict]:
+    """
+    Parse, rank and save a session (see iter_ranking), reporting progress as
+    (stage, completed, total).
+
+    Stages are 'parsing' (per new or changed raw blob) and 'evaluating' (per
+    resume to evaluate). Raises LookupError when the session has no resumes.
+    """
+    def report(stage: str, completed: int, total: int) -> None:
+        if on_progress is not None:
+            on_progress(stage, completed, total)
+
+    ranked_results: List[Dict] = []
+    async for event in iter_ranking(user_id, job_description, session_id):
+        if event["type"] == "parsing":
+            report("parsing", 0, event["total_blobs"])
+        elif event["type"] == "parsed":
+            report("parsing", event["parsed_blobs"], event["total_blobs"])
+        elif event["type"] == "evaluating":
+            report("evaluating", 0, event["total"])
+        elif event["type"] == "result":
+            report("evaluating", event["completed"], event["total"])
+        elif event["type"] == "complete":
+            ranked_results = event["ranked_results"]
+    return ranked_results
@@ -1,5 +1,4 @@
 import os
-import json
 from openpyxl import Workbook
 import csv
 from reportlab.lib.pagesizes import A4
@@ -7,6 +6,9 @@ from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, PageBreak
 from app.services.blob_storage import blob_storage
+from app.services.results_store import (
+    LEGACY_RESULTS_BLOB, decode_results, load_latest_user_results, load_local_results
+)
 
 REPORTS_DIR = "reports"
 os.makedirs(REPORTS_DIR, exist_ok=True)
@@ -185,15 +187,9 @@ def generate_csv_report(ranked_results):
 
 def generate_reports():
     """
-    Read the ranked JSON file and generate both Excel and PDF reports.
+    Read the local ranked results and generate both Excel and PDF reports.
     """
-    json_path = os.path.join(REPORTS_DIR, "ranked_resumes.json")
-
-    if not os.path.exists(json_path):
-        raise FileNotFoundError("Ranked results JSON not found. Please run ranking first.")
-
-    with open(json_path, "r", encoding="utf-8") as f:
-        ranked_results = json.load(f)
+    ranked_results = load_local_results()
 
     excel_path = generate_excel_report(ranked_results)
     csv_path = generate_csv_report(ranked_results)
@@ -215,30 +211,17 @@ def generate_reports_from_blob(user_id: str | None = None, types: set[str] | Non
     # Prefer per-user latest session file if user_id provided
     if user_id:
         try:
-            sessions = blob_storage.list_user_sessions(user_id)
-            for s in sessions:
-                try:
-                    content = blob_storage.download_file_session("reports/ranked_resumes.json", user_id, s['session_id'])
-                    ranked_results = json.loads(content.decode('utf-8'))
-                    if ranked_results:
-                        break
-                except Exception:
-                    continue
+            ranked_results, _ = load_latest_user_results(user_id)
         except Exception:
             ranked_results = []
     
     if not ranked_results:
         try:
             # Try shared/root blob as fallback
-            json_content = blob_storage.download_file("reports/ranked_resumes.json")
-            ranked_results = json.loads(json_content.decode('utf-8'))
+            ranked_results = decode_results(blob_storage.download_file(LEGACY_RESULTS_BLOB))
         except Exception:
             # Fallback to local file
-            json_path = os.path.join(REPORTS_DIR, "ranked_resumes.json")
-            if not os.path.exists(json_path):
-                raise FileNotFoundError("Ranked results JSON not found. Please run ranking first.")
-            with open(json_path, "r", encoding="utf-8") as f:
-                ranked_results = json.load(f)
+            ranked_results = load_local_results()
 
     # Determine which types to generate
     generate_all = types is None
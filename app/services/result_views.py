@@ -0,0 +1,85 @@
+"""
+Selection and projection of ranking results for API responses.
+
+Ranking responses can hold thousands of candidates with full evaluations.
+These helpers pick the requested window (top_k, offset/limit) and fields so
+only what the client shows is serialized. Results are expected in ranking
+order (llm_ranker.finalize_ranking, saved results), so windows are slices.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Returned for fields="summary": enough for the results table
+SUMMARY_FIELDS = (
+    'rank', 'file', 'candidate_name', 'email', 'final_score', 'recommendation',
+    'llm_reviewed', 'keyword_score', 'llm_score', 'total_experience', 'skills', 'error'
+)
+
+# Always included so rows can be matched to the detail endpoint
+KEY_FIELDS = ('rank', 'file')
+
+
+def ranking_sort_key(result: Dict) -> Tuple[bool, float]:
+    """
+    Ranking order (descending): LLM-reviewed candidates first, then by final score.
+    Records without llm_reviewed count as reviewed only when they carry an
+    llm_score, so error records rank with (not above) prescreen-only ones.
+    """
+    return result.get('llm_reviewed', 'llm_score' in result), result.get('final_score', 0)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Sequence[str]]:
+    """None for all fields, SUMMARY_FIELDS for "summary", else the comma-separated names."""
+    if not fields or fields.strip() == "all":
+        return None
+    if fields.strip() == "summary":
+        return SUMMARY_FIELDS
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return tuple(dict.fromkeys(list(KEY_FIELDS) + names))
+
+
+def project_result(result: Dict, fields: Optional[Sequence[str]]) -> Dict:
+    if fields is None:
+        return result
+    return {name: result[name] for name in fields if name in result}
+
+
+def select_results(results: List[Dict], top_k: Optional[int] = None, offset: int = 0,
+                   limit: Optional[int] = None) -> List[Dict]:
+    """The offset/limit page within the top_k best of results (in ranking order)."""
+    if top_k is not None and top_k >= 0:
+        results = results[:top_k]
+    offset = max(0, offset or 0)
+    end = None if limit is None else offset + max(0, limit)
+    return results[offset:end]
+
+
+def results_page(results: List[Dict], top_k: Optional[int] = None, offset: int = 0,
+                 limit: Optional[int] = None, fields: Optional[str] = None) -> Dict:
+    """
+    Response fields for a page of results: ranked_resumes plus paging metadata
+    (total candidates, the applied window and whether more rows follow).
+    """
+    total = len(results)
+    available = total if top_k is None or top_k < 0 else min(total, top_k)
+    page = select_results(results, top_k, offset, limit)
+    projection = parse_fields(fields)
+    return {
+        "ranked_resumes": [project_result(result, projection) for result in page],
+        "total": total,
+        "offset": max(0, offset or 0),
+        "limit": limit,
+        "top_k": top_k,
+        "has_more": max(0, offset or 0) + len(page) < available
+    }
+
+
+def find_result(results: List[Dict], rank: Optional[int] = None, file: Optional[str] = None) -> Optional[Dict]:
+    """The result with the given rank or file name, if any."""
+    for result in results:
+        if rank is not None and result.get('rank') != rank:
+            continue
+        if file is not None and result.get('file') != file:
+            continue
+        return result
+    return None
@@ -0,0 +1,203 @@
+"""
+Compact storage format for ranked results.
+
+Results are encoded once (orjson when installed, compact json otherwise)
+into a gzip-compressed document that lists the field names once and stores
+each result as a row of values. Fields that only repeat the candidate's
+parsed resume (candidate_name, email, skills) are dropped when they match it
+and restored on load. The same bytes are uploaded to the session blob and
+written locally for reporting.
+
+Files written before this format (reports/ranked_resumes.json) are still read;
+locally, whichever of the two files is newer wins.
+"""
+
+import gzip
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the standard library encoder
+    orjson = None
+
+from app.services.blob_storage import blob_storage
+
+RESULTS_BLOB = "reports/ranked_resumes.json.gz"
+LEGACY_RESULTS_BLOB = "reports/ranked_resumes.json"
+LOCAL_RESULTS_PATH = os.path.join("reports", "ranked_resumes.json.gz")
+LEGACY_LOCAL_RESULTS_PATH = os.path.join("reports", "ranked_resumes.json")
+
+FORMAT_NAME = "ranked-results"
+FORMAT_VERSION = 1
+
+# Result field -> (parsed key, default) it duplicates; see _build_result
+DERIVED_FIELDS = {
+    'candidate_name': ('name', 'Unknown'),
+    'email': ('email', ''),
+    'skills': ('skills', []),
+}
+
+# Speed matters more than the last few percent of size
+COMPRESS_LEVEL = 5
+
+
+def dumps(value) -> bytes:
+    """Compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _derived_value(result: Dict, field: str):
+    parsed = result.get('parsed')
+    if not isinstance(parsed, dict):
+        return None
+    key, default = DERIVED_FIELDS[field]
+    value = parsed.get(key, default)
+    if field == 'skills' and not isinstance(value, list):
+        value = []
+    return value
+
+
+def pack_results(ranked_results: List[Dict]) -> Dict:
+    """
+    Row-oriented form: field names once, then per result a layout string
+    (one character per field: "v" stored, "d" derived from parsed, "-" absent)
+    followed by the stored values in field order.
+    """
+    # Union of field names; a new name goes right after the field preceding it
+    # in that result, so the usual field order round-trips
+    fields: List[str] = []
+    known = set()
+    for result in ranked_results:
+        previous = None
+        for field in result:
+            if field not in known:
+                known.add(field)
+                fields.insert(fields.index(previous) + 1 if previous is not None else 0, field)
+            previous = field
+
+    rows = []
+    for result in ranked_results:
+        layout = []
+        values = []
+        for field in fields:
+            if field not in result:
+                layout.append("-")
+            elif field in DERIVED_FIELDS and result[field] == _derived_value(result, field):
+                layout.append("d")
+            else:
+                layout.append("v")
+                values.append(result[field])
+        rows.append(["".join(layout)] + values)
+    return {"format": FORMAT_NAME, "version": FORMAT_VERSION, "fields": fields, "rows": rows}
+
+
+def unpack_results(document) -> List[Dict]:
+    """Inverse of pack_results; plain result lists (legacy files) are returned as they are."""
+    if isinstance(document, list):
+        return document
+    if not isinstance(document, dict) or document.get("format") != FORMAT_NAME:
+        raise ValueError("Not a ranked results document")
+    if document.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported ranked results version: {document.get('version')}")
+
+    fields = document["fields"]
+    results = []
+    for row in document["rows"]:
+        values = iter(row[1:])
+        result = {}
+        derived = []
+        for field, kind in zip(fields, row[0]):
+            if kind == "v":
+                result[field] = next(values)
+            elif kind == "d":
+                result[field] = None  # filled below, once 'parsed' is available
+                derived.append(field)
+        for field in derived:
+            result[field] = _derived_value(result, field)
+        results.append(result)
+    return results
+
+
+def encode_results(ranked_results: List[Dict]) -> bytes:
+    return gzip.compress(dumps(pack_results(ranked_results)), compresslevel=COMPRESS_LEVEL)
+
+
+def decode_results(payload: bytes) -> List[Dict]:
+    """Decode stored results in the compact format or legacy plain JSON."""
+    if payload[:2] == b"\x1f\x8b":
+        payload = gzip.decompress(payload)
+    return unpack_results(loads(payload))
+
+
+def save_session_results(ranked_results: List[Dict], user_id: str, session_id: Optional[str] = None) -> int:
+    """Encode once; upload to the session and write the local reporting copy. Returns the stored size."""
+    payload = encode_results(ranked_results)
+    blob_storage.upload_file_session(payload, RESULTS_BLOB, user_id, session_id)
+
+    # Also save locally for reporting
+    _write_local_payload(payload)
+    return len(payload)
+
+
+def save_local_results(ranked_results: List[Dict]) -> str:
+    """Write the local reporting copy only (scripts); returns its path."""
+    _write_local_payload(encode_results(ranked_results))
+    return LOCAL_RESULTS_PATH
+
+
+def _write_local_payload(payload: bytes) -> None:
+    # Drop the legacy copy so readers never see stale results
+    os.makedirs(os.path.dirname(LOCAL_RESULTS_PATH), exist_ok=True)
+    with open(LOCAL_RESULTS_PATH, "wb") as f:
+        f.write(payload)
+    if os.path.exists(LEGACY_LOCAL_RESULTS_PATH):
+        os.remove(LEGACY_LOCAL_RESULTS_PATH)
+
+
+def load_session_results(user_id: str, session_id: Optional[str] = None) -> List[Dict]:
+    """
+    Saved results of a session (compact blob first, then the legacy JSON blob).
+    Raises LookupError when the session has none.
+    """
+    for blob_name in (RESULTS_BLOB, LEGACY_RESULTS_BLOB):
+        try:
+            payload = blob_storage.download_file_session(blob_name, user_id, session_id)
+        except Exception:
+            continue
+        return decode_results(payload)
+    raise LookupError("No ranked results found for this session")
+
+
+def load_local_results() -> List[Dict]:
+    """
+    The local reporting copy, from the more recently written of the compact
+    and legacy files (the legacy one may still be written by hand or by older
+    tools). Raises FileNotFoundError when ranking has not run.
+    """
+    paths = [path for path in (LOCAL_RESULTS_PATH, LEGACY_LOCAL_RESULTS_PATH) if os.path.exists(path)]
+    if not paths:
+        raise FileNotFoundError("Ranked results JSON not found. Please run ranking first.")
+    with open(max(paths, key=os.path.getmtime), "rb") as f:
+        return decode_results(f.read())
+
+
+def load_latest_user_results(user_id: str) -> Tuple[List[Dict], Optional[str]]:
+    """Results of the user's most recent session that has any, with its session id."""
+    for session in blob_storage.list_user_sessions(user_id):
+        try:
+            results = load_session_results(user_id, session['session_id'])
+        except Exception:
+            continue
+        if results:
+            return results, session['session_id']
+    return [], None
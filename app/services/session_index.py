@@ -0,0 +1,100 @@
+"""
+Per-session inverted index over resume text.
+
+The index lives next to the session's resumes (indexes/resume_terms.npz in
+the session's blob prefix). /api/upload adds new resumes to it and ranking
+brings it in line with the session's current resumes, so TF-IDF scores for
+any job description come from stored postings instead of refitting a
+vectorizer over the whole session. Documents are the same resume text the
+prescreen would otherwise fit TF-IDF on, so both paths score alike.
+
+Updates are read-modify-write of one blob and are only serialized within a
+process. Writers in other processes (uvicorn workers, sqlite job workers)
+can overwrite each other's update; that is safe because the index is
+derived data: ranking re-syncs it against the resumes it scores (by text
+digest) and the prescreen refits TF-IDF whenever it does not cover them.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from app.services.blob_storage import blob_storage
+from app.services.llm_based_ranker import llm_ranker
+from ml.inverted_index import InvertedIndex
+
+SESSION_INDEX_BLOB = "indexes/resume_terms.npz"
+
+# Serializes read-modify-write of one session's index within this process only (see above)
+_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_locks_guard = threading.Lock()
+
+
+def _session_lock(user_id: str, session_id: Optional[str]) -> threading.Lock:
+    key = blob_storage.get_session_path(user_id, session_id)
+    with _locks_guard:
+        return _locks[key]
+
+
+def index_documents(resumes: Iterable[Dict]) -> Dict[str, str]:
+    """
+    doc_id (file name) -> resume text, as the LLM prescreen extracts it, for
+    resumes that parsed without error.
+    """
+    documents = {}
+    for resume in resumes:
+        if not isinstance(resume, dict) or resume.get("error") or not resume.get("file"):
+            continue
+        try:
+            documents[resume["file"]] = llm_ranker.extract_resume_content(resume)
+        except Exception:
+            # Same as the prescreen, which scores such resumes on empty text
+            documents[resume["file"]] = ""
+    return documents
+
+
+def load_session_index(user_id: str, session_id: Optional[str] = None) -> InvertedIndex:
+    """The stored index for a session, or an empty one if there is none (or it is unreadable)."""
+    try:
+        payload = blob_storage.download_file_session(SESSION_INDEX_BLOB, user_id, session_id)
+    except Exception:
+        return InvertedIndex()
+    try:
+        return InvertedIndex.from_bytes(payload)
+    except Exception as e:
+        print(f"Ignoring unreadable session index: {e}")
+        return InvertedIndex()
+
+
+def save_session_index(index: InvertedIndex, user_id: str, session_id: Optional[str] = None) -> None:
+    blob_storage.upload_file_session(index.to_bytes(), SESSION_INDEX_BLOB, user_id, session_id)
+
+
+def update_session_index(user_id: str, resumes: List[Dict], session_id: Optional[str] = None) -> InvertedIndex:
+    """Add (or replace) uploaded resumes in the session index."""
+    documents = index_documents(resumes)
+    with _session_lock(user_id, session_id):
+        index = load_session_index(user_id, session_id)
+        if documents:
+            index.add_documents(documents.items())
+            save_session_index(index, user_id, session_id)
+    return index
+
+
+def sync_session_index(user_id: str, resumes: List[Dict], session_id: Optional[str] = None,
+                       keep: Iterable[str] = ()) -> InvertedIndex:
+    """
+    Bring the session index in line with the resumes being ranked: index the
+    ones it lacks or holds with different text (e.g. a re-uploaded file) and
+    drop documents that are neither in resumes nor in keep (files whose
+    earlier results are reused). Saved only when it changed.
+    """
+    documents = index_documents(resumes)
+    with _session_lock(user_id, session_id):
+        index = load_session_index(user_id, session_id)
+        if index.sync(documents, keep):
+            try:
+                save_session_index(index, user_id, session_id)
+            except Exception as e:
+                print(f"Failed to persist session index: {e}")
+    return index
@@ -0,0 +1,246 @@
+"""
+Token budgeting for chat prompts.
+Counts prompt tokens with the model's tokenizer (tiktoken, when installed),
+trims the lowest-value resume or job description sections so prompts fit a
+configurable budget, and records the tokens used by each request.
+"""
+
+import logging
+import re
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional; counts fall back to a character estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Encoding used by the gpt-35-turbo / gpt-4 deployments
+TOKENIZER_ENCODING = "cl100k_base"
+
+# Chat format overhead per message and for the assistant reply priming
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+TRUNCATION_MARKER = " ..."
+
+# Section value when trimming: lowest values are trimmed first. Text before the
+# first recognised heading (name, contact details) is never trimmed before the rest.
+RESUME_SECTION_PRIORITIES = {
+    'experience': 5, 'work experience': 5, 'professional experience': 5, 'employment history': 5,
+    'skills': 5, 'technical skills': 5, 'core competencies': 4,
+    'education': 4, 'projects': 3, 'certifications': 3, 'licenses and certifications': 3,
+    'summary': 2, 'professional summary': 2, 'profile': 2, 'achievements': 2,
+    'objective': 1, 'career objective': 1, 'awards': 1, 'honors and awards': 1, 'publications': 1,
+    'courses': 1, 'coursework': 1, 'training': 1, 'volunteer experience': 1, 'volunteering': 1,
+    'languages': 1, 'activities': 0, 'extracurricular activities': 0, 'interests': 0, 'hobbies': 0,
+    'personal details': 0, 'personal information': 0, 'declaration': 0, 'references': 0,
+}
+JD_SECTION_PRIORITIES = {
+    'requirements': 5, 'required skills': 5, 'qualifications': 5, 'minimum qualifications': 5,
+    'responsibilities': 4, 'key responsibilities': 4, 'what you will do': 4,
+    'preferred qualifications': 3, 'nice to have': 3, 'skills': 4,
+    'about the role': 2, 'role overview': 2, 'about the team': 1,
+    'about us': 0, 'about the company': 0, 'company overview': 0, 'benefits': 0, 'perks': 0,
+    'what we offer': 0, 'equal opportunity': 0, 'equal opportunity employer': 0, 'how to apply': 0,
+}
+HEADER_PRIORITY = 6
+
+# Sections are first cut down to this many tokens before any is removed entirely
+MIN_SECTION_TOKENS = 40
+
+_HEADING_CLEAN_RE = re.compile(r"[^a-z ]+")
+
+
+# ========== Counting ==========
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """Tokenizer for TOKENIZER_ENCODING, loaded once; None when unavailable."""
+    global _encoder, _encoder_loaded
+    if _encoder_loaded:
+        return _encoder
+    with _encoder_lock:
+        if not _encoder_loaded:
+            if tiktoken is not None:
+                try:
+                    _encoder = tiktoken.get_encoding(TOKENIZER_ENCODING)
+                except Exception as e:
+                    # The encoding file is fetched on first use; offline hosts estimate instead
+                    logger.warning(f"Tokenizer unavailable, estimating token counts: {str(e)}")
+            _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text (about 4 characters per token without a tokenizer)."""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(messages: List[Dict]) -> int:
+    """Prompt tokens for a list of chat messages, including chat format overhead."""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        for value in message.values():
+            if isinstance(value, str):
+                total += count_tokens(value)
+    return total
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the beginning of text within max_tokens, marking the cut."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - count_tokens(TRUNCATION_MARKER))
+    encoder = _get_encoder()
+    if encoder is not None:
+        head = encoder.decode(encoder.encode(text, disallowed_special=())[:keep])
+    else:
+        head = text[:keep * 4]
+    return head.rstrip() + TRUNCATION_MARKER
+
+
+# ========== Section trimming ==========
+
+def _heading_key(line: str, priorities: Dict[str, int]) -> Optional[str]:
+    """Normalized heading if the line starts a known section ("SKILLS", "Experience:", ...)."""
+    stripped = line.strip()
+    if not stripped or (len(stripped) > 60 and ':' not in stripped[:40]):
+        return None
+    head = _HEADING_CLEAN_RE.sub(" ", stripped.split(':', 1)[0].lower())
+    head = " ".join(head.split())
+    return head if head in priorities else None
+
+
+def split_sections(text: str, priorities: Dict[str, int]) -> List[Tuple[int, str]]:
+    """Split text at recognised headings into (priority, section_text) in document order."""
+    sections: List[Tuple[int, List[str]]] = [(HEADER_PRIORITY, [])]
+    for line in text.splitlines(keepends=True):
+        key = _heading_key(line, priorities)
+        if key is not None:
+            sections.append((priorities[key], []))
+        sections[-1][1].append(line)
+    return [(priority, "".join(lines)) for priority, lines in sections if lines]
+
+
+def fit_text_to_budget(text: str, max_tokens: int,
+                       priorities: Dict[str, int] = RESUME_SECTION_PRIORITIES) -> Tuple[str, bool]:
+    """
+    Fit text within max_tokens by trimming its lowest-value sections first.
+
+    The first pass drops priority-0 sections and cuts the others, lowest value
+    first, down to their first MIN_SECTION_TOKENS (the start of a section is
+    usually its most recent entry); the second pass removes what is still
+    needed in the same order. Returns (text, trimmed).
+    """
+    if count_tokens(text) <= max_tokens:
+        return text, False
+
+    sections = split_sections(text, priorities)
+    contents = [section for _, section in sections]
+    sizes = [count_tokens(section) for section in contents]
+    overflow = sum(sizes) - max_tokens
+    # Lowest priority first; among equals, trim later sections first
+    order = sorted(range(len(sections)), key=lambda i: (sections[i][0], -i))
+
+    for floor in (MIN_SECTION_TOKENS, 0):
+        for i in order:
+            if overflow <= 0:
+                break
+            keep = 0 if sections[i][0] == 0 else floor
+            cut = min(overflow, sizes[i] - keep)
+            if cut <= 0:
+                continue
+            contents[i] = truncate_to_tokens(contents[i], sizes[i] - cut)
+            if contents[i] and not contents[i].endswith("\n"):
+                contents[i] += "\n"
+            sizes[i] -= cut
+            overflow -= cut
+
+    fitted = "".join(contents)
+    # Token counts are not additive at section boundaries; enforce the limit exactly
+    return truncate_to_tokens(fitted, max_tokens), True
+
+
+def fit_prompt(build_messages: Callable[[str], List[Dict]], text: str, budget: int,
+               priorities: Dict[str, int] = RESUME_SECTION_PRIORITIES) -> Tuple[List[Dict], Dict]:
+    """
+    Build messages whose variable text is trimmed so the whole prompt fits budget.
+
+    build_messages renders the prompt for a given text; the fixed part (system
+    prompt, few-shot examples, instructions) is measured first and the rest of
+    the budget goes to the text. Returns (messages, usage).
+    """
+    overhead = count_message_tokens(build_messages(""))
+    text_tokens = count_tokens(text)
+    fitted, trimmed = fit_text_to_budget(text, max(0, budget - overhead), priorities)
+    messages = build_messages(fitted)
+    usage = {
+        'prompt_tokens': count_message_tokens(messages),
+        'budget': budget,
+        'text_tokens': text_tokens,
+        'trimmed': trimmed
+    }
+    return messages, usage
+
+
+# ========== Usage recording ==========
+
+class TokenUsageTracker:
+    """
+    Per-request token usage, with running totals per purpose
+    (e.g. 'evaluation', 'parse').
+    """
+
+    def __init__(self, history: int = 1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        self._totals: Dict[str, Dict] = {}
+
+    def record(self, purpose: str, usage: Dict, response=None) -> Dict:
+        """Record one request; completion and billed prompt tokens come from response.usage when present."""
+        entry = dict(usage, purpose=purpose)
+        response_usage = getattr(response, 'usage', None)
+        if response_usage is not None:
+            entry['billed_prompt_tokens'] = getattr(response_usage, 'prompt_tokens', None)
+            entry['completion_tokens'] = getattr(response_usage, 'completion_tokens', None)
+
+        with self._lock:
+            self._recent.append(entry)
+            totals = self._totals.setdefault(purpose, {
+                'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'trimmed': 0
+            })
+            totals['requests'] += 1
+            totals['prompt_tokens'] += entry.get('prompt_tokens') or 0
+            totals['completion_tokens'] += entry.get('completion_tokens') or 0
+            totals['trimmed'] += 1 if entry.get('trimmed') else 0
+
+        logger.debug(f"Token usage ({purpose}): {entry}")
+        return entry
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            return list(self._recent)[-limit:]
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {purpose: dict(totals) for purpose, totals in self._totals.items()}
+
+
+# Global instance
+token_usage = TokenUsageTracker()
@@ -0,0 +1,108 @@
+import math
+import re
+from typing import Dict, Iterable, List
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def bm25_tokenize(text: str) -> List[str]:
+    """Lowercase letter-only tokens without English stop words.
+
+    Matches what ml.preprocessing.clean_text keeps, so raw job descriptions
+    and cleaned resume text produce the same terms.
+    """
+    if not text:
+        return []
+    return [tok for tok in _TOKEN_RE.findall(text.lower()) if len(tok) > 1 and tok not in ENGLISH_STOP_WORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory document collection.
+
+    Term weights are precomputed per (document, term) at fit time, so scoring
+    a query is one sparse matrix-vector product. Purely local: no network or
+    model downloads.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self.weights = csr_matrix((0, 0), dtype=np.float32)
+
+    def fit(self, documents: Iterable[str]) -> "BM25Index":
+        """Index documents (e.g. preprocessed cleaned_text)."""
+        vocabulary: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        lengths: List[int] = []
+        for doc in documents:
+            tokens = bm25_tokenize(doc)
+            term_counts: Dict[int, int] = {}
+            for tok in tokens:
+                term_id = vocabulary.setdefault(tok, len(vocabulary))
+                term_counts[term_id] = term_counts.get(term_id, 0) + 1
+            indices.extend(term_counts.keys())
+            counts.extend(term_counts.values())
+            indptr.append(len(indices))
+            lengths.append(len(tokens))
+
+        n_docs = len(lengths)
+        tf = csr_matrix(
+            (np.asarray(counts, dtype=np.float32), indices, indptr),
+            shape=(n_docs, len(vocabulary))
+        )
+        self.vocabulary = vocabulary
+        if not n_docs or not vocabulary:
+            self.weights = tf
+            return self
+
+        # Robertson-Sparck Jones IDF, floored at zero by the +1 inside the log
+        df = np.bincount(tf.indices, minlength=len(vocabulary))
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        doc_len = np.asarray(lengths, dtype=np.float32)
+        avg_len = float(doc_len.mean()) or 1.0
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / avg_len)
+        row_norm = np.repeat(norm, np.diff(tf.indptr))
+
+        weights = tf.copy()
+        weights.data = idf[tf.indices] * tf.data * (self.k1 + 1.0) / (tf.data + row_norm)
+        self.weights = weights
+        return self
+
+    def score(self, query: str) -> List[float]:
+        """BM25 score of every indexed document for query (unique query terms)."""
+        n_docs = self.weights.shape[0]
+        term_ids = {self.vocabulary[tok] for tok in bm25_tokenize(query) if tok in self.vocabulary}
+        if not n_docs or not term_ids:
+            return [0.0] * n_docs
+        query_vec = np.zeros(len(self.vocabulary), dtype=np.float32)
+        query_vec[list(term_ids)] = 1.0
+        return (self.weights @ query_vec).astype(float).tolist()
+
+
+def normalize_scores(scores: List[float]) -> List[float]:
+    """Scale non-negative scores to [0,1] by the maximum (all zeros stay zero)."""
+    top = max(scores) if scores else 0.0
+    if not top or math.isnan(top):
+        return [0.0 for _ in scores]
+    return [max(0.0, s / top) for s in scores]
+
+
+def skill_overlap(resume_skills: Iterable[str], required: Iterable[str], preferred: Iterable[str] = (),
+                  preferred_weight: float = 0.5) -> float:
+    """Weighted share of the job's required (and, at preferred_weight, preferred) skills the resume lists."""
+    have = {str(s).strip().lower() for s in resume_skills if str(s).strip()}
+    required = {str(s).strip().lower() for s in required if str(s).strip()}
+    preferred = {str(s).strip().lower() for s in preferred if str(s).strip()} - required
+    total = len(required) + preferred_weight * len(preferred)
+    if not total:
+        return 0.0
+    return (len(have & required) + preferred_weight * len(have & preferred)) / total
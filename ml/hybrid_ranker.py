@@ -1,10 +1,91 @@
 import math
-from typing import List, Dict
+import re
+from typing import Iterable, List, Dict, Set
 
-from sklearn.feature_extraction.text import TfidfVectorizer
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity as sk_cosine
 
 
+# Common words ignored by keyword coverage scoring
+KEYWORD_STOP_WORDS = {
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can',
+    'her', 'was', 'one', 'our', 'had', 'with', 'have', 'this', 'will',
+    'his', 'from', 'they', 'she', 'been', 'than', 'has', 'were'
+}
+
+# Coverage compares word tokens as TF-IDF does (lowercased runs of two or more
+# word characters, English stop words removed), so a session InvertedIndex
+# already holds every resume's coverage tokens as its unigram terms. With
+# findall, \w\w+ matches the same runs as the vectorizers' \b\w\w+\b, faster.
+_WORD_TOKEN_RE = re.compile(r"\w\w+")
+
+
+def keyword_terms(text: str) -> Set[str]:
+    """Lowercased whitespace-separated words longer than two characters, minus stop words."""
+    if not text:
+        return set()
+    return set(word.lower() for word in text.split() if len(word) > 2) - KEYWORD_STOP_WORDS
+
+
+def coverage_terms(job_keywords: Iterable[str]) -> Set[str]:
+    """Word tokens of the job keywords that coverage looks for ("Python," -> python, "node.js" -> node, js)."""
+    return set(_WORD_TOKEN_RE.findall(" ".join(job_keywords).lower())) - ENGLISH_STOP_WORDS
+
+
+def keyword_coverage(resume_text: str, job_keywords: Iterable[str]) -> float:
+    """Fraction of the job keywords' terms that also appear in the resume text."""
+    terms = coverage_terms(job_keywords)
+    if not resume_text or not terms:
+        return 0.0
+    return len(terms.intersection(_WORD_TOKEN_RE.findall(resume_text.lower()))) / len(terms)
+
+
+class KeywordCoverageScorer:
+    """Keyword coverage for a whole candidate pool.
+
+    The pool becomes a sparse binary (n_resumes, n_terms) matrix over the job's
+    coverage terms, and every score is a row's entry count. Without an index
+    each resume is tokenized once in C (regex findall plus one set
+    intersection). score_index() reads the same matrix off a session
+    InvertedIndex's postings instead, without tokenizing any resume.
+    """
+
+    def __init__(self, job_keywords: Iterable[str]):
+        self.terms: List[str] = sorted(coverage_terms(job_keywords))
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(self.terms)}
+        self._term_set = frozenset(self.terms)
+
+    def transform(self, resume_texts: List[str]) -> csr_matrix:
+        """Sparse binary (n_resumes, n_terms) matrix of the job terms present in each resume."""
+        find_tokens = _WORD_TOKEN_RE.findall
+        present = self._term_set.intersection
+        indptr = [0]
+        indices: List[int] = []
+        for text in resume_texts:
+            if text:
+                indices.extend(sorted(self.vocabulary[term] for term in present(find_tokens(text.lower()))))
+            indptr.append(len(indices))
+        return csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(resume_texts), len(self.terms))
+        )
+
+    def score(self, resume_texts: List[str]) -> List[float]:
+        """Fraction of the job terms found in each resume."""
+        if not self.terms:
+            return [0.0 for _ in resume_texts]
+        if not resume_texts:
+            return []
+        counts = np.diff(self.transform(resume_texts).indptr)
+        return (counts / len(self.terms)).tolist()
+
+    def score_index(self, index, doc_ids: List[str]) -> List[float]:
+        """Scores for indexed documents (an ml.inverted_index.InvertedIndex), in doc_ids order."""
+        return index.term_coverage(self.terms, doc_ids)
+
+
 class TfidfHybridScorer:
     """Compute TF-IDF similarities and return normalized scores.
 
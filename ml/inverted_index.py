@@ -0,0 +1,249 @@
+import hashlib
+import io
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+# Same terms as TfidfHybridScorer: lowercased unigrams and bigrams without English stop words
+_analyzer = TfidfVectorizer(ngram_range=(1, 2), stop_words="english", lowercase=True).build_analyzer()
+
+# Separator for the packed term and document id lists (cannot occur in either)
+_SEP = "\x00"
+
+# Version 2 adds per-document text digests; version 1 payloads load without them
+FORMAT_VERSION = 2
+
+
+def _pack(strings: List[str]) -> np.ndarray:
+    return np.frombuffer(_SEP.join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _unpack(packed: np.ndarray) -> List[str]:
+    text = packed.tobytes().decode("utf-8")
+    return text.split(_SEP) if text else []
+
+
+def text_digest(text: str) -> str:
+    """Digest of a document's text, stored per document to detect changed documents."""
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+class InvertedIndex:
+    """Incremental term index over a document collection (e.g. one session's resumes).
+
+    Term frequencies are kept as a sparse document x term matrix whose columns
+    are the posting lists; document frequencies and TF-IDF norms are derived
+    from it on demand. Documents can be added or replaced and removed without
+    re-tokenizing the rest, and any query is scored without refitting a
+    vectorizer. A digest of each document's text is kept so sync() can tell
+    changed documents apart. Serializes to a compressed .npz payload.
+    """
+
+    def __init__(self):
+        self.doc_ids: List[str] = []
+        self._doc_index: Dict[str, int] = {}
+        # doc_id -> text_digest of the indexed text (missing for version 1 payloads)
+        self.digests: Dict[str, str] = {}
+        self.terms: List[str] = []
+        self._term_index: Dict[str, int] = {}
+        self.tf = csr_matrix((0, 0), dtype=np.int32)
+        self._cache: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, "csr_matrix"]] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_index
+
+    # ========== Updates ==========
+
+    def add_documents(self, documents: Iterable[Tuple[str, str]]) -> None:
+        """Add (doc_id, text) pairs; an existing doc_id is replaced."""
+        # A doc_id repeated within one call keeps its last text
+        latest = dict(documents)
+        if not latest:
+            return
+        self.remove_documents([doc_id for doc_id in latest if doc_id in self._doc_index])
+
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        for text in latest.values():
+            for term, count in Counter(_analyzer(text or "")).items():
+                term_id = self._term_index.get(term)
+                if term_id is None:
+                    term_id = self._term_index[term] = len(self.terms)
+                    self.terms.append(term)
+                indices.append(term_id)
+                counts.append(count)
+            indptr.append(len(indices))
+
+        rows = csr_matrix(
+            (np.asarray(counts, dtype=np.int32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(latest), len(self.terms))
+        )
+        existing = self.tf
+        existing.resize((existing.shape[0], len(self.terms)))
+        self.tf = vstack([existing, rows], format="csr")
+        for doc_id, text in latest.items():
+            self._doc_index[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.digests[doc_id] = text_digest(text)
+        self._cache = None
+
+    def remove_documents(self, doc_ids: Iterable[str]) -> None:
+        """Drop documents; terms left without postings stay in the vocabulary until compacted."""
+        drop = {self._doc_index[d] for d in doc_ids if d in self._doc_index}
+        if not drop:
+            return
+        keep = [i for i in range(len(self.doc_ids)) if i not in drop]
+        self.tf = self.tf[keep]
+        self.doc_ids = [self.doc_ids[i] for i in keep]
+        self._doc_index = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+        self.digests = {doc_id: self.digests[doc_id] for doc_id in self.doc_ids if doc_id in self.digests}
+        self._cache = None
+
+    def sync(self, documents: Dict[str, str], keep: Iterable[str] = ()) -> bool:
+        """
+        Make the index hold exactly the given doc_id -> text documents plus the
+        doc_ids in keep: add missing documents, re-index those whose text
+        changed (a replaced file under the same name) and remove the rest.
+        Unchanged documents are not re-tokenized. Returns True if the index changed.
+        """
+        keep = set(keep)
+        stale = [doc_id for doc_id in self.doc_ids if doc_id not in documents and doc_id not in keep]
+        missing = [
+            (doc_id, text) for doc_id, text in documents.items()
+            if self.digests.get(doc_id) != text_digest(text)
+        ]
+        self.remove_documents(stale)
+        self.add_documents(missing)
+        return bool(stale or missing)
+
+    def compact(self) -> None:
+        """Drop vocabulary terms that no longer have postings."""
+        df = self.document_frequencies()
+        used = np.flatnonzero(df)
+        if len(used) == len(self.terms):
+            return
+        self.tf = self.tf[:, used].tocsr()
+        self.terms = [self.terms[i] for i in used]
+        self._term_index = {term: i for i, term in enumerate(self.terms)}
+        self._cache = None
+
+    # ========== Statistics and scoring ==========
+
+    def document_frequencies(self) -> np.ndarray:
+        return np.bincount(self.tf.indices, minlength=len(self.terms))
+
+    def _statistics(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, "csr_matrix"]:
+        """(df, idf, document TF-IDF norms, postings as CSC), cached until the next update."""
+        if self._cache is None:
+            n_docs = len(self.doc_ids)
+            df = self.document_frequencies()
+            # Smoothed IDF as in TfidfVectorizer
+            idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+            weighted = self.tf.astype(np.float64)
+            weighted.data *= idf[weighted.indices]
+            norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+            self._cache = (df, idf, norms, self.tf.tocsc())
+        return self._cache
+
+    def tfidf_scores(self, query: str, doc_ids: Optional[List[str]] = None) -> List[float]:
+        """
+        TF-IDF cosine similarity of documents to query, in doc_ids order
+        (default: index order). Unknown doc_ids score 0.0.
+        """
+        order = self.doc_ids if doc_ids is None else doc_ids
+        if not self.doc_ids:
+            return [0.0 for _ in order]
+        df, idf, norms, postings = self._statistics()
+
+        query_counts = Counter(_analyzer(query or ""))
+        n_docs = len(self.doc_ids)
+        # Query terms missing from the index still count towards its norm
+        unseen_idf = np.log(1.0 + n_docs) + 1.0
+        cols, weights = [], []
+        query_norm = 0.0
+        for term, count in query_counts.items():
+            term_id = self._term_index.get(term)
+            if term_id is not None and df[term_id]:
+                weight = count * idf[term_id]
+                cols.append(term_id)
+                weights.append(weight * idf[term_id])
+            else:
+                weight = count * unseen_idf
+            query_norm += weight * weight
+        if not cols or not query_norm:
+            return [0.0 for _ in order]
+
+        dots = postings[:, cols] @ np.asarray(weights)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sims = np.where(norms > 0, dots / (norms * np.sqrt(query_norm)), 0.0)
+
+        return [
+            float(max(0.0, min(1.0, sims[self._doc_index[doc_id]]))) if doc_id in self._doc_index else 0.0
+            for doc_id in order
+        ]
+
+    def term_coverage(self, terms: Iterable[str], doc_ids: Optional[List[str]] = None) -> List[float]:
+        """
+        Fraction of terms each document contains, in doc_ids order (default:
+        index order); one column slice of the postings. Unknown doc_ids score 0.0.
+        """
+        order = self.doc_ids if doc_ids is None else doc_ids
+        terms = set(terms)
+        if not terms or not self.doc_ids:
+            return [0.0 for _ in order]
+        cols = [self._term_index[term] for term in terms if term in self._term_index]
+        counts = np.zeros(len(self.doc_ids), dtype=np.int64)
+        if cols:
+            postings = self._statistics()[3]
+            # Stored counts are positive, so each entry is one present term
+            counts = np.bincount(postings[:, cols].indices, minlength=len(self.doc_ids))
+        coverage = counts / len(terms)
+        return [
+            float(coverage[self._doc_index[doc_id]]) if doc_id in self._doc_index else 0.0
+            for doc_id in order
+        ]
+
+    # ========== Serialization ==========
+
+    def to_bytes(self) -> bytes:
+        self.compact()
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            version=np.asarray([FORMAT_VERSION]),
+            doc_ids=_pack(self.doc_ids),
+            digests=_pack([self.digests.get(doc_id, "") for doc_id in self.doc_ids]),
+            terms=_pack(self.terms),
+            indptr=self.tf.indptr.astype(np.int64),
+            indices=self.tf.indices.astype(np.int32),
+            counts=self.tf.data.astype(np.int32)
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "InvertedIndex":
+        with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+            version = int(data["version"][0])
+            if version not in (1, FORMAT_VERSION):
+                raise ValueError("Unsupported inverted index format")
+            index = cls()
+            index.doc_ids = _unpack(data["doc_ids"])
+            if version >= 2:
+                digests = zip(index.doc_ids, _unpack(data["digests"]))
+                index.digests = {doc_id: digest for doc_id, digest in digests if digest}
+            index.terms = _unpack(data["terms"])
+            index.tf = csr_matrix(
+                (data["counts"], data["indices"], data["indptr"]),
+                shape=(len(index.doc_ids), len(index.terms))
+            )
+        index._doc_index = {doc_id: i for i, doc_id in enumerate(index.doc_ids)}
+        index._term_index = {term: i for i, term in enumerate(index.terms)}
+        return index
@@ -1,13 +1,14 @@
 """
-Script to regenerate reports from existing ranked_resumes.json
+Script to regenerate reports from an existing ranked results file
+(plain JSON or the compact .json.gz format).
 This will test if the fixes work correctly.
 """
-import json
 import os
 from app.services.report import generate_reports
+from app.services.results_store import decode_results, save_local_results
 
 def main():
-    # Check if ranked_resumes.json exists
+    # Check if the results file exists
     json_path = "data/ranked_resumes (2).json"
     
     if not os.path.exists(json_path):
@@ -16,18 +17,14 @@ def main():
     
     # Load the JSON data
     print(f"Loading data from {json_path}...")
-    with open(json_path, 'r', encoding='utf-8') as f:
-        ranked_data = json.load(f)
+    with open(json_path, 'rb') as f:
+        ranked_data = decode_results(f.read())
     
     print(f"Found {len(ranked_data)} candidates")
     
-    # Copy to reports directory
-    os.makedirs("reports", exist_ok=True)
-    reports_json = "reports/ranked_resumes.json"
-    
-    print(f"Copying to {reports_json}...")
-    with open(reports_json, 'w', encoding='utf-8') as f:
-        json.dump(ranked_data, f, indent=4)
+    # Store as the local reporting copy that generate_reports reads
+    reports_path = save_local_results(ranked_data)
+    print(f"Saved to {reports_path}")
     
     # Generate reports
     print("Generating reports...")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Keyword Scoring Benchmark
+Times keyword coverage for a synthetic candidate pool three ways:
+
+- the previous per-resume path (_calculate_keyword_score, which split and
+  lowercased the job description again for every resume)
+- KeywordCoverageScorer over the raw texts (no session index)
+- KeywordCoverageScorer.score_index over the session's inverted index, as the
+  ranking prescreen does once the session has been indexed
+
+The index is built once per session and persisted, then synced incrementally,
+so its build time is reported separately. The raw-text and index scores are
+checked to be identical.
+
+Usage: python test_environment/scripts/benchmark_keyword_scoring.py [--resumes N] [--words N] [--repeat N]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project paths
+script_dir = Path(__file__).parent
+test_env_dir = script_dir.parent
+project_root = test_env_dir.parent
+
+sys.path.insert(0, str(project_root))
+
+from ml.hybrid_ranker import KeywordCoverageScorer, keyword_terms
+from ml.inverted_index import InvertedIndex
+
+SKILLS = [
+    "Python", "Java", "SQL", "AWS", "Docker", "Kubernetes", "React", "Django", "Flask", "Spark",
+    "PostgreSQL", "Terraform", "Linux", "Git", "Kafka", "Airflow", "TensorFlow", "PyTorch", "Go", "Scala",
+]
+FILLER = ["the", "and", "with", "for", "team", "built", "led", "designed", "data", "services",
+          "platform", "pipelines", "customers", "reduced", "latency", "by", "across", "projects"]
+PUNCTUATION = ["", "", "", ",", ".", ";", "/"]
+
+
+# ---- Previous implementation, kept as the baseline ----
+
+LEGACY_STOP_WORDS = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can',
+                     'her', 'was', 'one', 'our', 'had', 'with', 'have', 'this', 'will',
+                     'his', 'from', 'they', 'she', 'been', 'than', 'has', 'were'}
+
+
+def legacy_calculate_keyword_score(resume_text, job_description):
+    if not resume_text or not job_description:
+        return 0.0
+    resume_words = set(word.lower() for word in resume_text.split() if len(word) > 2)
+    job_words = set(word.lower() for word in job_description.split() if len(word) > 2)
+    resume_words = resume_words - LEGACY_STOP_WORDS
+    job_words = job_words - LEGACY_STOP_WORDS
+    if not job_words:
+        return 0.0
+    return len(resume_words.intersection(job_words)) / len(job_words)
+
+
+def make_pool(resumes, words, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(5000)]
+
+    def word():
+        roll = rng.random()
+        token = rng.choice(SKILLS) if roll < 0.05 else rng.choice(FILLER) if roll < 0.5 else rng.choice(vocabulary)
+        return token + rng.choice(PUNCTUATION)
+
+    texts = [" ".join(word() for _ in range(words)) for _ in range(resumes)]
+    job_description = " ".join(word() for _ in range(250)) + " " + " ".join(rng.sample(SKILLS, 8))
+    return texts, job_description
+
+
+def best_time(function, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyword coverage scoring")
+    parser.add_argument("--resumes", type=int, default=5000, help="Resumes in the pool")
+    parser.add_argument("--words", type=int, default=600, help="Words per resume")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per method (best is reported)")
+    args = parser.parse_args()
+
+    texts, job_description = make_pool(args.resumes, args.words)
+    doc_ids = [f"resume_{i}.pdf" for i in range(len(texts))]
+    job_keywords = keyword_terms(job_description)
+    print(f"Pool: {len(texts)} resumes x {args.words} words, {len(job_keywords)} job keywords")
+
+    start = time.perf_counter()
+    index = InvertedIndex()
+    index.add_documents(zip(doc_ids, texts))
+    # Postings are cached with the TF-IDF statistics the prescreen computes first
+    index.tfidf_scores(job_description)
+    print(f"Session index build (once per session, then synced incrementally): {time.perf_counter() - start:.2f} s\n")
+
+    legacy_time, _ = best_time(
+        lambda: [legacy_calculate_keyword_score(text, job_description) for text in texts], args.repeat
+    )
+    pool_time, pool_scores = best_time(lambda: KeywordCoverageScorer(job_keywords).score(texts), args.repeat)
+    index_time, index_scores = best_time(
+        lambda: KeywordCoverageScorer(job_keywords).score_index(index, doc_ids), args.repeat
+    )
+
+    print(f"{'Method':42} {'seconds':>9} {'speedup':>8}")
+    for name, seconds in (("Per-resume _calculate_keyword_score", legacy_time),
+                          ("KeywordCoverageScorer.score (raw texts)", pool_time),
+                          ("KeywordCoverageScorer.score_index", index_time)):
+        print(f"{name:42} {seconds:9.4f} {legacy_time / seconds:7.1f}x")
+
+    if pool_scores != index_scores:
+        print("\nIndex scores differ from raw-text scores")
+        return 1
+    if legacy_time / index_time < 10:
+        print("\nSession index scoring is less than 10x faster than the per-resume path")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Text Cleanup Benchmark
+Times EnhancedTextExtractor's cleanup and quality scoring per document on the
+PDFs in test_environment/mock_data, against the previous implementation
+(one re.sub/re.findall scan per pattern), and checks both give the same output.
+
+Usage: python test_environment/scripts/benchmark_text_cleanup.py [--repeat N]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add project paths
+script_dir = Path(__file__).parent
+test_env_dir = script_dir.parent
+project_root = test_env_dir.parent
+
+sys.path.insert(0, str(project_root))
+
+from app.services.enhanced_text_extractor import enhanced_extractor
+
+
+# ---- Previous implementation, kept as the baseline ----
+
+def legacy_fix_text_bisection(text):
+    bisection_patterns = [
+        (r'([a-z])(\s+)([a-z])', r'\1\3'),
+        (r'([a-z])\s+([a-z]{1,2})\s+([a-z])', r'\1\2\3'),
+        (r'Ja\s*v\s*a\s*Script', 'JavaScript'),
+        (r'sen\s*ti\s*men\s*t', 'sentiment'),
+        (r'mo\s*v\s*emen\s*t', 'movement'),
+        (r'ey\s*e\s*s', 'eyes'),
+        (r'universit\s*y', 'university'),
+        (r'T\s*ec\s*hnology', 'Technology'),
+        (r'programmin\s*g', 'programming'),
+        (r'([a-zA-Z0-9]+)(\s+)@(\s+)([a-zA-Z0-9]+)', r'\1@\4'),
+    ]
+    for pattern, replacement in bisection_patterns:
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+
+def legacy_clean_extracted_text(text):
+    if not text:
+        return ""
+    text = legacy_fix_text_bisection(text)
+    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
+    text = re.sub(r' +', ' ', text)
+    text = re.sub(r'\t+', ' ', text)
+    # Line-break merging is unchanged apart from its precompiled pattern
+    text = enhanced_extractor._fix_line_break_words(text)
+    text = text.encode('utf-8').decode('utf-8')
+    return text.strip()
+
+
+def legacy_assess_text_quality(text):
+    if not text or len(text) < 50:
+        return 0.0
+    score = 1.0
+    whitespace_ratio = len(re.findall(r'\s+', text)) / len(text)
+    if whitespace_ratio > 0.3:
+        score -= 0.2
+    broken_words = len(re.findall(r'\b[a-zA-Z]\s+[a-zA-Z]\s*', text))
+    if broken_words > len(text.split()) * 0.1:
+        score -= 0.3
+    sentences = re.findall(r'[.!?]+', text)
+    if len(sentences) > 5:
+        score += 0.1
+    emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+    if emails:
+        score += 0.1
+    phones = re.findall(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b', text)
+    if phones:
+        score += 0.1
+    return min(1.0, max(0.0, score))
+
+
+def legacy_pipeline(text):
+    cleaned = legacy_clean_extracted_text(text)
+    return cleaned, legacy_assess_text_quality(cleaned)
+
+
+def current_pipeline(text):
+    cleaned = enhanced_extractor._clean_extracted_text(text)
+    return cleaned, enhanced_extractor._assess_text_quality(cleaned)
+
+
+def load_documents():
+    """Uncleaned text of each mock PDF, as PyMuPDF and pdfplumber return it."""
+    documents = []
+    for pdf_path in sorted((test_env_dir / "mock_data").glob("*.pdf")):
+        data = pdf_path.read_bytes()
+        for method in (enhanced_extractor._extract_pdf_pymupdf, enhanced_extractor._extract_pdf_pdfplumber):
+            documents.append((f"{pdf_path.name} ({method.__name__[13:]})", method(data)["formatted_text"]))
+    return documents
+
+
+def time_per_document(pipeline, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        pipeline(text)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extracted-text cleanup")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per document")
+    args = parser.parse_args()
+
+    documents = load_documents()
+    if not documents:
+        print("No PDFs found in test_environment/mock_data")
+        return 1
+
+    print(f"{'Document':45} {'chars':>7} {'before ms':>10} {'after ms':>9} {'speedup':>8}  same")
+    total_before = total_after = 0.0
+    all_same = True
+    for name, text in documents:
+        same = legacy_pipeline(text) == current_pipeline(text)
+        all_same = all_same and same
+        before = time_per_document(legacy_pipeline, text, args.repeat)
+        after = time_per_document(current_pipeline, text, args.repeat)
+        total_before += before
+        total_after += after
+        print(f"{name[:45]:45} {len(text):7d} {before:10.3f} {after:9.3f} {before / after:7.1f}x  {'yes' if same else 'NO'}")
+
+    count = len(documents)
+    print(f"\nMean per document: {total_before / count:.3f} ms -> {total_after / count:.3f} ms "
+          f"({total_before / total_after:.1f}x)")
+    if not all_same:
+        print("Output differs from the previous implementation")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
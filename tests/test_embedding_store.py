@@ -0,0 +1,117 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.services import embedding_store
+from app.services.embedding_store import IDS_FILE, MATRIX_FILE, EmbeddingStore, embedding_id, session_store_dir
+
+
+def cosine(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+VECTORS = {
+    "alice": [3.0, 4.0, 0.0],
+    "bob": [0.0, 1.0, 1.0],
+    "carol": [1.0, 0.0, 0.0],
+}
+QUERY = [1.0, 1.0, 0.0]
+
+
+def build(directory=None):
+    store = EmbeddingStore(directory)
+    store.upsert(list(VECTORS), list(VECTORS.values()))
+    return store
+
+
+def test_rows_are_normalized_float32():
+    store = build()
+    assert store.matrix.dtype == np.float32 and store.matrix.flags['C_CONTIGUOUS']
+    assert store.matrix.shape == (3, 3) and store.dimension == 3
+    assert np.linalg.norm(store.matrix, axis=1) == pytest.approx([1.0, 1.0, 1.0])
+
+
+def test_scores_match_cosine_similarity():
+    store = build()
+    ids = ["carol", "missing", "alice"]
+    expected = [cosine(VECTORS["carol"], QUERY), 0.0, cosine(VECTORS["alice"], QUERY)]
+    assert store.scores(QUERY, ids).tolist() == pytest.approx(expected, abs=1e-6)
+
+
+def test_scores_for_unusable_queries_are_zero():
+    store = build()
+    assert store.scores([], ["alice"]).tolist() == [0.0]
+    assert store.scores([1.0, 0.0], ["alice"]).tolist() == [0.0]  # wrong dimension
+    assert store.scores([0.0, 0.0, 0.0], ["alice"]).tolist() == [0.0]
+    assert EmbeddingStore().scores(QUERY, ["alice"]).tolist() == [0.0]
+
+
+def test_top_k_orders_by_similarity():
+    store = build()
+    ranked = sorted(VECTORS, key=lambda id_: cosine(VECTORS[id_], QUERY), reverse=True)
+    assert [id_ for id_, _ in store.top_k(QUERY, 2)] == ranked[:2]
+    assert [id_ for id_, _ in store.top_k(QUERY, 10)] == ranked
+    assert store.top_k(QUERY, 0) == []
+
+
+def test_upsert_replaces_existing_rows_and_missing_dedupes():
+    store = build()
+    store.upsert(["carol", "dave"], [[0.0, 0.0, 2.0], [0.0, 2.0, 0.0]])
+    assert store.ids == ["alice", "bob", "carol", "dave"]
+    assert store.scores([0.0, 0.0, 1.0], ["carol"]).tolist() == pytest.approx([1.0])
+    assert store.missing(["dave", "erin", "erin", "alice", "frank"]) == ["erin", "frank"]
+    # Empty embeddings (e.g. empty texts) are not stored
+    store.upsert(["erin"], [[]])
+    assert "erin" not in store.ids
+
+
+def test_dimension_change_resets_the_store():
+    store = build()
+    store.upsert(["dave"], [[1.0, 0.0]])
+    assert store.ids == ["dave"] and store.dimension == 2
+
+
+def test_retain_drops_other_rows():
+    store = build()
+    store.retain(["carol", "alice"])
+    assert store.ids == ["alice", "carol"]
+    assert store.scores(QUERY, ["alice", "bob"]).tolist() == pytest.approx(
+        [cosine(VECTORS["alice"], QUERY), 0.0], abs=1e-6
+    )
+
+
+def test_save_and_memory_mapped_load(tmp_path):
+    directory = str(tmp_path / "session")
+    build(directory).save()
+    loaded = EmbeddingStore.load(directory)
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.ids == list(VECTORS)
+    assert loaded.scores(QUERY, ["bob"]).tolist() == pytest.approx([cosine(VECTORS["bob"], QUERY)], abs=1e-6)
+
+    # Growing a loaded store copies out of the map and saves over it
+    loaded.upsert(["dave"], [[0.0, 0.0, 1.0]])
+    loaded.save()
+    assert EmbeddingStore.load(directory).ids == list(VECTORS) + ["dave"]
+
+
+def test_out_of_sync_store_is_discarded(tmp_path):
+    directory = str(tmp_path / "session")
+    build(directory).save()
+    with open(os.path.join(directory, IDS_FILE), "w") as f:
+        json.dump(["alice"], f)
+    assert len(EmbeddingStore.load(directory)) == 0
+    assert len(EmbeddingStore.load(str(tmp_path / "missing"))) == 0
+    assert os.path.exists(os.path.join(directory, MATRIX_FILE))
+
+
+def test_ids_and_directories(monkeypatch, tmp_path):
+    assert embedding_id("python developer") == embedding_id("python developer")
+    assert embedding_id("python developer") != embedding_id("java developer")
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path))
+    assert session_store_dir("/user@example.com/session_1/") == os.path.join(
+        str(tmp_path), "user@example.com_session_1"
+    )
+    assert session_store_dir("") == os.path.join(str(tmp_path), "default")
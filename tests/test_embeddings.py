@@ -0,0 +1,108 @@
+import types
+
+import pytest
+
+from app.services import embeddings, openai_scheduler
+from app.services.embeddings import generate_resume_embeddings, get_text_embedding, get_text_embeddings
+from app.services.openai_scheduler import OpenAIScheduler
+
+MODEL = "text-embedding-3-large"
+
+
+def vector(text: str):
+    return [float(len(text)), float(ord(text[0]))]
+
+
+class FakeEmbeddingsClient:
+    """Records each request's inputs; fail_above makes larger batches fail."""
+
+    def __init__(self, fail_above: int = None, reverse: bool = False):
+        self.requests = []
+        self.fail_above = fail_above
+        self.reverse = reverse
+        self.embeddings = self
+
+    def create(self, input, model):
+        self.requests.append(list(input))
+        if self.fail_above is not None and len(input) > self.fail_above:
+            raise ValueError("request too large")
+        data = [types.SimpleNamespace(index=i, embedding=vector(text)) for i, text in enumerate(input)]
+        if self.reverse:
+            data.reverse()
+        return types.SimpleNamespace(data=data)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = OpenAIScheduler(MODEL, rpm=0, tpm=0, max_retries=0)
+    monkeypatch.setattr(openai_scheduler, "_schedulers", {MODEL: scheduler})
+    return scheduler
+
+
+@pytest.fixture
+def client(monkeypatch, scheduler):
+    client = FakeEmbeddingsClient()
+    monkeypatch.setattr(embeddings.openai_clients, "get_client", lambda endpoint: client)
+    return client
+
+
+def test_batches_respect_item_limit_and_keep_order(client, scheduler):
+    texts = [f"text {i}" for i in range(5)]
+    assert get_text_embeddings(texts, max_items=2) == [vector(text) for text in texts]
+    assert client.requests == [texts[0:2], texts[2:4], texts[4:]]
+    # Every request goes through the deployment's scheduler
+    assert scheduler.stats()['requests'] == 3
+
+
+def test_batches_respect_token_limit(client):
+    long_text = "x" * 400  # about 101 estimated tokens
+    texts = [long_text, long_text, long_text, "y" * 2000, long_text]
+    get_text_embeddings(texts, max_items=10, max_tokens=250)
+    # Two long texts fit per request; an oversized text is sent on its own
+    assert [len(request) for request in client.requests] == [2, 1, 1, 1]
+    assert client.requests[2] == ["y" * 2000]
+
+
+def test_empty_texts_are_skipped(client):
+    result = get_text_embeddings(["python", "", "   ", None, "aws"])
+    assert result == [vector("python"), [], [], [], vector("aws")]
+    assert client.requests == [["python", "aws"]]
+    assert get_text_embeddings(["", None]) == [[], []]
+    assert get_text_embedding("  ") == []
+    assert len(client.requests) == 1
+
+
+def test_response_items_are_placed_by_index(monkeypatch, scheduler):
+    client = FakeEmbeddingsClient(reverse=True)
+    monkeypatch.setattr(embeddings.openai_clients, "get_client", lambda endpoint: client)
+    texts = ["alpha", "beta", "gamma"]
+    assert get_text_embeddings(texts) == [vector(text) for text in texts]
+
+
+def test_failed_batches_are_split_and_retried(monkeypatch, scheduler):
+    client = FakeEmbeddingsClient(fail_above=1)
+    monkeypatch.setattr(embeddings.openai_clients, "get_client", lambda endpoint: client)
+    texts = ["a1", "b22", "c333", "d4444"]
+    assert get_text_embeddings(texts, max_items=4) == [vector(text) for text in texts]
+    # Only the failing halves are sent again
+    assert client.requests == [texts, texts[:2], texts[:1], texts[1:2], texts[2:], texts[2:3], texts[3:]]
+
+
+def test_single_text_failure_is_raised(monkeypatch, scheduler):
+    client = FakeEmbeddingsClient(fail_above=0)
+    monkeypatch.setattr(embeddings.openai_clients, "get_client", lambda endpoint: client)
+    with pytest.raises(ValueError):
+        get_text_embeddings(["python", "aws"])
+
+
+def test_generate_resume_embeddings_uses_one_request(client):
+    preprocessed = [
+        {"cleaned_text": "python developer", "skills": ["python"]},
+        {"cleaned_text": "java developer", "skills": ["java", "spring"]},
+    ]
+    results = generate_resume_embeddings(preprocessed)
+    assert [result["text"] for result in results] == [
+        "python developer\nSkills: python", "java developer\nSkills: java spring"
+    ]
+    assert [result["vector_length"] for result in results] == [2, 2]
+    assert len(client.requests) == 1
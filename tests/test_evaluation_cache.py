@@ -0,0 +1,136 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.services import evaluation_cache as evaluation_cache_module
+from app.services.evaluation_cache import EvaluationCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(evaluation_cache_module.time, "time", clock)
+    return clock
+
+
+def last_access(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT last_access FROM evaluations WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_make_key_depends_on_every_part():
+    key = EvaluationCache.make_key("resume", "job", "model", "eval-1")
+    assert key == EvaluationCache.make_key("resume", "job", "model", "eval-1")
+    assert key != EvaluationCache.make_key("resume", "job", "model", "eval-2")
+    assert key != EvaluationCache.make_key("resume", "job", "other", "eval-1")
+    # Parts are delimited, so moving text between them changes the key
+    assert EvaluationCache.make_key("ab", "c", "m", "v") != EvaluationCache.make_key("a", "bc", "m", "v")
+
+
+def test_round_trip_and_counters(tmp_path, clock):
+    cache = EvaluationCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("missing") is None
+    cache.set("k", {"overall_score": 0.8, "strengths": ["python"]})
+    assert cache.get("k") == {"overall_score": 0.8, "strengths": ["python"]}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_get_many_keeps_input_order_and_duplicates(tmp_path, clock):
+    cache = EvaluationCache(str(tmp_path / "cache.sqlite3"))
+    cache.set_many([("a", {"n": 1}), ("b", {"n": 2})])
+    assert cache.get_many(["b", "x", "a", "b"]) == [{"n": 2}, None, {"n": 1}, {"n": 2}]
+    assert cache.hits == 3 and cache.misses == 1
+
+
+def test_get_many_spans_query_chunks(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(EvaluationCache, "QUERY_CHUNK", 2)
+    cache = EvaluationCache(str(tmp_path / "cache.sqlite3"))
+    cache.set_many([(f"k{i}", {"n": i}) for i in range(5)])
+    assert cache.get_many([f"k{i}" for i in range(5)]) == [{"n": i} for i in range(5)]
+
+
+def test_reads_do_not_write_last_access(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EvaluationCache(path)
+    cache.set("k", {"n": 1})
+    clock.now += 50
+    assert cache.get("k") == {"n": 1}
+    assert last_access(path, "k") == 1000.0
+    # The touch is written with the next write
+    cache.set("other", {"n": 2})
+    assert last_access(path, "k") == 1050.0
+
+
+def test_expired_entries_are_misses(tmp_path, clock):
+    cache = EvaluationCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=100)
+    cache.set("k", {"n": 1})
+    clock.now += 101
+    assert cache.get("k") is None
+    assert cache.misses == 1
+
+
+def test_eviction_runs_periodically(tmp_path, clock):
+    cache = EvaluationCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", {"n": 1})
+    clock.now += 1
+    cache.set("b", {"n": 2})
+    clock.now += 1
+    assert cache.get("a") == {"n": 1}
+    clock.now += 1
+    cache.set("c", {"n": 3})
+    # Within EVICT_INTERVAL_SECONDS of the first write nothing is evicted
+    assert cache.stats()["entries"] == 3
+
+    clock.now += EvaluationCache.EVICT_INTERVAL_SECONDS
+    cache.set("d", {"n": 4})
+    # "a" was read after "b" was written, so "b" is the least recently used
+    assert cache.stats()["entries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("d") == {"n": 4}
+    assert cache.get("a") is None
+
+
+def test_eviction_drops_expired_entries(tmp_path, clock):
+    cache = EvaluationCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=100)
+    cache.set("old", {"n": 1})
+    clock.now += EvaluationCache.EVICT_INTERVAL_SECONDS
+    cache.set("new", {"n": 2})
+    assert cache.stats()["entries"] == 1
+
+
+def test_async_variants(tmp_path, clock):
+    cache = EvaluationCache(str(tmp_path / "cache.sqlite3"))
+
+    async def run():
+        await cache.set_async("a", {"n": 1})
+        await cache.set_many_async([("b", {"n": 2})])
+        return await cache.get_async("a"), await cache.get_many_async(["b", "c"])
+
+    assert asyncio.run(run()) == ({"n": 1}, [{"n": 2}, None])
+
+
+def test_disabled_cache(tmp_path):
+    cache = EvaluationCache("")
+    cache.set("k", {"n": 1})
+    assert cache.get("k") is None
+    assert cache.get_many(["k", "j"]) == [None, None]
+    assert cache.stats()["entries"] == 0
+
+
+def test_clear(tmp_path, clock):
+    cache = EvaluationCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("k", {"n": 1})
+    cache.get("k")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "entries": 0}
@@ -0,0 +1,122 @@
+import io
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from ml.inverted_index import InvertedIndex, _pack, text_digest
+
+
+DOCUMENTS = {
+    "alice.pdf": "Python developer building machine learning pipelines on AWS",
+    "bob.pdf": "Java developer with Spring and Oracle experience",
+    "carol.pdf": "Data engineer: Python, Spark and AWS data pipelines",
+}
+
+
+def reference_scores(documents, query):
+    """TF-IDF cosine with the vectorizer fitted on the documents only."""
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), stop_words="english", lowercase=True)
+    matrix = vectorizer.fit_transform(list(documents.values()))
+    return cosine_similarity(matrix, vectorizer.transform([query])).ravel().tolist()
+
+
+def build(documents=DOCUMENTS):
+    index = InvertedIndex()
+    index.add_documents(documents.items())
+    return index
+
+
+def test_scores_match_tfidf_vectorizer():
+    # Every unigram and bigram of the query is indexed; unseen ones are covered below
+    query = "python developer"
+    assert build().tfidf_scores(query) == pytest.approx(reference_scores(DOCUMENTS, query))
+
+
+def test_scores_follow_requested_order_and_unknown_ids_score_zero():
+    index = build()
+    scores = dict(zip(index.doc_ids, index.tfidf_scores("python aws")))
+    assert index.tfidf_scores("python aws", ["carol.pdf", "missing.pdf", "alice.pdf"]) == [
+        scores["carol.pdf"], 0.0, scores["alice.pdf"]
+    ]
+
+
+def test_unseen_query_terms_lower_similarity():
+    index = build()
+    assert index.tfidf_scores("python kubernetes")[0] < index.tfidf_scores("python")[0]
+    assert index.tfidf_scores("kubernetes") == [0.0, 0.0, 0.0]
+    assert InvertedIndex().tfidf_scores("python", ["a"]) == [0.0]
+
+
+def test_replace_and_remove_match_a_fresh_index():
+    index = build()
+    index.add_documents([("bob.pdf", "Python developer with Django")])
+    index.remove_documents(["alice.pdf"])
+    expected = {"carol.pdf": DOCUMENTS["carol.pdf"], "bob.pdf": "Python developer with Django"}
+    query = "python developer"
+    assert index.doc_ids == ["carol.pdf", "bob.pdf"]
+    assert index.tfidf_scores(query) == pytest.approx(build(expected).tfidf_scores(query))
+    assert set(index.digests) == {"carol.pdf", "bob.pdf"}
+
+
+def test_sync_adds_removes_and_reindexes_changed_text():
+    index = build()
+    changed = dict(DOCUMENTS, **{"bob.pdf": "Go developer with Kubernetes", "dave.pdf": "Rust developer"})
+    del changed["alice.pdf"]
+
+    assert index.sync(changed)
+    assert sorted(index.doc_ids) == ["bob.pdf", "carol.pdf", "dave.pdf"]
+    assert index.digests["bob.pdf"] == text_digest("Go developer with Kubernetes")
+    assert index.tfidf_scores("kubernetes", ["bob.pdf"])[0] > 0
+    # Nothing changed, nothing to do
+    assert not index.sync(changed)
+
+
+def test_sync_keeps_documents_in_keep():
+    index = build()
+    assert index.sync({"alice.pdf": DOCUMENTS["alice.pdf"]}, keep=["bob.pdf"])
+    assert index.doc_ids == ["alice.pdf", "bob.pdf"]
+
+
+def test_compact_drops_unused_terms():
+    index = build()
+    index.remove_documents(["bob.pdf"])
+    index.compact()
+    assert "oracle" not in index.terms
+    assert index.document_frequencies().min() > 0
+
+
+def test_serialization_round_trip():
+    index = build()
+    restored = InvertedIndex.from_bytes(index.to_bytes())
+    assert restored.doc_ids == index.doc_ids
+    assert restored.digests == index.digests
+    assert restored.tfidf_scores("python aws") == pytest.approx(index.tfidf_scores("python aws"))
+    assert not restored.sync(DOCUMENTS)
+
+
+def test_version_1_payload_reindexes_on_sync():
+    index = build()
+    index.compact()
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        version=np.asarray([1]),
+        doc_ids=_pack(index.doc_ids),
+        terms=_pack(index.terms),
+        indptr=index.tf.indptr.astype(np.int64),
+        indices=index.tf.indices.astype(np.int32),
+        counts=index.tf.data.astype(np.int32)
+    )
+    restored = InvertedIndex.from_bytes(buffer.getvalue())
+    assert restored.doc_ids == index.doc_ids and restored.digests == {}
+    assert restored.sync(DOCUMENTS)
+    assert restored.digests == index.digests
+
+
+def test_unsupported_version_is_rejected():
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, version=np.asarray([99]))
+    with pytest.raises(ValueError):
+        InvertedIndex.from_bytes(buffer.getvalue())
@@ -0,0 +1,70 @@
+import pytest
+
+from app.services import jd_analysis
+from app.services.evaluation_cache import EvaluationCache
+from app.services.jd_analysis import JobDescriptionAnalyzer, jd_content_hash
+
+JOB = "Senior Python Engineer\n5+ years of Python, AWS and Docker."
+
+
+@pytest.fixture
+def embed_calls(monkeypatch):
+    calls = []
+
+    def fake_embedding(text):
+        calls.append(text)
+        return [0.6, 0.8]
+
+    monkeypatch.setattr(jd_analysis, "get_text_embedding", fake_embedding)
+    return calls
+
+
+def analyzer(path, extracted=None):
+    analyzer = JobDescriptionAnalyzer(EvaluationCache(str(path)))
+    analyzer._extract_requirements = lambda job_description: extracted
+    return analyzer
+
+
+def test_rule_based_profile(tmp_path):
+    profile = analyzer(tmp_path / "jd.sqlite3").analyze(JOB, requirements=False)
+    assert profile['source'] == 'rules'
+    assert profile['jd_hash'] == jd_content_hash(JOB)
+    assert profile['seniority'] == 'senior'
+    assert profile['min_years_experience'] == 5.0
+    assert profile['embedding'] is None
+
+
+def test_embedding_is_computed_once_per_job_description(tmp_path, embed_calls):
+    path = tmp_path / "jd.sqlite3"
+    first = analyzer(path)
+    assert first.embedding(JOB) == [0.6, 0.8]
+    assert first.embedding(JOB) == [0.6, 0.8]
+    # A new process reads it from the profile cache
+    assert analyzer(path).embedding(JOB) == [0.6, 0.8]
+    assert embed_calls == [JOB]
+
+    # Another job description gets its own embedding
+    first.embedding(JOB + " Kubernetes")
+    assert len(embed_calls) == 2
+
+
+def test_embedding_survives_requirements_upgrade(tmp_path, embed_calls):
+    path = tmp_path / "jd.sqlite3"
+    jd = analyzer(path, extracted={'title': 'Senior Python Engineer', 'required_skills': ['python']})
+    jd.embedding(JOB)
+    profile = jd.analyze(JOB)
+    assert profile['source'] == 'llm'
+    assert profile['embedding'] == [0.6, 0.8]
+    assert analyzer(path).analyze(JOB, requirements=False)['embedding'] == [0.6, 0.8]
+    assert embed_calls == [JOB]
+
+
+def test_failed_embedding_is_not_cached(tmp_path, monkeypatch):
+    def failing(text):
+        raise RuntimeError("embeddings unavailable")
+
+    monkeypatch.setattr(jd_analysis, "get_text_embedding", failing)
+    jd = analyzer(tmp_path / "jd.sqlite3")
+    with pytest.raises(RuntimeError):
+        jd.embedding(JOB)
+    assert jd.analyze(JOB, requirements=False)['embedding'] is None
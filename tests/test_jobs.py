@@ -0,0 +1,223 @@
+import logging
+import time
+
+import pytest
+
+from app.services import jobs
+from app.services.jobs import (
+    STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED,
+    InMemoryJobQueue, JobQueue, JobWorkerPool, SQLiteJobQueue,
+    _acquire_worker_lock, _timestamp, create_job_queue, process_job
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    return InMemoryJobQueue()
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    handlers = {}
+    monkeypatch.setattr(jobs, "JOB_HANDLERS", handlers)
+    return handlers
+
+
+def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+# ========== Queue backends ==========
+
+def test_submit_get_and_claim(queue):
+    job_id = queue.submit("rank", {"user_id": "u1", "job_description": "Python"})
+    job = queue.get(job_id)
+    assert job['status'] == STATUS_QUEUED
+    assert job['payload'] == {"user_id": "u1", "job_description": "Python"}
+    assert (job['progress'], job['result'], job['attempts']) == ({}, None, 0)
+
+    claimed = queue.claim()
+    assert claimed['id'] == job_id
+    assert claimed['status'] == STATUS_RUNNING and claimed['attempts'] == 1
+    assert claimed['started_at'] == claimed['heartbeat_at']
+    assert queue.get(job_id)['status'] == STATUS_RUNNING
+    assert queue.claim() is None
+    assert queue.get("missing") is None
+
+
+def test_claim_order_is_submission_order(queue):
+    ids = [queue.submit("rank", {"n": i}) for i in range(3)]
+    assert [queue.claim()['id'] for _ in ids] == ids
+
+
+def test_update_stores_json_fields(queue):
+    job_id = queue.submit("rank", {})
+    queue.update(job_id, progress={'stage': 'scoring', 'completed': 2, 'total': 5})
+    queue.update(job_id, status=STATUS_SUCCEEDED, result={'ranked_resumes': [{'file': 'a.pdf'}]})
+    job = queue.get(job_id)
+    assert job['progress'] == {'stage': 'scoring', 'completed': 2, 'total': 5}
+    assert job['result'] == {'ranked_resumes': [{'file': 'a.pdf'}]}
+    assert job['status'] == STATUS_SUCCEEDED
+
+
+def test_reclaim_stale_requeues_then_fails(queue):
+    job_id = queue.submit("rank", {})
+    queue.claim()
+    # Nothing is stale within the window
+    assert queue.reclaim_stale(stale_after=300, max_attempts=2) == 0
+
+    # A negative window puts the cutoff in the future, so the heartbeat is stale
+    assert queue.reclaim_stale(stale_after=-1, max_attempts=2) == 1
+    job = queue.get(job_id)
+    assert job['status'] == STATUS_QUEUED and job['heartbeat_at'] is None
+
+    assert queue.claim()['attempts'] == 2
+    assert queue.reclaim_stale(stale_after=-1, max_attempts=2) == 1
+    job = queue.get(job_id)
+    assert job['status'] == STATUS_FAILED
+    assert job['error'] == "Job worker stopped responding"
+    assert queue.claim() is None
+
+
+def test_reclaim_stale_skips_fresh_heartbeats(queue):
+    job_id = queue.submit("rank", {})
+    queue.claim()
+    queue.update(job_id, heartbeat_at=_timestamp(600))
+    queue.heartbeat(job_id)
+    assert queue.reclaim_stale(stale_after=300) == 0
+    assert queue.get(job_id)['status'] == STATUS_RUNNING
+
+
+def test_expire_finished_drops_old_finished_jobs(queue):
+    old = queue.submit("rank", {})
+    recent = queue.submit("rank", {})
+    running = queue.submit("rank", {})
+    queue.update(old, status=STATUS_SUCCEEDED, finished_at=_timestamp(100))
+    queue.update(recent, status=STATUS_FAILED, finished_at=_timestamp(10))
+    queue.update(running, status=STATUS_RUNNING)
+
+    assert queue.expire_finished(ttl=0) == 0
+    assert queue.expire_finished(ttl=50) == 1
+    assert queue.get(old) is None
+    assert queue.get(recent) is not None and queue.get(running) is not None
+
+
+def test_sqlite_queue_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    job_id = SQLiteJobQueue(path).submit("rank", {"n": 1})
+    other = SQLiteJobQueue(path)
+    assert other.claim()['id'] == job_id
+    assert SQLiteJobQueue(path).claim() is None
+
+
+def test_create_job_queue(tmp_path):
+    assert isinstance(create_job_queue("memory"), InMemoryJobQueue)
+    assert isinstance(create_job_queue("sqlite", str(tmp_path / "jobs.sqlite3")), SQLiteJobQueue)
+    with pytest.raises(ValueError):
+        create_job_queue("redis")
+
+
+def test_job_queue_is_abstract():
+    with pytest.raises(TypeError):
+        JobQueue()
+
+
+# ========== Processing ==========
+
+def test_process_job_records_result_and_progress(queue, handlers):
+    def handler(job, report_progress):
+        report_progress("scoring", 1, 2)
+        return {'echo': job['payload']['n']}
+
+    handlers['echo'] = handler
+    job_id = queue.submit("echo", {"n": 7})
+    process_job(queue, queue.claim())
+
+    job = queue.get(job_id)
+    assert job['status'] == STATUS_SUCCEEDED
+    assert job['result'] == {'echo': 7}
+    assert job['progress'] == {'stage': 'scoring', 'completed': 1, 'total': 2}
+    assert job['finished_at']
+
+
+def test_process_job_records_failures(queue, handlers):
+    def handler(job, report_progress):
+        raise RuntimeError("no resumes")
+
+    handlers['broken'] = handler
+    failing = queue.submit("broken", {})
+    process_job(queue, queue.claim())
+    unknown = queue.submit("unknown", {})
+    process_job(queue, queue.claim())
+
+    assert queue.get(failing)['status'] == STATUS_FAILED
+    assert queue.get(failing)['error'] == "no resumes"
+    assert queue.get(unknown)['status'] == STATUS_FAILED
+
+
+def test_process_job_heartbeats_while_running(queue, handlers):
+    def handler(job, report_progress):
+        time.sleep(0.2)
+        return {}
+
+    handlers['slow'] = handler
+    job_id = queue.submit("slow", {})
+    claimed = queue.claim()
+    process_job(queue, claimed, heartbeat_interval=0.02)
+    assert queue.get(job_id)['heartbeat_at'] > claimed['heartbeat_at']
+
+
+# ========== Workers ==========
+
+def test_worker_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "locks" / "jobs.workers.lock")
+    first = _acquire_worker_lock(path)
+    assert first is not None
+    assert _acquire_worker_lock(path) is None
+    first.close()
+    second = _acquire_worker_lock(path)
+    assert second is not None
+    second.close()
+
+
+def test_thread_pool_processes_jobs_and_stops(handlers):
+    handlers['echo'] = lambda job, report_progress: {'n': job['payload']['n']}
+    queue = InMemoryJobQueue()
+    ids = [queue.submit("echo", {"n": i}) for i in range(4)]
+
+    pool = JobWorkerPool(queue, size=2, backend="memory")
+    pool.start()
+    try:
+        assert wait_for(lambda: all(queue.get(job_id)['status'] == STATUS_SUCCEEDED for job_id in ids))
+    finally:
+        pool.stop(timeout=5)
+    assert [queue.get(job_id)['result'] for job_id in ids] == [{'n': i} for i in range(4)]
+    assert pool._workers == []
+
+
+def test_thread_pool_warns_it_is_for_development(caplog):
+    pool = JobWorkerPool(InMemoryJobQueue(), size=1, backend="memory")
+    with caplog.at_level(logging.WARNING, logger="app.services.jobs"):
+        pool.start()
+    pool.stop(timeout=5)
+    assert any("JOB_BACKEND=sqlite" in record.getMessage() for record in caplog.records)
+
+
+def test_sqlite_pool_defers_to_lock_holder(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    lock_file = _acquire_worker_lock(f"{path}.workers.lock")
+    try:
+        pool = JobWorkerPool(SQLiteJobQueue(path), size=2, backend="sqlite", path=path)
+        pool.start()
+        # Another process owns the workers, so this one only submits
+        assert pool._workers == []
+        pool.stop(timeout=1)
+    finally:
+        lock_file.close()
@@ -0,0 +1,142 @@
+import math
+import random
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ml.bm25 import BM25Index, bm25_tokenize, normalize_scores, skill_overlap
+from ml.hybrid_ranker import KeywordCoverageScorer, coverage_terms, keyword_coverage, keyword_terms
+from ml.inverted_index import InvertedIndex
+
+
+JOB = "Senior Python engineer with AWS Docker and the Kubernetes platform"
+
+RESUMES = [
+    "Python developer; AWS, Docker and Kubernetes in production",
+    "Java engineer. Spring, Oracle and some AWS",
+    "PYTHON python Python engineer",
+    "",
+    None,
+]
+
+
+def test_keyword_terms_filters_short_and_stop_words():
+    assert keyword_terms("The AI team will use Python and SQL") == {"team", "use", "python", "sql"}
+    assert keyword_terms("") == set()
+
+
+def test_coverage_terms_are_word_tokens_without_stop_words():
+    assert coverage_terms({"Python,", "node.js", "about", "C++"}) == {"python", "node", "js"}
+    assert coverage_terms([]) == set()
+
+
+def test_coverage_matches_words_inside_punctuation():
+    job_keywords = keyword_terms("Python, Django and AWS")
+    assert keyword_coverage("Python/Django developer (AWS)", job_keywords) == 1.0
+    assert keyword_coverage("Java developer", job_keywords) == 0.0
+    assert keyword_coverage("", job_keywords) == 0.0
+
+
+def test_coverage_tokens_match_tfidf_unigrams():
+    analyzer = TfidfVectorizer(stop_words="english").build_analyzer()
+    rng = random.Random(3)
+    pieces = ["Python,", "C++", "node.js", "a", "über-cool", "x_y", "The", "CI/CD", "•", "2024", "İstanbul"]
+    for _ in range(50):
+        text = " ".join(rng.choice(pieces) for _ in range(12))
+        assert coverage_terms([text]) == set(analyzer(text))
+
+
+def test_coverage_scorer_matches_keyword_coverage():
+    job_keywords = keyword_terms(JOB)
+    scores = KeywordCoverageScorer(job_keywords).score(RESUMES)
+    assert scores == [keyword_coverage(text or "", job_keywords) for text in RESUMES]
+    assert scores[0] > scores[1] > 0
+    assert scores[3:] == [0.0, 0.0]
+
+
+def test_coverage_scorer_matches_keyword_coverage_on_random_pool():
+    rng = random.Random(7)
+    words = ["python", "Python,", "AWS", "aws", "docker", "sql", "the", "go", "lead", "Kubernetes"]
+    job_keywords = keyword_terms("python aws docker kubernetes lead the go sql")
+    texts = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 15))) for _ in range(200)]
+    assert KeywordCoverageScorer(job_keywords).score(texts) == [
+        keyword_coverage(text, job_keywords) for text in texts
+    ]
+
+
+def test_coverage_scorer_rows_are_binary():
+    scorer = KeywordCoverageScorer({"python", "aws"})
+    matrix = scorer.transform(["python python python", "aws python", "java"])
+    assert matrix.shape == (3, 2)
+    assert matrix.toarray().tolist() == [[0, 1], [1, 1], [0, 0]]
+
+
+def test_index_coverage_matches_scorer():
+    job_keywords = keyword_terms(JOB)
+    texts = {f"r{i}.pdf": text or "" for i, text in enumerate(RESUMES)}
+    index = InvertedIndex()
+    index.add_documents(texts.items())
+    scorer = KeywordCoverageScorer(job_keywords)
+    ids = list(texts) + ["missing.pdf"]
+    assert scorer.score_index(index, ids) == pytest.approx(scorer.score(list(texts.values())) + [0.0])
+
+    index.remove_documents(["r0.pdf"])
+    assert scorer.score_index(index, ["r0.pdf", "r2.pdf"]) == pytest.approx([0.0, scorer.score([RESUMES[2]])[0]])
+    assert KeywordCoverageScorer([]).score_index(index, ["r2.pdf"]) == [0.0]
+
+
+def test_coverage_scorer_edge_cases():
+    assert KeywordCoverageScorer([]).score(["python"]) == [0.0]
+    assert KeywordCoverageScorer({"python"}).score([]) == []
+
+
+def test_bm25_tokenize_drops_stop_words_and_non_letters():
+    assert bm25_tokenize("The Python-3 developer, and a C++ coder") == ["python", "developer", "coder"]
+    assert bm25_tokenize("") == []
+
+
+def test_bm25_matches_reference_formula():
+    documents = ["python aws docker", "python python java", "java spring oracle oracle", ""]
+    index = BM25Index(k1=1.2, b=0.75).fit(documents)
+    query = "python oracle"
+
+    tokenized = [bm25_tokenize(doc) for doc in documents]
+    avg_len = sum(len(tokens) for tokens in tokenized) / len(tokenized)
+    expected = []
+    for tokens in tokenized:
+        score = 0.0
+        for term in set(bm25_tokenize(query)):
+            df = sum(term in doc for doc in tokenized)
+            idf = math.log(1 + (len(tokenized) - df + 0.5) / (df + 0.5))
+            tf = tokens.count(term)
+            score += idf * tf * 2.2 / (tf + 1.2 * (1 - 0.75 + 0.75 * len(tokens) / avg_len))
+        expected.append(score)
+
+    assert index.score(query) == pytest.approx(expected, rel=1e-5)
+    assert index.score(query)[3] == 0.0
+
+
+def test_bm25_repeated_query_terms_count_once():
+    index = BM25Index().fit(["python aws", "java"])
+    assert index.score("python python") == index.score("python")
+
+
+def test_bm25_empty_cases():
+    assert BM25Index().fit([]).score("python") == []
+    assert BM25Index().fit(["python"]).score("the and") == [0.0]
+    assert BM25Index().fit(["", ""]).score("python") == [0.0, 0.0]
+
+
+def test_normalize_scores():
+    assert normalize_scores([2.0, 1.0, 0.0]) == [1.0, 0.5, 0.0]
+    assert normalize_scores([0.0, 0.0]) == [0.0, 0.0]
+    assert normalize_scores([]) == []
+
+
+def test_skill_overlap_weights_preferred_skills():
+    assert skill_overlap(["Python", " AWS "], ["python", "aws"]) == 1.0
+    # Required python (1) + preferred docker (0.5) of 2 + 0.5
+    assert skill_overlap(["python", "docker"], ["python", "sql"], ["docker"]) == pytest.approx(1.5 / 2.5)
+    # A preferred skill that is also required counts once, as required
+    assert skill_overlap(["python"], ["python"], ["python"]) == 1.0
+    assert skill_overlap(["python"], [], []) == 0.0
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import re
+import types
+
+import pytest
+
+from app.services import llm_based_ranker, openai_scheduler
+from app.services.evaluation_cache import EvaluationCache
+from app.services.jd_analysis import JobDescriptionAnalyzer
+from app.services.llm_based_ranker import EVALUATION_MODEL, LLMBasedRanker
+from app.services.openai_scheduler import OpenAIScheduler
+
+JOB = "Senior Python engineer: Python, AWS, Docker, Kubernetes, PostgreSQL and Terraform."
+
+# Resume text per candidate (most to least keyword overlap) and the LLM's overall score
+TEXTS = {
+    "alice": "alice python aws docker kubernetes postgresql terraform engineer",
+    "carol": "carol python aws docker developer",
+    "bob": "bob python developer",
+    "dave": "dave accountant excel ledgers",
+}
+LLM_SCORES = {"alice": 0.6, "carol": 0.9, "bob": 0.4, "dave": 0.8}
+
+
+def resume(name):
+    return {"file": f"{name}.pdf", "preprocessed": {"cleaned_text": TEXTS[name]}}
+
+
+def candidate(text):
+    return next(name for name in TEXTS if name in text)
+
+
+def completion(content):
+    message = types.SimpleNamespace(content=json.dumps(content))
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+class FakeAsyncClient:
+    """
+    Answers evaluation, batch and single-pass prompts from LLM_SCORES and
+    records each request as (kind, candidates). Batch responses leave out
+    the candidates in drop; fail_batches makes every batch request fail.
+    """
+
+    def __init__(self, drop=(), fail_batches=False, single_pass_content=None):
+        self.requests = []
+        self.drop = set(drop)
+        self.fail_batches = fail_batches
+        self.single_pass_content = single_pass_content
+        self.chat = types.SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        if '"evaluations"' in prompt:
+            blocks = re.findall(r"\*\*Resume (R\d+):\*\*\n(.*?)(?=\n\*\*Resume|\n\nRespond)", prompt, re.S)
+            names = [candidate(text) for _, text in blocks]
+            self.requests.append(("batch", names))
+            if self.fail_batches:
+                raise RuntimeError("batch request failed")
+            return completion({"evaluations": [
+                {"resume_id": resume_id, "overall_score": LLM_SCORES[name], "recommendation": "Hire"}
+                for (resume_id, _), name in zip(blocks, names) if name not in self.drop
+            ]})
+
+        name = candidate(prompt.split("**Resume:**")[-1])
+        if '"parsed"' in prompt:
+            self.requests.append(("single_pass", [name]))
+            if self.single_pass_content is not None:
+                return completion(self.single_pass_content)
+            return completion({
+                "parsed": {"name": name.title(), "email": f"{name}@example.com", "skills": ["python"]},
+                "evaluation": {"overall_score": LLM_SCORES[name], "recommendation": "Hire"},
+            })
+        self.requests.append(("single", [name]))
+        return completion({"overall_score": LLM_SCORES[name], "recommendation": "Consider"})
+
+
+@pytest.fixture
+def ranker(monkeypatch, tmp_path):
+    scheduler = OpenAIScheduler(EVALUATION_MODEL, rpm=0, tpm=0, max_retries=0)
+    monkeypatch.setattr(openai_scheduler, "_schedulers", {EVALUATION_MODEL: scheduler})
+    monkeypatch.setattr(llm_based_ranker, "evaluation_cache", EvaluationCache(str(tmp_path / "eval.sqlite3")))
+    analyzer = JobDescriptionAnalyzer(EvaluationCache(str(tmp_path / "jd.sqlite3")))
+    analyzer._extract_requirements = lambda job_description: None
+    monkeypatch.setattr(llm_based_ranker, "jd_analyzer", analyzer)
+    return LLMBasedRanker()
+
+
+@pytest.fixture
+def client(ranker, monkeypatch):
+    client = FakeAsyncClient()
+    monkeypatch.setattr(ranker, "_get_async_client", lambda: client)
+    return client
+
+
+def use_client(ranker, monkeypatch, client):
+    monkeypatch.setattr(ranker, "_get_async_client", lambda: client)
+    return client
+
+
+def rank(ranker, resumes, **kwargs):
+    kwargs.setdefault("shortlist_size", 0)
+    kwargs.setdefault("shortlist_min_score", 0)
+    kwargs.setdefault("batch_size", 1)
+    return asyncio.run(ranker.rank_resumes_async(resumes, JOB, **kwargs))
+
+
+def collect(ranker, resumes, **kwargs):
+    async def run():
+        return [item async for item in ranker.iter_evaluations(resumes, JOB, **kwargs)]
+    return asyncio.run(run())
+
+
+def by_file(results):
+    return {result["file"]: result for result in results}
+
+
+def test_select_shortlist_applies_size_and_minimum(ranker):
+    prescreens = [{"prescreen_score": score} for score in (0.2, 0.9, 0.5, 0.7)]
+    assert ranker._select_shortlist(prescreens, 2, 0) == {1, 3}
+    assert ranker._select_shortlist(prescreens, 0, 0.4) == {1, 2, 3}
+    assert ranker._select_shortlist(prescreens, 3, 0.6) == {1, 3}
+    assert ranker._select_shortlist(prescreens, 0, 0) == {0, 1, 2, 3}
+
+
+def test_results_are_ranked_by_final_score(ranker, client):
+    results = rank(ranker, [resume(name) for name in TEXTS])
+    assert [result["rank"] for result in results] == [1, 2, 3, 4]
+    scores = [result["final_score"] for result in results]
+    assert scores == sorted(scores, reverse=True)
+    assert all(result["llm_reviewed"] for result in results)
+    assert sorted(names for _, names in client.requests) == [[name] for name in sorted(TEXTS)]
+    # final = 0.3 * keyword coverage + 0.7 * LLM score
+    carol = by_file(results)["carol.pdf"]
+    assert carol["llm_score"] == 0.9
+    assert carol["final_score"] == pytest.approx(0.3 * carol["keyword_score"] + 0.7 * 0.9, abs=1e-4)
+
+
+def test_shortlisted_resumes_are_split_into_batches(ranker, client):
+    results = rank(ranker, [resume(name) for name in TEXTS], batch_size=3)
+    assert [kind for kind, _ in client.requests] == ["batch", "single"]
+    assert sorted(name for _, names in client.requests for name in names) == sorted(TEXTS)
+    assert {r["file"]: r["llm_score"] for r in results} == {f"{n}.pdf": s for n, s in LLM_SCORES.items()}
+
+
+def test_resumes_missing_from_a_batch_are_retried_alone(ranker, monkeypatch):
+    client = use_client(ranker, monkeypatch, FakeAsyncClient(drop={"bob"}))
+    results = rank(ranker, [resume(name) for name in TEXTS], batch_size=4)
+    assert client.requests[0][0] == "batch" and len(client.requests[0][1]) == 4
+    assert client.requests[1:] == [("single", ["bob"])]
+    bob = by_file(results)["bob.pdf"]
+    assert bob["llm_score"] == 0.4 and bob["recommendation"] == "Consider"
+
+
+def test_failed_batch_falls_back_to_single_calls(ranker, monkeypatch):
+    client = use_client(ranker, monkeypatch, FakeAsyncClient(fail_batches=True))
+    results = rank(ranker, [resume(name) for name in TEXTS], batch_size=2)
+    kinds = [kind for kind, _ in client.requests]
+    assert kinds.count("batch") == 2 and kinds.count("single") == 4
+    assert all(result["llm_score"] == LLM_SCORES[result["file"][:-4]] for result in results)
+
+
+def test_resumes_outside_the_shortlist_are_not_llm_reviewed(ranker, client):
+    resumes = [resume(name) for name in TEXTS]
+    items = collect(ranker, resumes, shortlist_size=2, shortlist_min_score=0, batch_size=1)
+    # Each resume is yielded once; prescreen-only results come first
+    assert sorted(index for index, _ in items) == [0, 1, 2, 3]
+    assert [result["llm_reviewed"] for _, result in items] == [False, False, True, True]
+    assert sorted(names[0] for _, names in client.requests) == ["alice", "carol"]
+
+    results = ranker.finalize_ranking([result for _, result in items])
+    assert [result["file"] for result in results] == ["carol.pdf", "alice.pdf", "bob.pdf", "dave.pdf"]
+    for result in results[2:]:
+        assert result["recommendation"] == "Not LLM Reviewed"
+        assert "llm_score" not in result
+        assert result["final_score"] == result["prescreen_score"]
+
+
+def test_earlier_evaluations_are_not_sent_again(ranker, client):
+    resumes = [resume(name) for name in TEXTS]
+    previous = {"file": "alice.pdf", "final_score": 0.5, "llm_score": 0.5, "llm_reviewed": True}
+    items = dict(collect(ranker, resumes, shortlist_size=0, shortlist_min_score=0, batch_size=1,
+                         evaluated={0: previous}))
+    assert items[0] is previous
+    assert sorted(names[0] for _, names in client.requests) == ["bob", "carol", "dave"]
+
+
+def test_unparsed_resumes_are_parsed_and_evaluated_in_one_call(ranker, client):
+    unparsed = {"file": "carol.pdf", "parsed": None, "raw_text": TEXTS["carol"]}
+    results = rank(ranker, [unparsed, resume("bob")], batch_size=4)
+    assert ("single_pass", ["carol"]) in client.requests
+    # A lone resume left for batching is evaluated on its own
+    assert ("single", ["bob"]) in client.requests and len(client.requests) == 2
+    carol = by_file(results)["carol.pdf"]
+    assert carol["llm_score"] == 0.9
+    assert carol["candidate_name"] == "Carol" and carol["skills"] == ["python"]
+    assert unparsed["parsed"]["email"] == "carol@example.com"
+
+
+def test_single_pass_response_parsing(ranker, client):
+    parsed, evaluation = asyncio.run(ranker._get_single_pass_evaluation_async(TEXTS["dave"], JOB))
+    assert parsed["name"] == "Dave"
+    assert evaluation["overall_score"] == 0.8 and evaluation["recommendation"] == "Hire"
+    # Missing fields take their defaults
+    assert evaluation["skills_score"] == 0.5 and evaluation["strengths"] == []
+
+    # A second call is served from the evaluation cache
+    asyncio.run(ranker._get_single_pass_evaluation_async(TEXTS["dave"], JOB))
+    assert len(client.requests) == 1
+
+
+def test_incomplete_single_pass_response_gets_the_default_evaluation(ranker, monkeypatch):
+    use_client(ranker, monkeypatch, FakeAsyncClient(single_pass_content={"parsed": {"name": "Dave"}}))
+    parsed, evaluation = asyncio.run(ranker._get_single_pass_evaluation_async(TEXTS["dave"], JOB))
+    assert parsed is None
+    assert evaluation == ranker._default_evaluation()
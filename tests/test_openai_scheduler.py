@@ -0,0 +1,270 @@
+import asyncio
+import types
+
+import httpx
+import openai
+import pytest
+
+from app.services import openai_scheduler
+from app.services.openai_scheduler import (
+    COMPLETION_HEADROOM, DEFAULT_COMPLETION_TOKENS, THROTTLE_COOLDOWN_SECONDS,
+    AdaptiveConcurrencyLimiter, OpenAIScheduler, TokenBucket
+)
+
+
+class FakeTime:
+    """Stands in for the time module inside the scheduler; sleep() advances the clock."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(openai_scheduler, "time", clock)
+    return clock
+
+
+def rate_limit_error(retry_after: str = None) -> openai.RateLimitError:
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://example.test"))
+    return openai.RateLimitError("throttled", response=response, body=None)
+
+
+def completion(prompt_tokens: int, completion_tokens: int):
+    usage = types.SimpleNamespace(
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens
+    )
+    return types.SimpleNamespace(usage=usage)
+
+
+# ========== Token buckets ==========
+
+def test_bucket_admits_up_to_capacity_then_waits(clock):
+    bucket = TokenBucket(60)  # one per second
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    # Reservations queue up behind each other
+    assert bucket.reserve(2) == pytest.approx(3.0)
+
+
+def test_bucket_refills_over_time_up_to_capacity(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    clock.now += 10
+    assert bucket.reserve(10) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+    idle = TokenBucket(60)
+    clock.now += 3600
+    # Idle time does not bank more than one minute of capacity
+    assert idle.reserve(60) == 0.0
+    assert idle.reserve(1) == pytest.approx(1.0)
+
+
+def test_bucket_caps_single_reservation_at_capacity(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.reserve(60) == pytest.approx(60.0)
+
+
+def test_bucket_adjust_refunds_and_charges(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    bucket.adjust(-30)
+    assert bucket.reserve(30) == 0.0
+    bucket.adjust(15)
+    assert bucket.reserve(1) == pytest.approx(16.0)
+
+
+def test_unlimited_bucket(clock):
+    bucket = TokenBucket(0)
+    assert bucket.reserve(10 ** 9) == 0.0
+    bucket.adjust(10 ** 9)
+    assert bucket.reserve(1) == 0.0
+
+
+# ========== AIMD concurrency ==========
+
+def test_aimd_halves_on_throttle_and_grows_back_by_one_per_window(clock):
+    limiter = AdaptiveConcurrencyLimiter(8, minimum=1)
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    # Repeated 429s within the cooldown are one event
+    limiter.on_throttle()
+    assert limiter.limit == 4
+
+    for _ in range(3):
+        limiter.on_success()
+    assert limiter.limit == 4
+    limiter.on_success()
+    assert limiter.limit == 5
+    for _ in range(5):
+        limiter.on_success()
+    assert limiter.limit == 6
+
+    clock.now += THROTTLE_COOLDOWN_SECONDS
+    limiter.on_throttle()
+    assert limiter.limit == 3
+
+
+def test_aimd_respects_bounds(clock):
+    limiter = AdaptiveConcurrencyLimiter(4, minimum=2)
+    for _ in range(5):
+        limiter.on_throttle()
+        clock.now += THROTTLE_COOLDOWN_SECONDS
+    assert limiter.limit == 2
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 4
+
+
+def test_limiter_blocks_async_waiters_until_release():
+    limiter = AdaptiveConcurrencyLimiter(1)
+
+    async def run():
+        await limiter.acquire_async()
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        assert not waiter.done() and limiter.in_flight == 1
+        limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_flight == 1
+        limiter.release()
+
+    asyncio.run(run())
+    assert limiter.in_flight == 0
+
+
+# ========== Scheduler ==========
+
+def test_expected_completion_tokens_follow_reported_usage(clock):
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=0)
+    assert scheduler.expected_completion_tokens() == DEFAULT_COMPLETION_TOKENS
+    assert scheduler.expected_completion_tokens(max_tokens=300) == 300
+
+    scheduler._settle(1000, completion(600, 400))
+    assert scheduler.expected_completion_tokens() == int(400 * COMPLETION_HEADROOM)
+    assert scheduler.expected_completion_tokens(max_tokens=1500) == int(400 * COMPLETION_HEADROOM)
+
+
+def test_settle_corrects_the_token_bucket(clock):
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=6000)
+    scheduler.tokens.reserve(6000)
+    # 6000 reserved but only 1000 used: the difference is refunded
+    scheduler._settle(6000, completion(800, 200))
+    assert scheduler.tokens.reserve(5000) == 0.0
+    assert scheduler.stats()['tokens_used'] == 1000
+
+
+def test_call_waits_for_token_admission(clock):
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=600)  # 10 tokens per second
+    scheduler.call(lambda: completion(300, 300), tokens=600)
+    scheduler.call(lambda: completion(50, 50), tokens=100)
+    assert clock.sleeps == [0.0, pytest.approx(10.0)]
+
+
+def test_call_retries_throttling_after_retry_after(clock):
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=0, max_concurrency=8, max_retries=2)
+    attempts = []
+
+    def request():
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise rate_limit_error("7")
+        return completion(10, 10)
+
+    scheduler.call(request, tokens=20)
+    assert attempts[1] - attempts[0] == pytest.approx(7.0)
+    stats = scheduler.stats()
+    assert (stats['throttled'], stats['retries'], stats['requests']) == (1, 1, 2)
+    assert stats['concurrency_limit'] == 4
+    assert stats['in_flight'] == 0
+
+
+def test_throttling_pauses_other_requests(clock):
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=0)
+    scheduler._retry_delay(rate_limit_error("30"), attempt=0)
+    assert scheduler._admission_delay(10) == pytest.approx(30.0)
+    clock.now += 30
+    assert scheduler._admission_delay(10) == 0.0
+
+
+def test_non_retryable_errors_are_not_retried(clock):
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=0, max_retries=3)
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(request, tokens=10)
+    assert len(calls) == 1
+    assert scheduler.stats()['failures'] == 1
+
+
+def test_retries_give_up_after_max_retries(clock):
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=0, max_retries=2)
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise rate_limit_error("1")
+
+    with pytest.raises(openai.RateLimitError):
+        scheduler.call(request, tokens=10)
+    assert len(calls) == 3
+    assert scheduler.stats()['failures'] == 1
+
+
+def test_async_timeout_applies_after_admission():
+    # Real clock: the admission wait (about 0.3s) is longer than the timeout
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=600)
+    scheduler.tokens.reserve(600)
+
+    async def request():
+        await asyncio.sleep(0.01)
+        return completion(1, 1)
+
+    async def run():
+        return await scheduler.call_async(request, tokens=3, timeout=0.2)
+
+    assert asyncio.run(run()).usage.total_tokens == 2
+    assert scheduler.stats()['timeouts'] == 0
+
+
+def test_async_timeout_is_not_retried():
+    scheduler = OpenAIScheduler("test", rpm=0, tpm=0, max_retries=3)
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scheduler.call_async(request, tokens=1, timeout=0.05))
+    assert len(calls) == 1
+    stats = scheduler.stats()
+    assert stats['timeouts'] == 1 and stats['in_flight'] == 0
+
+
+def test_deployment_limits_override_defaults(monkeypatch):
+    monkeypatch.setattr(openai_scheduler, "OPENAI_DEPLOYMENT_LIMITS", '{"small": {"rpm": 6, "tpm": 600}}')
+    monkeypatch.setattr(openai_scheduler, "_schedulers", {})
+    scheduler = openai_scheduler.get_scheduler("small")
+    assert (scheduler.requests.capacity, scheduler.tokens.capacity) == (6.0, 600.0)
+    assert openai_scheduler.get_scheduler("small") is scheduler
@@ -0,0 +1,92 @@
+import hashlib
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import resumes as resumes_router
+from app.services import parser
+from app.services.parser import (
+    load_cached_parse, parse_resume_from_blob, parse_zip_from_blob, store_completed_parse
+)
+
+USER = "user@example.com"
+
+
+class FakeBlobStorage:
+    """Session blobs in memory (a single session per user)."""
+
+    def __init__(self):
+        self.blobs = {}
+        self.downloads = []
+
+    def upload_file_session(self, data, blob_name, user_id, session_id=None):
+        self.blobs[blob_name] = data
+        return f"https://blobs/{blob_name}"
+
+    def upload_file_session_fingerprinted(self, data, blob_name, user_id, session_id=None):
+        return self.upload_file_session(data, blob_name, user_id), hashlib.md5(data).hexdigest()
+
+    def download_file_session(self, blob_name, user_id, session_id=None):
+        self.downloads.append(blob_name)
+        if blob_name not in self.blobs:
+            raise FileNotFoundError(blob_name)
+        return self.blobs[blob_name]
+
+
+def parsed_resume(name, **parsed):
+    return {"file": name, "preprocessed": {"cleaned_text": name}, "parsed": dict({"name": name}, **parsed)}
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = FakeBlobStorage()
+    monkeypatch.setattr(parser, "blob_storage", storage)
+    return storage
+
+
+def test_upload_parse_is_served_from_the_cache(storage):
+    resume = parsed_resume("alice.pdf", skills=["python"])
+    assert store_completed_parse("raw_resumes/alice.pdf", "md5-1", [resume], USER)
+    assert parse_resume_from_blob("raw_resumes/alice.pdf", USER, "md5-1") == resume
+    # Nothing but the cache entry was read
+    assert storage.downloads == ["parsed/alice.pdf.json"]
+
+    # A changed blob misses the cache
+    assert load_cached_parse("raw_resumes/alice.pdf", "md5-2", USER) is None
+
+
+def test_zip_uploads_are_cached_as_member_lists(storage):
+    members = [parsed_resume("alice.pdf"), parsed_resume("bob.docx")]
+    assert store_completed_parse("raw_resumes/pool.zip", "md5-1", members, USER)
+    assert parse_zip_from_blob("raw_resumes/pool.zip", USER, "md5-1") == members
+
+
+def test_failed_gpt_parses_are_not_cached(storage):
+    failed = {"file": "bob.pdf", "parsed": {"raw_response": "not json"}}
+    assert not store_completed_parse("raw_resumes/bob.pdf", "md5-1", [failed], USER)
+    assert not store_completed_parse("raw_resumes/pool.zip", "md5-1", [parsed_resume("a.pdf"), failed], USER)
+    assert storage.blobs == {}
+
+
+def test_upload_route_caches_parses_under_the_blob_fingerprint(storage, monkeypatch):
+    monkeypatch.setattr(resumes_router, "blob_storage", storage)
+    monkeypatch.setattr(resumes_router, "parse_resume_bytes",
+                        lambda content, file_name: parsed_resume(file_name, text=content.decode()))
+    indexed = []
+    monkeypatch.setattr(resumes_router, "update_session_index", lambda user_id, resumes: indexed.extend(resumes))
+    app = FastAPI()
+    app.include_router(resumes_router.router)
+
+    response = TestClient(app).post(
+        "/api/upload", files=[("resume", ("alice.pdf", b"python aws", "application/pdf"))],
+        headers={"X-User-Id": USER}
+    )
+    assert response.status_code == 200
+    assert response.json()["results"][0]["parsed"]["parsed"]["text"] == "python aws"
+    assert [resume["file"] for resume in indexed] == ["alice.pdf"]
+
+    cached = json.loads(storage.blobs["parsed/alice.pdf.json"])
+    assert cached["fingerprint"] == hashlib.md5(b"python aws").hexdigest()
+    assert load_cached_parse("raw_resumes/alice.pdf", cached["fingerprint"], USER)["parsed"]["text"] == "python aws"
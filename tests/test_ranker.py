@@ -0,0 +1,92 @@
+import pytest
+
+from app.services import embedding_store, jd_analysis, ranker
+from app.services.evaluation_cache import EvaluationCache
+from app.services.jd_analysis import JobDescriptionAnalyzer
+
+JOB = "Python engineer with AWS and Docker"
+
+TEXTS = {
+    "alice.pdf": "python engineer aws docker kubernetes",
+    "bob.pdf": "java developer spring oracle",
+    "carol.pdf": "python developer django",
+}
+
+# Fake embedding space: axis 0 is "python/aws", axis 1 is "java"
+EMBEDDINGS = {
+    JOB: [1.0, 0.0],
+    "alice.pdf": [0.9, 0.1],
+    "bob.pdf": [0.1, 0.9],
+    "carol.pdf": [0.6, 0.4],
+}
+
+
+def resumes(texts=TEXTS):
+    return [
+        {"file": name, "preprocessed": {"cleaned_text": text, "skills": text.split()[:2]}, "parsed": {}}
+        for name, text in texts.items()
+    ]
+
+
+def embedding_for(text):
+    for name, body in TEXTS.items():
+        if text.startswith(body):
+            return EMBEDDINGS[name]
+    return EMBEDDINGS[text]
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    analyzer = JobDescriptionAnalyzer(EvaluationCache(str(tmp_path / "jd.sqlite3")))
+    analyzer._extract_requirements = lambda job_description: None
+    monkeypatch.setattr(ranker, "jd_analyzer", analyzer)
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path / "embeddings"))
+    return analyzer
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Texts sent to the embeddings API, per request."""
+    requests = []
+
+    def fake_embeddings(texts):
+        requests.append(list(texts))
+        return [embedding_for(text) for text in texts]
+
+    monkeypatch.setattr(ranker, "get_text_embeddings", fake_embeddings)
+    monkeypatch.setattr(jd_analysis, "get_text_embedding", lambda text: fake_embeddings([text])[0])
+    return requests
+
+
+def test_fallback_is_offline_by_default(analyzer, embedded):
+    ranked = ranker.rank_resumes_fallback(resumes(), JOB, 0.7, "user/session_1/")
+    assert embedded == []
+    assert ranked[0]["file"] == "alice.pdf"
+    assert all("bm25_score" in result for result in ranked)
+    assert [r["final_score"] for r in ranked] == sorted((r["final_score"] for r in ranked), reverse=True)
+
+
+def test_semantic_fallback_reuses_session_embeddings(analyzer, embedded, monkeypatch):
+    monkeypatch.setattr(ranker, "FALLBACK_RANKER", "semantic")
+    ranked = ranker.rank_resumes_fallback(resumes(), JOB, 0.7, "user/session_1/")
+    assert [r["file"] for r in ranked] == ["alice.pdf", "carol.pdf", "bob.pdf"]
+    assert all("embedding_score" in result for result in ranked)
+    assert ranked[0]["embedding_score"] == pytest.approx(0.9 / (0.82 ** 0.5), abs=1e-4)
+    assert len(embedded) == 2  # the JD, then all resumes in one batch
+
+    # A second ranking with one new resume embeds only that resume
+    texts = dict(TEXTS, **{"dave.pdf": TEXTS["carol.pdf"] + " flask"})
+    ranked = ranker.rank_resumes_fallback(resumes(texts), JOB, 0.7, "user/session_1/")
+    assert len(ranked) == 4
+    assert len(embedded) == 3 and len(embedded[2]) == 1
+
+
+def test_semantic_fallback_failure_uses_bm25(analyzer, monkeypatch):
+    def unavailable(texts):
+        raise RuntimeError("embeddings unavailable")
+
+    monkeypatch.setattr(ranker, "FALLBACK_RANKER", "semantic")
+    monkeypatch.setattr(jd_analysis, "get_text_embedding", unavailable)
+    ranked = ranker.rank_resumes_fallback(resumes(), JOB, 0.7, "user/session_1/")
+    assert ranked[0]["file"] == "alice.pdf"
+    assert all("bm25_score" in result for result in ranked)
@@ -0,0 +1,266 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services import ranking_pipeline, results_store
+from app.services.ranking_pipeline import (
+    RANKING_META_BLOB, iter_ranking, job_description_hash, reusable_results, run_ranking
+)
+
+JOB = "Python engineer with AWS and Docker"
+USER = "user@example.com"
+SESSION = "session_1"
+
+
+class FakeBlobStorage:
+    """Session blobs in memory; raw resumes carry a fingerprint instead of content."""
+
+    def __init__(self):
+        self.blobs = {}
+        self.fingerprints = {}
+
+    def add_resume(self, name, fingerprint):
+        self.fingerprints[f"raw_resumes/{name}"] = fingerprint
+
+    def delete_resume(self, name):
+        del self.fingerprints[f"raw_resumes/{name}"]
+
+    def get_session_path(self, user_id, session_id=None):
+        return f"{user_id}/{session_id}/"
+
+    def list_blob_properties_session(self, user_id, session_id=None, prefix=""):
+        return [
+            {"name": name, "fingerprint": fingerprint}
+            for name, fingerprint in sorted(self.fingerprints.items())
+            if name.startswith(prefix)
+        ]
+
+    def upload_file_session(self, data, blob_name, user_id, session_id=None):
+        self.blobs[blob_name] = data
+
+    def download_file_session(self, blob_name, user_id, session_id=None):
+        if blob_name not in self.blobs:
+            raise FileNotFoundError(blob_name)
+        return self.blobs[blob_name]
+
+
+class StubRanker:
+    """Scores resumes by fingerprint and records which ones it evaluated."""
+
+    def __init__(self):
+        self.evaluated = []
+        self.reused = []
+        self.fail = False
+
+    async def iter_evaluations(self, resumes, job_description, session_index=None, evaluated=None):
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        evaluated = evaluated or {}
+        for index, resume in enumerate(resumes):
+            if index in evaluated:
+                self.reused.append(resume["file"])
+                yield index, evaluated[index]
+            else:
+                self.evaluated.append(resume["file"])
+                score = resume["parsed"]["score"]
+                yield index, {"file": resume["file"], "final_score": score, "llm_score": score,
+                              "parsed": resume["parsed"]}
+
+    def finalize_ranking(self, ranked_results):
+        ranked_results.sort(key=lambda result: result["final_score"], reverse=True)
+        for rank, result in enumerate(ranked_results, 1):
+            result["rank"] = rank
+        return ranked_results
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    storage = FakeBlobStorage()
+    monkeypatch.setattr(ranking_pipeline, "blob_storage", storage)
+    monkeypatch.setattr(results_store, "blob_storage", storage)
+    monkeypatch.setattr(results_store, "LOCAL_RESULTS_PATH", str(tmp_path / "reports" / "ranked.json.gz"))
+    monkeypatch.setattr(results_store, "LEGACY_LOCAL_RESULTS_PATH", str(tmp_path / "reports" / "ranked.json"))
+    monkeypatch.setattr(ranking_pipeline, "sync_session_index", lambda *args: None)
+    return storage
+
+
+@pytest.fixture
+def parsed(monkeypatch, storage):
+    """Blob names parsed, in order; a resume's score is its blob fingerprint."""
+    calls = []
+
+    def parse_resume_from_blob(blob_name, user_id, fingerprint, session_id=None, use_gpt=True):
+        calls.append(blob_name)
+        return {"file": os.path.basename(blob_name), "parsed": {"score": float(fingerprint)}}
+
+    monkeypatch.setattr(ranking_pipeline, "parse_resume_from_blob", parse_resume_from_blob)
+    return calls
+
+
+@pytest.fixture
+def ranker(monkeypatch):
+    ranker = StubRanker()
+    monkeypatch.setattr(ranking_pipeline, "llm_ranker", ranker)
+    return ranker
+
+
+def rank(job_description=JOB):
+    return asyncio.run(run_ranking(USER, job_description, SESSION))
+
+
+def scores(results):
+    return {result["file"]: result["final_score"] for result in results}
+
+
+def seed(storage):
+    storage.add_resume("alice.pdf", "0.9")
+    storage.add_resume("bob.pdf", "0.5")
+    storage.add_resume("carol.pdf", "0.7")
+
+
+def test_reusable_results_match_unchanged_fingerprints():
+    blobs = [{"name": "raw_resumes/a.pdf", "fingerprint": "1"}, {"name": "raw_resumes/b.pdf", "fingerprint": "2"},
+             {"name": "raw_resumes/pool.zip", "fingerprint": "3"}]
+    previous = [{"file": "a.pdf"}, {"file": "b.pdf"}, {"file": "c.pdf"}, {"file": "d.pdf"}]
+    sources = {
+        "raw_resumes/a.pdf": {"fingerprint": "1", "files": ["a.pdf"]},
+        "raw_resumes/b.pdf": {"fingerprint": "changed", "files": ["b.pdf"]},
+        "raw_resumes/pool.zip": {"fingerprint": "3", "files": ["c.pdf", "d.pdf"]},
+    }
+    reused = reusable_results(blobs, previous, sources)
+    assert reused == {"raw_resumes/a.pdf": [previous[0]], "raw_resumes/pool.zip": previous[2:]}
+
+    # A file name claimed by two blobs is ambiguous, so neither blob is reused
+    sources["raw_resumes/pool.zip"]["files"] = ["a.pdf", "d.pdf"]
+    assert reusable_results(blobs, previous, sources) == {}
+
+
+def test_first_run_parses_everything_and_writes_the_sidecar(storage, parsed, ranker):
+    seed(storage)
+    results = rank()
+    assert [result["file"] for result in results] == ["alice.pdf", "carol.pdf", "bob.pdf"]
+    assert len(parsed) == 3 and sorted(ranker.evaluated) == ["alice.pdf", "bob.pdf", "carol.pdf"]
+
+    meta = results_store.loads(storage.blobs[RANKING_META_BLOB])
+    assert meta["jd_hash"] == job_description_hash(JOB)
+    assert meta["blobs"]["raw_resumes/bob.pdf"] == {"fingerprint": "0.5", "files": ["bob.pdf"]}
+
+
+def test_unchanged_blobs_are_reused_from_the_sidecar(storage, parsed, ranker):
+    seed(storage)
+    first = rank()
+    parsed.clear()
+    ranker.evaluated.clear()
+
+    second = rank()
+    assert parsed == [] and ranker.evaluated == []
+    assert scores(second) == scores(first)
+
+
+def test_deleted_blobs_are_dropped(storage, parsed, ranker):
+    seed(storage)
+    rank()
+    storage.delete_resume("carol.pdf")
+    parsed.clear()
+
+    results = rank()
+    assert parsed == []
+    assert [result["file"] for result in results] == ["alice.pdf", "bob.pdf"]
+    assert [result["rank"] for result in results] == [1, 2]
+    meta = results_store.loads(storage.blobs[RANKING_META_BLOB])
+    assert set(meta["blobs"]) == {"raw_resumes/alice.pdf", "raw_resumes/bob.pdf"}
+
+
+def test_changed_and_new_blobs_are_evaluated_alone(storage, parsed, ranker):
+    seed(storage)
+    rank()
+    storage.add_resume("bob.pdf", "0.95")
+    storage.add_resume("dave.pdf", "0.6")
+    parsed.clear()
+    ranker.evaluated.clear()
+
+    results = rank()
+    assert ranker.evaluated == ["bob.pdf", "dave.pdf"]
+    # Unchanged resumes are reloaded for the prescreen but keep their evaluations
+    assert sorted(ranker.reused) == ["alice.pdf", "carol.pdf"]
+    assert parsed[:2] == ["raw_resumes/bob.pdf", "raw_resumes/dave.pdf"]
+    assert [result["file"] for result in results] == ["bob.pdf", "alice.pdf", "carol.pdf", "dave.pdf"]
+
+
+def test_another_job_description_is_a_full_rerank(storage, parsed, ranker):
+    seed(storage)
+    rank()
+    ranker.evaluated.clear()
+    rank(JOB + " and Kubernetes")
+    assert sorted(ranker.evaluated) == ["alice.pdf", "bob.pdf", "carol.pdf"]
+
+
+def test_fallback_ranks_every_resume_and_reuses_nothing_next_time(storage, parsed, ranker, monkeypatch):
+    fallback_calls = []
+
+    def rank_resumes_fallback(resumes, job_description, threshold, session_key):
+        fallback_calls.append(sorted(resume["file"] for resume in resumes))
+        return [{"file": resume["file"], "final_score": 0.1, "rank": i}
+                for i, resume in enumerate(resumes, 1)]
+
+    monkeypatch.setattr(ranking_pipeline, "rank_resumes_fallback", rank_resumes_fallback)
+    seed(storage)
+    rank()
+    storage.add_resume("dave.pdf", "0.6")
+    ranker.fail = True
+
+    results = rank()
+    # The unchanged resumes are parsed again so the fallback ranks the whole session
+    assert fallback_calls == [["alice.pdf", "bob.pdf", "carol.pdf", "dave.pdf"]]
+    assert len(results) == 4
+    meta = results_store.loads(storage.blobs[RANKING_META_BLOB])
+    assert meta["blobs"] == {}
+
+    ranker.fail = False
+    ranker.evaluated.clear()
+    rank()
+    assert sorted(ranker.evaluated) == ["alice.pdf", "bob.pdf", "carol.pdf", "dave.pdf"]
+
+
+def events(job_description=JOB):
+    async def collect():
+        return [event async for event in iter_ranking(USER, job_description, SESSION)]
+    return asyncio.run(collect())
+
+
+def test_iter_ranking_events(storage, parsed, ranker):
+    seed(storage)
+    first = events()
+    assert [event["type"] for event in first] == (
+        ["parsing"] + ["parsed"] * 3 + ["evaluating"] + ["result"] * 3 + ["complete"]
+    )
+    assert first[1] == {"type": "parsed", "blob_name": "raw_resumes/alice.pdf", "files": ["alice.pdf"],
+                        "parsed_blobs": 1, "total_blobs": 3}
+    assert [event["completed"] for event in first if event["type"] == "result"] == [1, 2, 3]
+    assert [r["file"] for r in first[-1]["ranked_results"]] == ["alice.pdf", "carol.pdf", "bob.pdf"]
+
+    # Streamed re-ranks are incremental too: only the new blob is parsed, and earlier
+    # evaluations are streamed back without being evaluated again
+    storage.add_resume("dave.pdf", "0.6")
+    ranker.evaluated.clear()
+    second = events()
+    assert second[0] == {"type": "parsing", "total_blobs": 1, "reused_blobs": 3}
+    assert [event["files"] for event in second if event["type"] == "parsed"] == [["dave.pdf"]]
+    assert len([event for event in second if event["type"] == "result"]) == 4
+    assert ranker.evaluated == ["dave.pdf"]
+
+
+def test_run_ranking_reports_progress(storage, parsed, ranker):
+    seed(storage)
+    progress = []
+    asyncio.run(run_ranking(USER, JOB, SESSION, on_progress=lambda *update: progress.append(update)))
+    assert progress == [
+        ("parsing", 0, 3), ("parsing", 1, 3), ("parsing", 2, 3), ("parsing", 3, 3),
+        ("evaluating", 0, 3), ("evaluating", 1, 3), ("evaluating", 2, 3), ("evaluating", 3, 3),
+    ]
+
+
+def test_session_without_resumes_raises(storage, parsed, ranker):
+    with pytest.raises(LookupError):
+        rank()
@@ -0,0 +1,51 @@
+from app.services.result_views import (
+    SUMMARY_FIELDS, find_result, parse_fields, ranking_sort_key, results_page, select_results
+)
+
+REVIEWED = {'file': 'alice.pdf', 'final_score': 0.4, 'llm_score': 0.5, 'llm_reviewed': True}
+PRESCREEN = {'file': 'bob.pdf', 'final_score': 0.6, 'prescreen_score': 0.6, 'llm_reviewed': False}
+ERROR = {'file': 'broken.pdf', 'error': 'Could not extract text', 'final_score': 0.0}
+# Saved before results carried llm_reviewed
+LEGACY = {'file': 'carol.pdf', 'final_score': 0.3, 'llm_score': 0.3}
+
+
+def ranked(count):
+    return [{'rank': i, 'file': f'{i}.pdf', 'final_score': 1 - i / 100} for i in range(1, count + 1)]
+
+
+def test_sort_key_puts_llm_reviewed_results_first():
+    order = sorted([ERROR, PRESCREEN, LEGACY, REVIEWED], key=ranking_sort_key, reverse=True)
+    assert [result['file'] for result in order] == ['alice.pdf', 'carol.pdf', 'bob.pdf', 'broken.pdf']
+
+
+def test_error_records_rank_below_prescreen_only_results():
+    assert ranking_sort_key(ERROR) < ranking_sort_key(PRESCREEN)
+    assert ranking_sort_key(dict(PRESCREEN, final_score=0.0)) == ranking_sort_key(ERROR)
+
+
+def test_select_results_pages_within_top_k():
+    results = ranked(10)
+    assert [r['rank'] for r in select_results(results, top_k=5)] == [1, 2, 3, 4, 5]
+    assert [r['rank'] for r in select_results(results, top_k=5, offset=3, limit=5)] == [4, 5]
+    assert [r['rank'] for r in select_results(results, offset=8)] == [9, 10]
+    assert select_results(results, top_k=0) == []
+
+
+def test_results_page_metadata_and_fields():
+    page = results_page(ranked(10), top_k=6, offset=2, limit=3, fields='final_score')
+    assert page['ranked_resumes'] == [{'rank': i, 'file': f'{i}.pdf', 'final_score': 1 - i / 100} for i in (3, 4, 5)]
+    assert (page['total'], page['offset'], page['limit'], page['top_k'], page['has_more']) == (10, 2, 3, 6, True)
+    assert results_page(ranked(10), top_k=6, offset=3, limit=3)['has_more'] is False
+
+
+def test_parse_fields():
+    assert parse_fields(None) is None and parse_fields('all') is None
+    assert parse_fields('summary') == SUMMARY_FIELDS
+    assert parse_fields('email, rank,skills') == ('rank', 'file', 'email', 'skills')
+
+
+def test_find_result():
+    results = ranked(3)
+    assert find_result(results, rank=2)['file'] == '2.pdf'
+    assert find_result(results, rank=2, file='3.pdf') is None
+    assert find_result(results, file='3.pdf')['rank'] == 3
@@ -0,0 +1,144 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from app.services import results_store
+from app.services.results_store import (
+    decode_results, encode_results, load_local_results, pack_results, save_local_results, unpack_results
+)
+
+
+def llm_result(**overrides):
+    result = {
+        'file': 'alice.pdf',
+        'candidate_name': 'Alice',
+        'email': 'alice@example.com',
+        'final_score': 0.81,
+        'llm_score': 0.85,
+        'keyword_score': 0.7,
+        'recommendation': 'Hire',
+        'strengths': ['python', 'aws'],
+        'skills': ['python', 'aws'],
+        'parsed': {'name': 'Alice', 'email': 'alice@example.com', 'skills': ['python', 'aws']},
+        'rank': 1,
+    }
+    result.update(overrides)
+    return result
+
+
+SAMPLE = [
+    llm_result(),
+    # Derived fields that differ from parsed are stored as values
+    llm_result(file='bob.pdf', candidate_name='Robert', email='', parsed={'name': 'Bob', 'skills': 'n/a'},
+               skills=[], rank=2),
+    # Prescreen-only record with a field the others lack and without llm_score
+    {
+        'file': 'carol.docx',
+        'candidate_name': 'Unknown',
+        'email': '',
+        'final_score': 0.2,
+        'prescreen_score': 0.2,
+        'llm_reviewed': False,
+        'skills': [],
+        'parsed': {},
+        'rank': 3,
+    },
+    {'file': 'broken.pdf', 'error': 'Could not extract text', 'rank': 4},
+]
+
+
+@pytest.fixture
+def local_paths(tmp_path, monkeypatch):
+    compact = str(tmp_path / "reports" / "ranked_resumes.json.gz")
+    legacy = str(tmp_path / "reports" / "ranked_resumes.json")
+    monkeypatch.setattr(results_store, "LOCAL_RESULTS_PATH", compact)
+    monkeypatch.setattr(results_store, "LEGACY_LOCAL_RESULTS_PATH", legacy)
+    return compact, legacy
+
+
+def test_pack_round_trip():
+    assert unpack_results(pack_results(SAMPLE)) == SAMPLE
+
+
+def test_round_trip_keeps_field_order():
+    for original, restored in zip(SAMPLE, unpack_results(pack_results(SAMPLE))):
+        assert list(restored) == list(original)
+
+
+def test_layout_marks_stored_derived_and_absent_fields():
+    document = pack_results(SAMPLE)
+    fields = document['fields']
+    layouts = [row[0] for row in document['rows']]
+    assert all(len(layout) == len(fields) for layout in layouts)
+
+    def kind(row, field):
+        return layouts[row][fields.index(field)]
+
+    # Matching parsed values are not stored
+    assert [kind(0, f) for f in ('candidate_name', 'email', 'skills')] == ['d', 'd', 'd']
+    assert kind(0, 'parsed') == 'v'
+    # Mismatches are stored; a missing parsed email derives as ''
+    assert [kind(1, f) for f in ('candidate_name', 'email', 'skills')] == ['v', 'd', 'd']
+    assert kind(2, 'llm_score') == '-'
+    assert kind(3, 'parsed') == '-' and kind(3, 'candidate_name') == '-'
+    # One value per "v"
+    for layout, row in zip(layouts, document['rows']):
+        assert len(row) - 1 == layout.count('v')
+
+
+def test_derived_defaults_when_parsed_lacks_keys():
+    result = {'candidate_name': 'Unknown', 'email': '', 'skills': [], 'parsed': {}}
+    document = pack_results([result])
+    assert document['rows'][0][0] == 'ddd' + 'v'
+    assert unpack_results(document) == [result]
+
+
+def test_encode_decode_round_trip():
+    payload = encode_results(SAMPLE)
+    assert payload[:2] == b"\x1f\x8b"
+    assert decode_results(payload) == SAMPLE
+
+
+def test_decode_legacy_plain_json():
+    assert decode_results(json.dumps(SAMPLE).encode("utf-8")) == SAMPLE
+    assert decode_results(gzip.compress(json.dumps(SAMPLE).encode("utf-8"))) == SAMPLE
+
+
+def test_unpack_rejects_unknown_documents():
+    with pytest.raises(ValueError):
+        unpack_results({'format': 'other'})
+    with pytest.raises(ValueError):
+        unpack_results(dict(pack_results(SAMPLE), version=99))
+
+
+def test_save_local_results_replaces_legacy_copy(local_paths):
+    compact, legacy = local_paths
+    os.makedirs(os.path.dirname(legacy))
+    with open(legacy, "w") as f:
+        json.dump([llm_result(file='stale.pdf')], f)
+
+    assert save_local_results(SAMPLE) == compact
+    assert not os.path.exists(legacy)
+    assert load_local_results() == SAMPLE
+
+
+def test_load_local_results_prefers_newer_file(local_paths):
+    compact, legacy = local_paths
+    save_local_results(SAMPLE)
+    legacy_results = [llm_result(file='edited.pdf')]
+    with open(legacy, "w") as f:
+        json.dump(legacy_results, f)
+
+    os.utime(compact, (1000, 1000))
+    os.utime(legacy, (2000, 2000))
+    assert load_local_results() == legacy_results
+
+    os.utime(compact, (3000, 3000))
+    assert load_local_results() == SAMPLE
+
+
+def test_load_local_results_without_files(local_paths):
+    with pytest.raises(FileNotFoundError):
+        load_local_results()
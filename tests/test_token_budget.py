@@ -0,0 +1,176 @@
+import types
+
+import pytest
+
+from app.services import token_budget
+from app.services.token_budget import (
+    HEADER_PRIORITY, JD_SECTION_PRIORITIES, MIN_SECTION_TOKENS, TOKENS_PER_MESSAGE, TOKENS_PER_REPLY,
+    TRUNCATION_MARKER, TokenUsageTracker, count_message_tokens, count_tokens, fit_prompt,
+    fit_text_to_budget, split_sections, truncate_to_tokens
+)
+
+
+@pytest.fixture(autouse=True)
+def estimated_counts(monkeypatch):
+    # Counts use the 4-characters-per-token estimate, so results do not depend on tiktoken
+    monkeypatch.setattr(token_budget, "_encoder", None)
+    monkeypatch.setattr(token_budget, "_encoder_loaded", True)
+
+
+def section(heading: str, sentence: str, repeat: int) -> str:
+    return f"{heading}\n" + sentence * repeat + "\n"
+
+
+HEADER = "Alice Smith\nalice@example.com | +1 555 0100\n"
+EXPERIENCE = section("EXPERIENCE", "Built Python services on AWS for payments. ", 30)
+SKILLS = section("Skills:", "Python, AWS, Docker, Kubernetes, PostgreSQL. ", 10)
+SUMMARY = section("Summary", "Backend engineer who enjoys distributed systems. ", 20)
+HOBBIES = section("Hobbies", "Chess, hiking and amateur astronomy on weekends. ", 20)
+RESUME = HEADER + SUMMARY + EXPERIENCE + SKILLS + HOBBIES
+
+
+# ========== Counting ==========
+
+def test_count_tokens_estimate():
+    assert count_tokens("") == 0
+    assert count_tokens(None) == 0
+    assert count_tokens("a" * 40) == 11
+
+
+def test_count_message_tokens_includes_chat_overhead():
+    messages = [{"role": "system", "content": "a" * 40}, {"role": "user", "content": "b" * 8}]
+    expected = TOKENS_PER_REPLY + 2 * TOKENS_PER_MESSAGE + sum(
+        count_tokens(value) for message in messages for value in message.values()
+    )
+    assert count_message_tokens(messages) == expected
+    assert count_message_tokens([]) == TOKENS_PER_REPLY
+
+
+def test_truncate_to_tokens():
+    text = "word " * 100
+    assert truncate_to_tokens(text, 1000) == text
+    assert truncate_to_tokens(text, 0) == ""
+    cut = truncate_to_tokens(text, 20)
+    assert cut.endswith(TRUNCATION_MARKER)
+    assert text.startswith(cut[:-len(TRUNCATION_MARKER)])
+    assert count_tokens(cut) <= 20
+
+
+# ========== Section trimming ==========
+
+def test_split_sections_recognises_headings():
+    sections = split_sections(RESUME, token_budget.RESUME_SECTION_PRIORITIES)
+    assert [priority for priority, _ in sections] == [HEADER_PRIORITY, 2, 5, 5, 0]
+    assert "".join(text for _, text in sections) == RESUME
+    assert sections[2][1].startswith("EXPERIENCE\n")
+
+
+def test_split_sections_ignores_long_lines_and_unknown_headings():
+    text = "Intro\nSkills are listed below in great detail for the hiring manager reading this\nHobbies\nchess\n"
+    sections = split_sections(text, token_budget.RESUME_SECTION_PRIORITIES)
+    assert [priority for priority, _ in sections] == [HEADER_PRIORITY, 0]
+
+
+def test_fit_text_within_budget_is_unchanged():
+    assert fit_text_to_budget(RESUME, count_tokens(RESUME)) == (RESUME, False)
+
+
+def test_fit_text_drops_lowest_value_sections_first():
+    budget = count_tokens(RESUME) - count_tokens(HOBBIES) + 5
+    fitted, trimmed = fit_text_to_budget(RESUME, budget)
+    assert trimmed
+    assert count_tokens(fitted) <= budget
+    assert "Hobbies" not in fitted
+    assert HEADER in fitted and EXPERIENCE in fitted and SKILLS in fitted and SUMMARY in fitted
+
+
+def test_fit_text_cuts_sections_before_removing_them():
+    # Too tight for any full section: each kept section keeps its start
+    budget = count_tokens(HEADER + SKILLS) + 2 * MIN_SECTION_TOKENS + 20
+    fitted, trimmed = fit_text_to_budget(RESUME, budget)
+    assert trimmed and count_tokens(fitted) <= budget
+    assert fitted.startswith(HEADER)
+    assert "Summary\nBackend engineer" in fitted
+    assert "EXPERIENCE\nBuilt Python services" in fitted
+    assert "Skills:\nPython, AWS" in fitted
+    assert "Hobbies" not in fitted
+    assert fitted.count(TRUNCATION_MARKER) == 3
+    # The low-value summary is cut to the floor; experience keeps more
+    sections = split_sections(fitted, token_budget.RESUME_SECTION_PRIORITIES)
+    assert count_tokens(sections[1][1]) <= MIN_SECTION_TOKENS + 1
+    assert count_tokens(sections[2][1]) > MIN_SECTION_TOKENS
+
+
+def test_fit_text_keeps_the_header_longest():
+    budget = count_tokens(HEADER) + 5
+    fitted, trimmed = fit_text_to_budget(RESUME, budget)
+    assert trimmed and count_tokens(fitted) <= budget
+    assert fitted.startswith(HEADER)
+
+
+def test_fit_text_uses_job_description_priorities():
+    jd = (
+        "Senior Backend Engineer\n"
+        + section("About us", "We are a fast growing fintech with offices worldwide. ", 20)
+        + section("Requirements", "Five years of Python and AWS in production. ", 10)
+        + section("Benefits", "Health insurance, stock options and a gym budget. ", 20)
+    )
+    budget = count_tokens(jd) // 2
+    fitted, trimmed = fit_text_to_budget(jd, budget, JD_SECTION_PRIORITIES)
+    assert trimmed and count_tokens(fitted) <= budget
+    assert "Five years of Python and AWS in production. " * 10 in fitted
+    # Benefits goes first (the later of the two priority-0 sections), then About us is cut
+    assert "Benefits" not in fitted
+    assert "About us\nWe are" in fitted and TRUNCATION_MARKER in fitted
+
+
+def test_fit_prompt_fits_the_whole_prompt():
+    def build_messages(text):
+        return [
+            {"role": "system", "content": "You are an expert recruiter. " * 10},
+            {"role": "user", "content": f"Evaluate this resume:\n{text}\nReturn JSON."},
+        ]
+
+    overhead = count_message_tokens(build_messages(""))
+    budget = overhead + 200
+    messages, usage = fit_prompt(build_messages, RESUME, budget)
+    assert usage == {
+        'prompt_tokens': count_message_tokens(messages),
+        'budget': budget,
+        'text_tokens': count_tokens(RESUME),
+        'trimmed': True
+    }
+    assert usage['prompt_tokens'] <= budget
+    assert messages[0] == build_messages("")[0]
+    assert HEADER in messages[1]['content']
+
+    _, usage = fit_prompt(build_messages, RESUME, overhead + count_tokens(RESUME) + 10)
+    assert not usage['trimmed']
+
+
+# ========== Usage recording ==========
+
+def test_usage_tracker_records_response_usage_and_totals():
+    tracker = TokenUsageTracker()
+    response = types.SimpleNamespace(usage=types.SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+    entry = tracker.record("evaluation", {'prompt_tokens': 118, 'trimmed': True}, response)
+    assert entry == {
+        'prompt_tokens': 118, 'trimmed': True, 'purpose': 'evaluation',
+        'billed_prompt_tokens': 120, 'completion_tokens': 30
+    }
+    tracker.record("evaluation", {'prompt_tokens': 50, 'trimmed': False})
+    tracker.record("parse", {'prompt_tokens': 10})
+
+    assert tracker.stats() == {
+        'evaluation': {'requests': 2, 'prompt_tokens': 168, 'completion_tokens': 30, 'trimmed': 1},
+        'parse': {'requests': 1, 'prompt_tokens': 10, 'completion_tokens': 0, 'trimmed': 0},
+    }
+    assert [entry['purpose'] for entry in tracker.recent(2)] == ['evaluation', 'parse']
+
+
+def test_usage_tracker_keeps_bounded_history():
+    tracker = TokenUsageTracker(history=3)
+    for i in range(5):
+        tracker.record("parse", {'prompt_tokens': i})
+    assert [entry['prompt_tokens'] for entry in tracker.recent()] == [2, 3, 4]
+    assert tracker.stats()['parse']['requests'] == 5